@@ -0,0 +1,292 @@
+"""Columnar analytics backend for DataAnalyzer.
+
+Entries are held as parallel columns instead of ORM objects. Scalar
+statistics (source reliability, per-day counts, per-target and hour-of-day
+counts and daily summaries) are computed with grouped reductions over integer group codes,
+using NumPy when it is installed and single dict-free passes otherwise.
+build_state() returns a state in exactly the layout of
+DataAnalyzer.new_state(), so it merges with stored states and finalizes into
+the same result dicts.
+"""
+import json
+import heapq
+from array import array
+from datetime import date
+from urllib.parse import urlparse
+from data_analyzer import (
+    ANALYSIS_PASSES, STATE_VERSION, TIMELINE_EVENT_LIMIT, TARGET_SCORE_LIMIT,
+    timeline_event, _count_keywords, _increment, _extend_unique
+)
+from text_analytics import keyword_extractor
+from metrics import stage_duration
+from profiling import section
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# DataEntry columns read by the engine, in EntryColumns.append_rows order
+ENTRY_COLUMNS = ('id', 'source_type', 'target', 'source_url', 'collected_at', 'confidence_score', 'data')
+
+class EntryColumns:
+    """Entries held as parallel columns, in the order they were appended"""
+
+    def __init__(self):
+        self.ids = array('q')
+        self.source_types = []
+        self.targets = []
+        self.source_urls = []
+        self.collected_at = []
+        self.confidence = array('d')
+        self.data = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append_rows(self, rows):
+        """Append (id, source_type, target, source_url, collected_at, confidence_score, data) tuples"""
+        for entry_id, source_type, target, source_url, collected_at, confidence, data in rows:
+            self.ids.append(entry_id)
+            self.source_types.append(source_type)
+            self.targets.append(target)
+            self.source_urls.append(source_url)
+            self.collected_at.append(collected_at)
+            self.confidence.append(confidence if confidence is not None else 0.0)
+            self.data.append(data if data is not None else {})
+        return self
+
+def factorize(values):
+    """Dense integer codes for values, numbered in first-appearance order"""
+    code_of = {}
+    codes = array('q', [code_of.setdefault(value, len(code_of)) for value in values])
+    return codes, list(code_of)
+
+def group_count(codes, size):
+    """Number of rows per group"""
+    if numpy is not None:
+        return numpy.bincount(_int_array(codes), minlength=size).tolist()
+    counts = [0] * size
+    for code in codes:
+        counts[code] += 1
+    return counts
+
+def group_sum(codes, size, values):
+    """Sum of values per group, added in row order"""
+    if numpy is not None:
+        return numpy.bincount(_int_array(codes), weights=numpy.asarray(values, dtype=float), minlength=size).tolist()
+    sums = [0.0] * size
+    for code, value in zip(codes, values):
+        sums[code] += value
+    return sums
+
+def group_min_max(codes, size, values):
+    """(minimums, maximums) of values per group"""
+    if numpy is not None:
+        keys = _int_array(codes)
+        values = numpy.asarray(values, dtype=float)
+        minimums = numpy.full(size, numpy.inf)
+        maximums = numpy.full(size, -numpy.inf)
+        numpy.minimum.at(minimums, keys, values)
+        numpy.maximum.at(maximums, keys, values)
+        return minimums.tolist(), maximums.tolist()
+    minimums = [float('inf')] * size
+    maximums = [float('-inf')] * size
+    for code, value in zip(codes, values):
+        if value < minimums[code]:
+            minimums[code] = value
+        if value > maximums[code]:
+            maximums[code] = value
+    return minimums, maximums
+
+def pair_counts(first_codes, second_codes, second_size):
+    """Rows per (first, second) code pair, as (first, second, count) in first-appearance order"""
+    codes, pairs = factorize(first * second_size + second for first, second in zip(first_codes, second_codes))
+    return [(pair // second_size, pair % second_size, count) for pair, count in zip(pairs, group_count(codes, len(pairs)))]
+
+def _load_payload(value):
+    # Legacy text payloads may be empty or malformed; like get_data_dict(), read them as {}
+    try:
+        return json.loads(value) if value else {}
+    except ValueError:
+        return {}
+
+def _int_array(codes):
+    return numpy.frombuffer(codes, dtype=numpy.int64) if len(codes) else numpy.zeros(0, dtype=numpy.int64)
+
+def _netloc(url, cache):
+    # Entries for the same target share URLs, so parse each one once
+    netloc = cache.get(url)
+    if netloc is None:
+        netloc = cache[url] = urlparse(url).netloc
+    return netloc
+
+def _day_and_hour_codes(collected_at):
+    """Day ordinals and hours of the collection timestamps"""
+    if numpy is not None and collected_at:
+        stamps = numpy.array(collected_at, dtype='datetime64[us]')
+        days = stamps.astype('datetime64[D]').astype(numpy.int64)
+        hours = (stamps.astype('datetime64[h]').astype(numpy.int64) % 24).tolist()
+        # datetime64 days count from 1970-01-01, which is ordinal 719163
+        return (days + 719163).tolist(), hours
+    return [stamp.toordinal() for stamp in collected_at], [stamp.hour for stamp in collected_at]
+
+def build_state(columns, passes=ANALYSIS_PASSES):
+    """Analyze a batch of columns into a DataAnalyzer state"""
+    state = {'version': STATE_VERSION, 'entry_count': len(columns)}
+    source_codes, source_names = factorize(columns.source_types)
+    day_ordinals, hours = _day_and_hour_codes(columns.collected_at)
+    day_codes, day_values = factorize(day_ordinals)
+    day_names = [date.fromordinal(ordinal).isoformat() for ordinal in day_values]
+
+    if 'patterns' in passes:
+        with stage_duration.time(stage='analysis_patterns'):
+            state['patterns'] = _patterns(columns, source_codes, source_names, day_codes, day_names)
+    if 'correlations' in passes:
+        with stage_duration.time(stage='analysis_correlations'):
+            state['correlations'] = _correlations(columns, source_codes, source_names, hours)
+    if 'timeline' in passes:
+        with stage_duration.time(stage='analysis_timeline'):
+            state['timeline'] = _timeline(columns, source_codes, source_names, day_codes, day_names)
+    return state
+
+def analyze_rows(rows, passes=ANALYSIS_PASSES):
+    """Build a state from row tuples whose data may still be JSON text.
+    
+    Module-level and free of database access, so it can run in a worker
+    process; decoding the payloads there keeps that work off the caller.
+    """
+    rows = [
+        row[:-1] + (_load_payload(row[-1]) if isinstance(row[-1], str) else row[-1],)
+        for row in rows
+    ]
+    return build_state(EntryColumns().append_rows(rows), passes)
+
+@section('analysis.patterns')
+def _patterns(columns, source_codes, source_names, day_codes, day_names):
+    sources = len(source_names)
+    counts = group_count(source_codes, sources)
+    sums = group_sum(source_codes, sources, columns.confidence)
+    minimums, maximums = group_min_max(source_codes, sources, columns.confidence)
+    day_counts = group_count(day_codes, len(day_names))
+
+    patterns = {
+        'common_domains': {},
+        'common_ips': {},
+        'common_emails': {},
+        'source_reliability': {
+            name: {'sum': sums[code], 'count': counts[code], 'min': minimums[code], 'max': maximums[code]}
+            for code, name in enumerate(source_names)
+        },
+        'temporal_patterns': dict(zip(day_names, day_counts)),
+        'content_keywords': {},
+        'keyword_document_counts': {},
+        'text_documents': 0
+    }
+
+    # Payload fields still need one pass over the decoded documents
+    documents = []
+    netlocs = {}
+    for source_type, source_url, data_dict in zip(columns.source_types, columns.source_urls, columns.data):
+        if source_type == 'website':
+            if source_url:
+                domain = _netloc(source_url, netlocs)
+                if domain:
+                    _increment(patterns['common_domains'], domain)
+            if 'text_content' in data_dict:
+                documents.append((data_dict['text_content'], data_dict.get('language') or None))
+        elif source_type == 'dns' and 'A' in data_dict:
+            for ip in data_dict['A']:
+                _increment(patterns['common_ips'], ip)
+        if 'emails_found' in data_dict:
+            for email in data_dict['emails_found']:
+                _increment(patterns['common_emails'], email)
+
+    # Page text is tokenized as one batch
+    for keywords in keyword_extractor.keywords_many(documents):
+        _count_keywords(patterns, keywords)
+    return patterns
+
+@section('analysis.correlations')
+def _correlations(columns, source_codes, source_names, hours):
+    target_codes, target_names = factorize(columns.targets)
+    targets = len(target_names)
+    counts = group_count(target_codes, targets)
+    sums = group_sum(target_codes, targets, columns.confidence)
+    target_sources = [{} for _ in range(targets)]
+    for target, source, count in pair_counts(target_codes, source_codes, len(source_names)):
+        target_sources[target][source_names[source]] = count
+    source_hours = [{} for _ in source_names]
+    for source, hour, count in pair_counts(source_codes, hours, 24):
+        source_hours[source][str(hour)] = count
+    # The latest scores per target, in row order
+    target_scores = [[] for _ in range(targets)]
+    for target, score in zip(target_codes, columns.confidence):
+        target_scores[target].append(score)
+
+    correlations = {
+        'domain_ip_mapping': {},
+        'email_domain_mapping': {},
+        'temporal_correlations': dict(zip(source_names, source_hours)),
+        'target_groups': {
+            target: {
+                'source_counts': target_sources[code],
+                'count': counts[code],
+                'confidence_sum': sums[code],
+                'confidence_scores': target_scores[code][-TARGET_SCORE_LIMIT:]
+            }
+            for code, target in enumerate(target_names)
+        }
+    }
+
+    netlocs = {}
+    for source_type, target, source_url, data_dict in zip(columns.source_types, columns.targets, columns.source_urls, columns.data):
+        if source_type == 'dns' and 'A' in data_dict:
+            _extend_unique(correlations['domain_ip_mapping'].setdefault(target, []), data_dict['A'])
+        elif source_type == 'website' and 'emails_found' in data_dict and source_url:
+            domain = _netloc(source_url, netlocs)
+            for email in data_dict['emails_found']:
+                email_domain = email.split('@')[1] if '@' in email else ''
+                if email_domain:
+                    _extend_unique(correlations['email_domain_mapping'].setdefault(domain, []), [email_domain])
+    return correlations
+
+@section('analysis.timeline')
+def _timeline(columns, source_codes, source_names, day_codes, day_names):
+    days = len(day_names)
+    data_sizes = array('q', [len(str(data_dict)) for data_dict in columns.data])
+    errors = array('q', [1 if 'error' in data_dict else 0 for data_dict in columns.data])
+
+    # Collections per source type and day, in first-appearance order
+    day_sources = [{} for _ in range(days)]
+    for day, source, count in pair_counts(day_codes, source_codes, len(source_names)):
+        day_sources[day][source_names[source]] = count
+
+    totals = group_count(day_codes, days)
+    confidence_sums = group_sum(day_codes, days, columns.confidence)
+    size_sums = group_sum(day_codes, days, data_sizes)
+    error_counts = group_sum(day_codes, days, errors)
+
+    # Only the latest rows become events; ties keep the later row, as the stable sort does
+    collected_at = columns.collected_at
+    latest = heapq.nlargest(TIMELINE_EVENT_LIMIT, range(len(collected_at)), key=lambda index: (collected_at[index], index))
+    events = [
+        timeline_event(
+            collected_at[index], columns.source_types[index], columns.targets[index], columns.confidence[index],
+            data_sizes[index], bool(errors[index])
+        )
+        for index in reversed(latest)
+    ]
+    return {
+        'daily_summary': {
+            name: {
+                'total_collections': totals[code],
+                'source_counts': day_sources[code],
+                'confidence_sum': confidence_sums[code],
+                'total_data_size': int(size_sums[code]),
+                'errors': int(error_counts[code])
+            }
+            for code, name in enumerate(day_names)
+        },
+        'recent_events': events
+    }
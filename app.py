@@ -1,12 +1,42 @@
 import os
+import json
 import logging
+import multiprocessing
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+try:
+    import orjson
+except ImportError:  # optional, speeds up JSON column reads and writes
+    orjson = None
+
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+def json_dumps(value):
+    """Serialize a JSON column value, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(value)
+
+def json_loads(value):
+    """Decode a JSON column value, using orjson when it is installed.
+    
+    Columns that used to be TEXT can hold empty or malformed legacy values;
+    those decode to None, which get_*_dict() returns as {}.
+    """
+    if not value:
+        return None
+    try:
+        if orjson is not None:
+            return orjson.loads(value)
+        return json.loads(value)
+    except ValueError:
+        logger.warning("Ignoring malformed JSON column value")
+        return None
 
 class Base(DeclarativeBase):
     pass
@@ -23,18 +53,36 @@ app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:/
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
+    "json_serializer": json_dumps,
+    "json_deserializer": json_loads,
 }
 
 # Initialize the app with the extension
 db.init_app(app)
 
+# Per-route latency and status metrics, served at /metrics
+from metrics import init_app as init_metrics
+init_metrics(app)
+
+# Opt-in request profiling, read back from /admin/profiles
+from profiling import init_app as init_profiling
+init_profiling(app)
+
 with app.app_context():
     # Import models and routes
     import models
     import routes
     
-    # Create all tables
-    db.create_all()
+    # Batch analysis workers import the main module again (e.g. under
+    # `python app.py`); only the serving process touches the schema and jobs
+    if multiprocessing.parent_process() is None:
+        # Create all tables and any indexes missing from existing databases
+        from migrations import upgrade_schema
+        upgrade_schema()
+        
+        # Resume background jobs left queued by a previous process
+        from jobs import job_queue
+        job_queue.recover()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,133 @@
+"""Analysis of many investigations, or shards of large ones, in a process pool.
+
+The parent process reads entries in id-ordered shards with the JSON payload
+left undecoded and hands each shard to a worker process, which decodes it
+and builds a partial state with analytics_engine. Partial states are merged
+in shard order, never completion order, so the result is the same for any
+number of processes. Each investigation is saved as soon as its last shard
+has been merged.
+
+Workers are started by a forkserver (spawn where that is unavailable), never
+forked from the web process, so they inherit none of its threads' locks,
+database connections or sockets.
+"""
+import os
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import click
+from sqlalchemy import select, type_coerce, Text
+from app import app, db
+from models import Investigation, DataEntry
+from data_analyzer import DataAnalyzer
+from analytics_engine import ENTRY_COLUMNS, analyze_rows
+from jobs import job_queue, load_analysis_state, save_analysis
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_PROCESSES = int(os.environ.get('ANALYSIS_PROCESSES', '0')) or os.cpu_count() or 1
+SHARD_SIZE = int(os.environ.get('ANALYSIS_SHARD_SIZE', '20000'))
+
+def iter_shards(investigation_id, after_id=0, shard_size=SHARD_SIZE):
+    """Yield lists of entry tuples, data left as JSON text for the workers to decode"""
+    columns = [getattr(DataEntry, name) for name in ENTRY_COLUMNS if name != 'data']
+    query = select(*columns, type_coerce(DataEntry.data, Text)).where(
+        DataEntry.investigation_id == investigation_id
+    ).order_by(DataEntry.id).limit(shard_size)
+    while True:
+        # Each shard is its own keyset query, so results can be committed in between
+        rows = db.session.execute(query.where(DataEntry.id > after_id)).all()
+        if not rows:
+            return
+        yield [tuple(row) for row in rows]
+        after_id = rows[-1][0]
+
+def _pool_context():
+    """Multiprocessing context whose workers start from a clean process"""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # Preload only the analysis code; importing __main__ could start a second app
+        context.set_forkserver_preload(['analytics_engine'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+def run_batch_analysis(investigation_ids, rebuild=False, processes=None, shard_size=None):
+    """Analyze investigations in a process pool; returns {investigation_id: result}"""
+    processes = processes or ANALYSIS_PROCESSES
+    shard_size = shard_size or SHARD_SIZE
+    analyzer = DataAnalyzer()
+    results = {}
+    progress = {}
+    # (investigation_id, future, row count); a None future marks the last shard
+    pending = deque()
+
+    def merge_until(limit):
+        while len(pending) > limit:
+            investigation_id, future, count = pending.popleft()
+            record, state, watermark, new_entries = progress[investigation_id]
+            if future is None:
+                results[investigation_id] = save_analysis(
+                    analyzer, investigation_id, record, state, watermark, new_entries
+                )
+                del progress[investigation_id]
+                logger.info(f"Batch analysis saved investigation {investigation_id}")
+                continue
+            shard_state = future.result()
+            state = analyzer.merge_into(state, shard_state) if state['entry_count'] else shard_state
+            progress[investigation_id] = [record, state, watermark, new_entries + count]
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=_pool_context()) as pool:
+        for investigation_id in investigation_ids:
+            record, state, watermark = load_analysis_state(analyzer, investigation_id, rebuild)
+            progress[investigation_id] = [record, state, watermark, 0]
+            for rows in iter_shards(investigation_id, watermark.last_entry_id, shard_size):
+                # Entries folded in by an earlier run but not yet settled are skipped
+                rows = watermark.new_rows(rows)
+                if not rows:
+                    continue
+                pending.append((investigation_id, pool.submit(analyze_rows, rows), len(rows)))
+                # Bound the shards held in memory while keeping every process busy
+                merge_until(processes * 2)
+            pending.append((investigation_id, None, 0))
+        merge_until(0)
+
+    return results
+
+def _all_investigation_ids():
+    return [investigation_id for (investigation_id,) in db.session.execute(
+        select(Investigation.id).order_by(Investigation.id)
+    )]
+
+@job_queue.register('batch_analyze')
+def run_batch_analysis_job(investigation_id, payload):
+    """Job handler: analyze the listed investigations, or all of them"""
+    investigation_ids = payload.get('investigation_ids') or _all_investigation_ids()
+    results = run_batch_analysis(
+        investigation_ids,
+        rebuild=payload.get('rebuild', False),
+        processes=payload.get('processes'),
+        shard_size=payload.get('shard_size')
+    )
+    return {
+        'investigations': {str(key): value for key, value in results.items()},
+        'entries_analyzed': sum(result.get('entries_analyzed', 0) for result in results.values())
+    }
+
+@app.cli.command('analyze-batch')
+@click.argument('investigation_ids', nargs=-1, type=int)
+@click.option('--all', 'analyze_all', is_flag=True, help='Analyze every investigation.')
+@click.option('--rebuild', is_flag=True, help='Start from empty states instead of the stored ones.')
+@click.option('--processes', type=int, default=None, help='Worker processes (defaults to ANALYSIS_PROCESSES).')
+@click.option('--shard-size', type=int, default=None, help='Entries per shard (defaults to ANALYSIS_SHARD_SIZE).')
+def analyze_batch_command(investigation_ids, analyze_all, rebuild, processes, shard_size):
+    """Run analysis for several investigations in a process pool."""
+    if analyze_all:
+        investigation_ids = _all_investigation_ids()
+    if not investigation_ids:
+        raise click.UsageError('Pass investigation ids or --all')
+
+    results = run_batch_analysis(list(investigation_ids), rebuild, processes, shard_size)
+    for investigation_id, result in results.items():
+        click.echo(f"Investigation {investigation_id}: "
+                   f"{result.get('entries_analyzed', 0)} new entries, {result.get('message') or ', '.join(result['analyses'])}")
@@ -0,0 +1,103 @@
+"""Compare row-at-a-time DataAnalyzer folding with the columnar analytics engine.
+
+Usage: python benchmarks/analytics_benchmark.py [--sizes 10000 100000 1000000] [--output results.json]
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics_engine
+from analytics_engine import EntryColumns, build_state
+from data_analyzer import DataAnalyzer, ANALYSIS_PASSES
+from synthetic import synthetic_rows
+
+class Row:
+    """Stand-in for a loaded DataEntry"""
+    __slots__ = ('id', 'source_type', 'target', 'source_url', 'collected_at', 'confidence_score', 'data')
+
+    def __init__(self, values):
+        (self.id, self.source_type, self.target, self.source_url,
+         self.collected_at, self.confidence_score, self.data) = values
+
+    def get_data_dict(self):
+        return self.data
+
+def finalize(analyzer, state, analysis_pass):
+    result = getattr(analyzer, f'finalize_{analysis_pass}')(state)
+    result.pop('analysis_timestamp')
+    return result
+
+def same(first, second):
+    """Structural equality allowing for float summation order"""
+    if isinstance(first, float) or isinstance(second, float):
+        return math.isclose(first, second, rel_tol=1e-9, abs_tol=1e-12)
+    if isinstance(first, dict):
+        return first.keys() == second.keys() and all(same(first[key], second[key]) for key in first)
+    if isinstance(first, list):
+        return len(first) == len(second) and all(same(a, b) for a, b in zip(first, second))
+    return first == second
+
+def run(size, chunk_size):
+    analyzer = DataAnalyzer()
+    rows = list(synthetic_rows(size))
+    chunk_size = chunk_size or size
+    # Both sides get pre-materialized input; loading tuples instead of ORM objects is a further saving
+    entries = [Row(values) for values in rows]
+    chunks = [EntryColumns().append_rows(rows[offset:offset + chunk_size]) for offset in range(0, size, chunk_size)]
+    result = {'entries': size, 'chunk_size': chunk_size, 'passes': {}}
+
+    for analysis_pass in ANALYSIS_PASSES:
+        started = time.perf_counter()
+        row_state = analyzer.update_state(analyzer.new_state([analysis_pass]), entries)
+        row_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        column_state = None
+        for columns in chunks:
+            chunk = build_state(columns, [analysis_pass])
+            column_state = analyzer.merge_into(column_state, chunk) if column_state else chunk
+        column_seconds = time.perf_counter() - started
+
+        result['passes'][analysis_pass] = {
+            'row_seconds': round(row_seconds, 4),
+            'columnar_seconds': round(column_seconds, 4),
+            'speedup': round(row_seconds / column_seconds, 2) if column_seconds else None,
+            'identical_results': same(finalize(analyzer, row_state, analysis_pass),
+                                      finalize(analyzer, column_state, analysis_pass))
+        }
+
+    row_total = sum(item['row_seconds'] for item in result['passes'].values())
+    column_total = sum(item['columnar_seconds'] for item in result['passes'].values())
+    result['row_seconds'] = round(row_total, 4)
+    result['columnar_seconds'] = round(column_total, 4)
+    result['speedup'] = round(row_total / column_total, 2) if column_total else None
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--chunk-size', type=int, default=0, help='Entries per columnar chunk (default: all at once)')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {
+        'benchmark': 'analytics',
+        'numpy': analytics_engine.numpy is not None,
+        'runs': []
+    }
+    for size in args.sizes:
+        result = run(size, args.chunk_size)
+        results['runs'].append(result)
+        print(json.dumps(result), flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Measure ingest, analysis, export memory and page latency on a synthetic database.
+
+All sizes share one SQLite database in a temporary directory; each size is
+loaded into its own investigation, smallest first. Index rebuilds cover the
+whole database, so they include the rows of the smaller sizes.
+
+Usage: python benchmarks/app_benchmark.py [--sizes 1000 100000 1000000] [--no-index] [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from synthetic import synthetic_entries
+
+PAGES = (
+    ('investigation', '/investigation/{id}'),
+    ('entries_page', '/api/investigations/{id}/entries?limit=50'),
+    ('visualization_data', '/api/visualization_data/{id}'),
+    ('search', '/api/search?q=phishing&investigation_id={id}'),
+    ('dashboard', '/')
+)
+# Rows inserted through the ORM, so the entity, graph and search listeners run
+ORM_INGEST_ROWS = 2000
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+def load(db, DataEntry, investigation_id, size, batch_size=10000):
+    """Bulk insert synthetic entries, bypassing the ORM"""
+    batch = []
+    for row in synthetic_entries(size, investigation_id):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(DataEntry.__table__), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(DataEntry.__table__), batch)
+    db.session.commit()
+
+def orm_ingest(db, DataEntry, investigation_id):
+    entries = []
+    for row in synthetic_entries(ORM_INGEST_ROWS, investigation_id, seed=1):
+        entry = DataEntry(**{key: value for key, value in row.items() if key not in ('data', 'meta_data')})
+        entry.set_data_dict(row['data'])
+        entry.set_metadata_dict(row['meta_data'])
+        entries.append(entry)
+    db.session.add_all(entries)
+    db.session.commit()
+    db.session.expunge_all()
+
+def export_peak(investigation, generate):
+    """Peak traced memory and bytes produced while streaming one export"""
+    tracemalloc.start()
+    size = 0
+    try:
+        for chunk in generate(investigation):
+            size += len(chunk)
+        return tracemalloc.get_traced_memory()[1], size
+    finally:
+        tracemalloc.stop()
+
+def page_latency(client, path, repeat):
+    samples = []
+    status = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - started)
+        status = response.status_code
+    return {'status': status, 'median_seconds': round(statistics.median(samples), 4), 'max_seconds': round(max(samples), 4)}
+
+def run(size, index, repeat):
+    from app import app, db
+    from models import Investigation, DataEntry
+    from jobs import run_analysis
+    from exporters import EXPORT_FORMATS
+    import entities
+    import entity_graph
+    import search_index
+
+    result = {'entries': size}
+    with app.app_context():
+        investigation = Investigation(name=f'benchmark {size}')
+        db.session.add(investigation)
+        db.session.commit()
+        investigation_id = investigation.id
+
+        result['bulk_load_seconds'] = round(timed(load, db, DataEntry, investigation_id, size)[0], 4)
+        if index:
+            result['index_seconds'] = {
+                'entities': round(timed(entities.rebuild_entities)[0], 4),
+                'graph': round(timed(entity_graph.rebuild_graph)[0], 4),
+                'search': round(timed(search_index.rebuild_search_index)[0], 4)
+            }
+        seconds, _ = timed(orm_ingest, db, DataEntry, investigation_id)
+        result['orm_ingest_rows_per_second'] = round(ORM_INGEST_ROWS / seconds, 1)
+
+        seconds, analysis = timed(run_analysis, investigation_id, {'rebuild': True})
+        result['analysis_seconds'] = round(seconds, 4)
+        result['analysis_entries'] = analysis.get('total_entries')
+
+        investigation = db.session.get(Investigation, investigation_id)
+        result['export'] = {}
+        for name, (generate, _, _) in EXPORT_FORMATS.items():
+            started = time.perf_counter()
+            peak, produced = export_peak(investigation, generate)
+            result['export'][name] = {
+                'seconds': round(time.perf_counter() - started, 4),
+                'peak_memory_bytes': peak,
+                'output_bytes': produced
+            }
+        db.session.remove()
+
+    client = app.test_client()
+    result['pages'] = {
+        name: page_latency(client, path.format(id=investigation_id), repeat) for name, path in PAGES
+    }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--no-index', action='store_true', help='Skip building the entity, graph and search indexes')
+    parser.add_argument('--repeat', type=int, default=5, help='Requests per page latency measurement')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    # The app reads its configuration when it is first imported
+    directory = tempfile.mkdtemp(prefix='osint-benchmark-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'benchmark.db')}"
+    os.environ['JOB_WORKERS'] = '0'
+    logging.disable(logging.INFO)
+
+    results = {'benchmark': 'app', 'database': 'sqlite', 'runs': []}
+    try:
+        for size in sorted(args.sizes):
+            result = run(size, not args.no_index, args.repeat)
+            results['runs'].append(result)
+            print(json.dumps(result), flush=True)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    return results
+
+if __name__ == '__main__':
+    main()
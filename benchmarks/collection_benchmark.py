@@ -0,0 +1,98 @@
+"""Measure OSINTCollector throughput against the local fake internet.
+
+Usage: python benchmarks/collection_benchmark.py [--targets 200] [--concurrency 32] [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_internet import FakeInternet
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def scenarios(internet, count):
+    """(name, source_type, targets) for every scenario"""
+    return [
+        ('website_healthy', 'website', [f"{internet.healthy_url}/page/{index}" for index in range(count)]),
+        ('website_slow', 'website', [f"{internet.slow_url}/page/{index}" for index in range(count)]),
+        ('website_failing_then_ok', 'website', [f"{internet.failing_url}/page/{index}" for index in range(count)]),
+        ('dns', 'dns', [f"host{index}.example.test" for index in range(count)]),
+        ('dns_nxdomain', 'dns', [f"nx{index}.example.test" for index in range(count)]),
+        ('dns_timeout', 'dns', [f"drop{index}.example.test" for index in range(max(count // 10, 1))])
+    ]
+
+def run_scenario(collector, source_type, targets, concurrency):
+    latencies = []
+    errors = 0
+
+    def collect(target):
+        started = time.perf_counter()
+        result = dict(collector.collect_many([source_type], target, force_refresh=True))[source_type]
+        return time.perf_counter() - started, 'error' in result
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, failed in executor.map(collect, targets):
+            latencies.append(latency)
+            errors += failed
+    elapsed = time.perf_counter() - started
+    return {
+        'targets': len(targets),
+        'seconds': round(elapsed, 4),
+        'targets_per_second': round(len(targets) / elapsed, 2) if elapsed else None,
+        'latency_p50': round(percentile(latencies, 0.5), 4),
+        'latency_p95': round(percentile(latencies, 0.95), 4),
+        'latency_max': round(max(latencies), 4),
+        'errors': errors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', type=int, default=200, help='Targets per scenario')
+    parser.add_argument('--concurrency', type=int, default=32, help='Targets collected at once')
+    parser.add_argument('--slow-delay', type=float, default=0.2, help='Seconds the slow host waits per response')
+    parser.add_argument('--scenarios', nargs='+', help='Only run these scenarios')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    with FakeInternet(slow_delay=args.slow_delay) as internet:
+        # The resolver is created on first use, so point it at the stub server first
+        os.environ['DNS_RESOLVER'] = internet.nameserver
+        os.environ['DNS_TIMEOUT'] = '0.5'
+        from osint_sources import OSINTCollector
+        from request_scheduler import RequestScheduler
+
+        # Rate limits are lifted so the benchmark measures the collectors, not the politeness policy
+        scheduler = RequestScheduler(rate=1e6, burst=10 ** 6, concurrency=args.concurrency, backoff_base=0.01)
+        collector = OSINTCollector(cache=None, scheduler=scheduler)
+
+        results = {
+            'benchmark': 'collection',
+            'concurrency': args.concurrency,
+            'slow_delay': args.slow_delay,
+            'scenarios': {}
+        }
+        for name, source_type, targets in scenarios(internet, args.targets):
+            if args.scenarios and name not in args.scenarios:
+                continue
+            result = run_scenario(collector, source_type, targets, args.concurrency)
+            results['scenarios'][name] = result
+            print(json.dumps(dict(result, scenario=name)), flush=True)
+        results['scheduler'] = scheduler.stats()
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Local stand-ins for the hosts collectors talk to.
+
+FakeInternet starts, on loopback addresses:
+
+- a healthy web server on 127.0.0.1 serving synthetic HTML pages
+- a slow web server on 127.0.0.2 that waits before every response
+- a failing web server on 127.0.0.3 that answers 503 with Retry-After
+  for the first attempt at each path and 200 afterwards
+- a stub DNS server answering A/AAAA/MX/TXT/NS/CNAME queries for any name,
+  NXDOMAIN for names starting with ``nx``, and nothing at all (a timeout)
+  for names starting with ``drop``
+
+Pages and records are derived from the requested name, so every run sees the
+same internet.
+"""
+import time
+import random
+import struct
+import threading
+import socketserver
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WORDS = (
+    'security breach phishing domain registrar hosting malware campaign infrastructure '
+    'certificate server network payload credential account password admin portal login'
+).split()
+
+QTYPES = {1: 'A', 2: 'NS', 5: 'CNAME', 15: 'MX', 16: 'TXT', 28: 'AAAA'}
+
+def synthetic_page(path, paragraphs=20):
+    """HTML page whose text is seeded by its path"""
+    rng = random.Random(path)
+    title = ' '.join(rng.choices(WORDS, k=3)).title()
+    body = ''.join(
+        f"<p>{' '.join(rng.choices(WORDS, k=rng.randrange(30, 80)))}</p>" for _ in range(paragraphs)
+    )
+    contact = f"<p>Contact {rng.choice(WORDS)}@example.test for details.</p>"
+    return (
+        f"<html><head><title>{title}</title><meta name=\"description\" content=\"{title} page\"></head>"
+        f"<body><article><h1>{title}</h1>{body}{contact}</article></body></html>"
+    ).encode('utf-8')
+
+class _PageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0.0
+    fail_first = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_first:
+            with self.server.lock:
+                seen = self.path in self.server.seen
+                self.server.seen.add(self.path)
+            if not seen:
+                self.send_response(503)
+                self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+        body = synthetic_page(self.path)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def _encode_name(name):
+    return b''.join(bytes([len(label)]) + label.encode('ascii') for label in name.rstrip('.').split('.') if label) + b'\x00'
+
+def dns_answer(query):
+    """Build the stub server's response to a wire-format query, or None to drop it"""
+    query_id, flags = struct.unpack('!HH', query[:4])
+    offset = 12
+    labels = []
+    while query[offset]:
+        length = query[offset]
+        labels.append(query[offset + 1:offset + 1 + length].decode('ascii'))
+        offset += 1 + length
+    qtype, = struct.unpack('!H', query[offset + 1:offset + 3])
+    question = query[12:offset + 5]
+    name = '.'.join(labels).lower()
+
+    if name.startswith('drop'):
+        return None
+    if name.startswith('nx'):
+        return struct.pack('!HHHHHH', query_id, 0x8183, 1, 0, 0, 0) + question
+
+    rng = random.Random(name)
+    rdatas = []
+    record_type = QTYPES.get(qtype)
+    if record_type == 'A':
+        rdatas = [bytes([127, 0, 0, 1])] + [bytes([192, 0, 2, rng.randrange(1, 255)])]
+    elif record_type == 'AAAA':
+        rdatas = [bytes(15) + b'\x01']
+    elif record_type == 'MX':
+        rdatas = [struct.pack('!H', 10) + _encode_name(f"mail.{name}")]
+    elif record_type == 'NS':
+        rdatas = [_encode_name(f"ns{index}.dns.test") for index in (1, 2)]
+    elif record_type == 'TXT':
+        text = f"v=spf1 include:{rng.choice(WORDS)}.test -all".encode('ascii')
+        rdatas = [bytes([len(text)]) + text]
+
+    answers = b''.join(
+        # 0xC00C points back at the question name
+        struct.pack('!HHHIH', 0xC00C, qtype, 1, 300, len(rdata)) + rdata for rdata in rdatas
+    )
+    return struct.pack('!HHHHHH', query_id, 0x8180, 1, len(rdatas), 0, 0) + question + answers
+
+class _DNSHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        try:
+            response = dns_answer(data)
+        except (IndexError, struct.error):
+            return
+        if response is not None:
+            sock.sendto(response, self.client_address)
+
+class _ThreadingUDPServer(socketserver.ThreadingMixIn, socketserver.UDPServer):
+    daemon_threads = True
+
+class FakeInternet:
+    """Start and stop the fake hosts; use as a context manager"""
+
+    def __init__(self, slow_delay=0.2):
+        self.slow_delay = slow_delay
+        self.servers = []
+
+    def _web_server(self, address, **attributes):
+        handler = type('PageHandler', (_PageHandler,), attributes)
+        server = ThreadingHTTPServer((address, 0), handler)
+        server.daemon_threads = True
+        server.lock = threading.Lock()
+        server.seen = set()
+        self.servers.append(server)
+        return f"http://{address}:{server.server_port}"
+
+    def start(self):
+        self.healthy_url = self._web_server('127.0.0.1')
+        self.slow_url = self._web_server('127.0.0.2', delay=self.slow_delay)
+        self.failing_url = self._web_server('127.0.0.3', fail_first=True)
+        dns_server = _ThreadingUDPServer(('127.0.0.1', 0), _DNSHandler)
+        self.servers.append(dns_server)
+        self.nameserver = f"127.0.0.1:{dns_server.server_address[1]}"
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.servers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,109 @@
+"""Run every benchmark and write one machine-readable results file.
+
+Each suite runs in its own interpreter, because the app and the DNS resolver
+read their configuration when first imported. The combined file records the
+environment next to the results; with --baseline, timings that got slower
+than the threshold are listed and the exit status is 1.
+
+Usage: python benchmarks/run_all.py [--quick] [--output results.json] [--baseline previous.json] [--threshold 0.2]
+"""
+import os
+import sys
+import json
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+SUITES = {
+    'analytics': ('analytics_benchmark.py', ['--sizes', '10000', '100000', '1000000'], ['--sizes', '1000', '10000']),
+    'collection': ('collection_benchmark.py', [], ['--targets', '50']),
+    'app': ('app_benchmark.py', ['--sizes', '1000', '100000', '1000000'], ['--sizes', '1000', '10000'])
+}
+
+# Keys whose values are durations; a larger value is a regression
+TIMING_SUFFIXES = ('seconds', 'latency_p50', 'latency_p95')
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=DIRECTORY, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'git_commit': commit,
+        'started_at': datetime.utcnow().isoformat()
+    }
+
+def run_suite(script, arguments):
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'results.json')
+        subprocess.run([sys.executable, os.path.join(DIRECTORY, script), *arguments, '--output', output], check=True)
+        with open(output) as handle:
+            return json.load(handle)
+
+def flatten(value, prefix=''):
+    """Map dotted paths to the numbers in a nested result"""
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        # Runs are identified by their size rather than their position
+        items = ((str(item.get('entries', item.get('size', index))) if isinstance(item, dict) else str(index), item)
+                 for index, item in enumerate(value))
+    else:
+        return {prefix: value} if isinstance(value, (int, float)) and not isinstance(value, bool) else {}
+    flat = {}
+    for key, item in items:
+        flat.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+    return flat
+
+def compare(results, baseline, threshold):
+    """Timings at least ``threshold`` slower than in the baseline"""
+    current = flatten(results['suites'])
+    previous = flatten(baseline.get('suites', {}))
+    regressions = []
+    for path, value in sorted(current.items()):
+        before = previous.get(path)
+        if not path.endswith(TIMING_SUFFIXES) or not before:
+            continue
+        change = (value - before) / before
+        if change > threshold:
+            regressions.append({'metric': path, 'baseline': before, 'current': value, 'change': round(change, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--suites', nargs='+', choices=sorted(SUITES), default=sorted(SUITES))
+    parser.add_argument('--quick', action='store_true', help='Use small sizes, for a smoke run')
+    parser.add_argument('--output', default='benchmark-results.json', help='Combined results file')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    results = {'environment': environment(), 'quick': args.quick, 'suites': {}}
+    for name in args.suites:
+        script, full, quick = SUITES[name]
+        print(f"== {name}", flush=True)
+        results['suites'][name] = run_suite(script, quick if args.quick else full)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            results['regressions'] = compare(results, json.load(handle), args.threshold)
+        for regression in results['regressions']:
+            print(f"REGRESSION {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+                  f"({regression['change']:+.0%})")
+
+    with open(args.output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f"Results written to {args.output}")
+    return 1 if results.get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Synthetic DataEntry rows shaped like the collectors' output, seeded so runs are reproducible."""
+import random
+from datetime import datetime, timedelta
+
+WORDS = (
+    'security breach phishing domain registrar hosting malware campaign infrastructure '
+    'certificate server network payload credential account password admin portal login '
+    'company report analysis threat actor group email address contact support service'
+).split()
+
+SOURCE_WEIGHTS = (('website', 4), ('dns', 3), ('whois', 1), ('email', 1), ('ip', 1))
+
+def synthetic_rows(count, seed=0, investigation_id=1, targets=None, days=90):
+    """Yield (id, source_type, target, source_url, collected_at, confidence_score, data) tuples"""
+    rng = random.Random(seed)
+    sources = [name for name, weight in SOURCE_WEIGHTS for _ in range(weight)]
+    targets = targets or max(count // 20, 1)
+    start = datetime(2024, 1, 1)
+    for index in range(count):
+        source_type = rng.choice(sources)
+        domain = f"target{rng.randrange(targets)}.example.com"
+        collected_at = start + timedelta(seconds=rng.randrange(days * 86400), microseconds=rng.randrange(1000000))
+        if source_type == 'website':
+            source_url = f"https://{domain}/"
+            data = {
+                'title': f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}",
+                'text_content': ' '.join(rng.choices(WORDS, k=rng.randrange(20, 120))),
+                'emails_found': [f"{rng.choice(WORDS)}@{domain}" for _ in range(rng.randrange(3))],
+                'status_code': 200
+            }
+            confidence = 0.8
+        elif source_type == 'dns':
+            source_url = f"dns://{domain}"
+            data = {
+                'A': [f"192.0.2.{rng.randrange(1, 255)}" for _ in range(rng.randrange(1, 3))],
+                'MX': [f"10 mail.{domain}"],
+                'NS': [f"ns1.{domain}"]
+            }
+            confidence = 0.9 if rng.random() < 0.9 else 0.2
+        elif source_type == 'whois':
+            source_url = f"whois://{domain}"
+            data = {'domain': domain, 'status': 'active'}
+            confidence = 0.5
+        elif source_type == 'email':
+            source_url = f"email://admin@{domain}"
+            data = {'email': f"admin@{domain}", 'domain': domain, 'valid_format': True}
+            confidence = 0.7
+        else:
+            source_url = f"ip://192.0.2.{rng.randrange(1, 255)}"
+            data = {'ip_address': source_url[5:], 'type': 'IPv4', 'hostname': domain}
+            confidence = 0.8
+        if rng.random() < 0.02:
+            data = {'error': 'Connection timed out'}
+            confidence = 0.0
+        yield (index + 1, source_type, domain, source_url, collected_at, confidence, data)
+
+def synthetic_entries(count, investigation_id=1, seed=0, days=90):
+    """Yield DataEntry column dicts, ready for a bulk insert into the data_entry table"""
+    for _, source_type, target, source_url, collected_at, confidence, data in synthetic_rows(count, seed, investigation_id, days=days):
+        yield {
+            'investigation_id': investigation_id,
+            'source_type': source_type,
+            'target': target,
+            'source_url': source_url,
+            'data': data,
+            'meta_data': {'collection_time': collected_at.isoformat(), 'method': 'synthetic'},
+            'collected_at': collected_at,
+            'confidence_score': confidence
+        }
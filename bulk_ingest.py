@@ -0,0 +1,183 @@
+import csv
+import json
+import ipaddress
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from itertools import islice
+import click
+from app import app, db
+from models import Investigation, DataEntry
+from osint_sources import OSINTCollector
+from collectors import source_types as registered_source_types
+from metrics import stage_duration
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SOURCE_TYPES = registered_source_types()
+DEFAULT_CONCURRENCY = 8
+DEFAULT_BATCH_SIZE = 200
+MAX_CONCURRENCY = 32
+
+def infer_source_types(target):
+    """Pick sensible source types for a target when none were requested"""
+    try:
+        ipaddress.ip_address(target)
+        return ['ip']
+    except ValueError:
+        pass
+
+    if '@' in target:
+        return ['email']
+    if target.startswith(('http://', 'https://')):
+        return ['website']
+    return ['dns', 'whois']
+
+def parse_targets(content, source_types=None):
+    """Parse a newline-delimited or CSV target list.
+
+    CSV input may carry a header with a ``target`` column and an optional
+    ``source_types`` column (source types separated by ``;``). Plain lines are
+    treated as one target each. Blank lines and ``#`` comments are skipped.
+    Returns a list of (target, source_types) tuples with duplicates removed.
+    """
+    lines = [line for line in content.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+    if not lines:
+        return []
+
+    rows = []
+    header = [column.strip().lower() for column in next(csv.reader([lines[0]]))]
+    if 'target' in header:
+        target_index = header.index('target')
+        types_index = header.index('source_types') if 'source_types' in header else None
+        for record in csv.reader(lines[1:]):
+            if len(record) <= target_index:
+                continue
+            row_types = None
+            if types_index is not None and len(record) > types_index and record[types_index].strip():
+                row_types = [t.strip() for t in record[types_index].split(';') if t.strip()]
+            rows.append((record[target_index], row_types))
+    else:
+        for line in lines:
+            # Accept a bare CSV line by taking its first column
+            rows.append((next(csv.reader([line]))[0], None))
+
+    targets = []
+    seen = set()
+    for target, row_types in rows:
+        target = target.strip()
+        if not target:
+            continue
+        chosen = row_types or source_types or infer_source_types(target)
+        chosen = [t for t in chosen if t in SUPPORTED_SOURCE_TYPES]
+        key = (target, tuple(chosen))
+        if chosen and key not in seen:
+            seen.add(key)
+            targets.append((target, chosen))
+    return targets
+
+def bulk_collect(investigation_id, targets, max_concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE,
+                 force_refresh=False):
+    """Collect many targets for one investigation, yielding progress events.
+
+    Targets are collected with bounded concurrency and the resulting rows are
+    committed in batches. Each yielded event is a JSON-serializable dict; the
+    last one has ``event == 'done'``. Only about twice max_concurrency targets
+    are in flight at once, and closing the generator early (a client
+    disconnecting) cancels the queued ones and commits what was collected.
+    """
+    investigation = db.session.get(Investigation, investigation_id)
+    if investigation is None:
+        raise ValueError(f"Investigation {investigation_id} not found")
+
+    total = len(targets)
+    completed = 0
+    stored = 0
+    failed = 0
+    pending = []
+
+    yield {'event': 'started', 'investigation_id': investigation_id, 'total': total}
+
+    collector = OSINTCollector()
+    workers = max(1, max_concurrency)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    remaining = iter(targets)
+    futures = {}
+    try:
+        while True:
+            # Submit through a bounded window; each result is dropped once it is buffered
+            for target, source_types in islice(remaining, workers * 2 - len(futures)):
+                futures[executor.submit(collector.collect_many, source_types, target, force_refresh)] = target
+            if not futures:
+                break
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                target = futures.pop(future)
+                completed += 1
+                errors = []
+                try:
+                    for source_type, data in future.result():
+                        entry = DataEntry(
+                            investigation_id=investigation_id,
+                            source_type=source_type,
+                            target=target,
+                            source_url=data.get('source_url', ''),
+                            confidence_score=data.get('confidence_score', 0.0)
+                        )
+                        entry.set_data_dict(data.get('data', {}))
+                        entry.set_metadata_dict(data.get('metadata', {}))
+                        pending.append(entry)
+                        if data.get('error'):
+                            errors.append(source_type)
+                except Exception as e:
+                    logger.error(f"Bulk collection failed for {target}: {str(e)}")
+                    errors.append(str(e))
+                    failed += 1
+
+                if len(pending) >= batch_size:
+                    stored += _flush(pending)
+
+                yield {
+                    'event': 'progress',
+                    'target': target,
+                    'completed': completed,
+                    'total': total,
+                    'stored': stored,
+                    'errors': errors
+                }
+    finally:
+        # Also runs when the consumer stops early: drop what was queued, keep what was collected
+        executor.shutdown(wait=False, cancel_futures=True)
+        if pending:
+            stored += _flush(pending)
+
+    investigation = db.session.get(Investigation, investigation_id)
+    investigation.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    yield {'event': 'done', 'completed': completed, 'total': total, 'stored': stored, 'failed': failed}
+
+def _flush(pending):
+    """Insert a batch of entries in a single commit and clear the buffer"""
+    count = len(pending)
+    with stage_duration.time(stage='db_write'):
+        db.session.add_all(pending)
+        db.session.commit()
+    # Committed rows are not needed again; keep the identity map small
+    db.session.expunge_all()
+    pending.clear()
+    return count
+
+@app.cli.command('bulk-collect')
+@click.argument('investigation_id', type=int)
+@click.argument('targets_file', type=click.File('r'))
+@click.option('--sources', default='', help='Comma-separated source types (inferred per target when omitted)')
+@click.option('--concurrency', default=DEFAULT_CONCURRENCY, show_default=True, help='Targets collected at once')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help='Entries per database commit')
+@click.option('--force-refresh', is_flag=True, help='Ignore cached lookups')
+def bulk_collect_command(investigation_id, targets_file, sources, concurrency, batch_size, force_refresh):
+    """Collect a newline-delimited or CSV target list into an investigation"""
+    source_types = [s.strip() for s in sources.split(',') if s.strip()] or None
+    targets = parse_targets(targets_file.read(), source_types)
+    for event in bulk_collect(investigation_id, targets, concurrency, batch_size, force_refresh):
+        click.echo(json.dumps(event))
@@ -0,0 +1,119 @@
+import os
+import socket
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from dns_resolver import get_resolver, DNSError
+import profiling
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose sockets use TCP keep-alive, so idle pooled connections survive NAT timeouts"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        super().init_poolmanager(*args, **kwargs)
+
+class CollectionEngine:
+    """Process-wide executors and HTTP connection pool for collectors.
+
+    Every OSINTCollector shares the worker pools for source lookups (one per
+    collector concurrency class) and one requests Session whose per-host
+    connection pools are kept alive between requests and targets. Retries are left to the request scheduler, and
+    host name lookups by collectors go through the caching DNS resolver.
+    """
+
+    def __init__(self, workers=64, cpu_workers=None, pool_connections=100, pool_maxsize=10, pool_block=False):
+        self.workers = workers
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
+        # I/O-bound lookups get many threads; parse-heavy work shares a few so it cannot crowd them out
+        self.executors = {
+            'io': ThreadPoolExecutor(max_workers=workers, thread_name_prefix='collect-io'),
+            'cpu': ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix='collect-cpu')
+        }
+        self.adapter = KeepAliveAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.lock = threading.Lock()
+        self.submitted = {name: 0 for name in self.executors}
+
+    def submit(self, func, *args, concurrency='io', **kwargs):
+        """Run a lookup on the worker pool for its concurrency class and return its future"""
+        executor = self.executors[concurrency]
+        with self.lock:
+            self.submitted[concurrency] += 1
+        if profiling.active():
+            # Run under the caller's context so the call is recorded in its profile
+            return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+        return executor.submit(func, *args, **kwargs)
+
+    def run_cpu(self, func, *args, **kwargs):
+        """Run a parse step on the cpu pool and wait for its result.
+        
+        Lets io lookups hand off their CPU-heavy part, so at most cpu_workers
+        such steps run at once however many fetches are in flight. Must not
+        be called from a cpu worker, which could deadlock the pool.
+        """
+        return self.submit(func, *args, concurrency='cpu', **kwargs).result()
+
+    def resolve_ip(self, name):
+        """First IPv4 address of a host name from the caching resolver, or None.
+
+        Names the resolver has no address for fall back to the system
+        resolver, which also consults the hosts file.
+        """
+        try:
+            answer = get_resolver().resolve_many(name, ['A'])['A']
+            if answer['records']:
+                return answer['records'][0]
+        except (DNSError, OSError) as e:
+            logger.debug(f"Resolver lookup failed for {name}: {str(e)}")
+        try:
+            return socket.gethostbyname(name)
+        except OSError:
+            return None
+
+    def stats(self):
+        """Worker and connection pool usage"""
+        pools = self.adapter.poolmanager.pools
+        hosts = {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': pool.pool.qsize() if pool.pool is not None else 0
+            }
+        with self.lock:
+            submitted = dict(self.submitted)
+        return {
+            'workers': {'io': self.workers, 'cpu': self.cpu_workers},
+            'queued_tasks': {name: executor._work_queue.qsize() for name, executor in self.executors.items()},
+            'submitted_tasks': submitted,
+            'pool_maxsize': self.adapter._pool_maxsize,
+            'hosts': hosts
+        }
+
+collection_engine = CollectionEngine(
+    workers=int(os.environ.get('COLLECTION_WORKERS', '64')),
+    cpu_workers=int(os.environ.get('COLLECTION_CPU_WORKERS', '0')) or None,
+    pool_connections=int(os.environ.get('HTTP_POOL_CONNECTIONS', '100')),
+    pool_maxsize=int(os.environ.get('HTTP_POOL_MAXSIZE', '10')),
+    pool_block=os.environ.get('HTTP_POOL_BLOCK', '').lower() in ('1', 'true', 'yes')
+)
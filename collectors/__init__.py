@@ -0,0 +1,60 @@
+"""Registry of collector modules, one per source type.
+
+A collector module defines ``collect(collector, target)`` returning the
+standard result dict (raising on failure), plus:
+
+- ``CONCURRENCY``: ``'io'`` for lookups that mostly wait on the network,
+  ``'cpu'`` for ones dominated by parsing; the collection engine runs each
+  class on its own executor. An ``'io'`` lookup with a heavy parse step
+  hands that step to the cpu executor with ``collector.engine.run_cpu()``
+- ``TIMEOUT``: wall-clock budget in seconds when several sources are
+  collected at once, counted from when the lookup starts on a worker
+- ``CACHE_TTL``: seconds a successful result stays in the result cache, or
+  None to never cache it. A result may also carry ``cache_ttl`` to shorten
+  that for itself, for example to its DNS TTL; 0 keeps it out of the cache
+
+Modules are imported on first use, so heavy dependencies such as
+trafilatura only load in processes that actually collect websites.
+"""
+import threading
+from importlib import import_module
+
+CONCURRENCY_CLASSES = ('io', 'cpu')
+
+_MODULES = {
+    'website': 'collectors.website',
+    'dns': 'collectors.dns',
+    'whois': 'collectors.whois',
+    'social_media': 'collectors.social_media',
+    'email': 'collectors.email',
+    'ip': 'collectors.ip'
+}
+_loaded = {}
+_lock = threading.Lock()
+
+def register(source_type, module_path):
+    """Add or replace the module serving a source type"""
+    with _lock:
+        _MODULES[source_type] = module_path
+        _loaded.pop(source_type, None)
+
+def source_types():
+    """Registered source types, without importing their modules"""
+    return list(_MODULES)
+
+def get_collector(source_type):
+    """The collector module for a source type, imported on first use"""
+    module = _loaded.get(source_type)
+    if module is not None:
+        return module
+    if source_type not in _MODULES:
+        raise ValueError(f"Unsupported source type: {source_type}")
+
+    with _lock:
+        module = _loaded.get(source_type)
+        if module is None:
+            module = import_module(_MODULES[source_type])
+            if getattr(module, 'CONCURRENCY', None) not in CONCURRENCY_CLASSES or not callable(getattr(module, 'collect', None)):
+                raise ValueError(f"Collector module {module.__name__} does not declare collect() and CONCURRENCY")
+            _loaded[source_type] = module
+        return module
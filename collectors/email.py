@@ -0,0 +1,33 @@
+"""Email address format and domain checks"""
+from datetime import datetime
+
+CONCURRENCY = 'io'
+TIMEOUT = 10
+CACHE_TTL = None
+
+def collect(collector, email):
+    """Collect email-related information"""
+    try:
+        email_info = {
+            'email': email,
+            'domain': email.split('@')[1] if '@' in email else '',
+            'local_part': email.split('@')[0] if '@' in email else email,
+            'valid_format': '@' in email and '.' in email.split('@')[1] if '@' in email else False
+        }
+
+        # Check if domain exists
+        if email_info['domain']:
+            email_info['domain_exists'] = collector.engine.resolve_ip(email_info['domain']) is not None
+
+        return {
+            'source_url': f"email://{email}",
+            'data': email_info,
+            'metadata': {
+                'collection_time': datetime.utcnow().isoformat(),
+                'method': 'email_analysis'
+            },
+            'confidence_score': 0.7 if email_info['valid_format'] else 0.2
+        }
+
+    except Exception as e:
+        raise Exception(f"Email data collection failed: {str(e)}")
@@ -0,0 +1,42 @@
+"""IP address reverse DNS and validation"""
+import socket
+from datetime import datetime
+
+CONCURRENCY = 'io'
+TIMEOUT = 10
+CACHE_TTL = 24 * 60 * 60
+
+def collect(collector, ip):
+    """Collect IP address information"""
+    try:
+        ip_info = {
+            'ip_address': ip,
+            'type': 'IPv4' if '.' in ip else 'IPv6' if ':' in ip else 'Unknown'
+        }
+
+        # Try reverse DNS lookup
+        try:
+            hostname = socket.gethostbyaddr(ip)[0]
+            ip_info['hostname'] = hostname
+        except:
+            ip_info['hostname'] = 'No reverse DNS'
+
+        # Basic IP validation
+        try:
+            socket.inet_aton(ip)  # IPv4 validation
+            ip_info['valid_ipv4'] = True
+        except:
+            ip_info['valid_ipv4'] = False
+
+        return {
+            'source_url': f"ip://{ip}",
+            'data': ip_info,
+            'metadata': {
+                'collection_time': datetime.utcnow().isoformat(),
+                'method': 'ip_analysis'
+            },
+            'confidence_score': 0.8 if ip_info.get('valid_ipv4') else 0.4
+        }
+
+    except Exception as e:
+        raise Exception(f"IP data collection failed: {str(e)}")
@@ -0,0 +1,46 @@
+"""Public social media profile checks"""
+from datetime import datetime
+
+CONCURRENCY = 'io'
+TIMEOUT = 10
+# Profiles appear and disappear, so results are never cached
+CACHE_TTL = None
+
+def collect(collector, query):
+    """Collect social media information (public data only)"""
+    try:
+        # This is a placeholder for social media data collection
+        # In a real implementation, you would use official APIs
+        social_info = {
+            'query': query,
+            'platforms_searched': ['Twitter', 'LinkedIn', 'GitHub'],
+            'note': 'Social media data collection requires API keys and proper authentication',
+            'public_mentions': [],
+            'profiles_found': []
+        }
+
+        # For demonstration, we'll search for GitHub profiles
+        try:
+            github_url = f"https://github.com/{query}"
+            response = collector.scheduler.request(collector.session, 'GET', github_url, timeout=5)
+            if response.status_code == 200:
+                social_info['github_profile'] = github_url
+                social_info['github_exists'] = True
+            else:
+                social_info['github_exists'] = False
+        except:
+            social_info['github_exists'] = False
+
+        return {
+            'source_url': f"social://{query}",
+            'data': social_info,
+            'metadata': {
+                'collection_time': datetime.utcnow().isoformat(),
+                'method': 'social_media_search',
+                'note': 'Limited implementation - requires API access for full functionality'
+            },
+            'confidence_score': 0.3
+        }
+
+    except Exception as e:
+        raise Exception(f"Social media data collection failed: {str(e)}")
@@ -0,0 +1,37 @@
+"""Simplified WHOIS lookups"""
+from datetime import datetime
+
+CONCURRENCY = 'io'
+TIMEOUT = 10
+CACHE_TTL = 24 * 60 * 60
+
+def collect(collector, domain):
+    """Collect WHOIS information (simplified version)"""
+    try:
+        # Remove protocol if present
+        domain = domain.replace('https://', '').replace('http://', '').split('/')[0]
+
+        # This is a simplified WHOIS implementation
+        # In a production environment, you would use a proper WHOIS library
+        whois_info = {
+            'domain': domain,
+            'status': 'active',
+            'note': 'WHOIS data collection requires specialized libraries for full functionality'
+        }
+
+        # Try to get basic domain info from the caching resolver
+        whois_info['resolved_ip'] = collector.engine.resolve_ip(domain) or 'Unable to resolve'
+
+        return {
+            'source_url': f"whois://{domain}",
+            'data': whois_info,
+            'metadata': {
+                'collection_time': datetime.utcnow().isoformat(),
+                'method': 'whois_lookup',
+                'note': 'Simplified WHOIS implementation'
+            },
+            'confidence_score': 0.5
+        }
+
+    except Exception as e:
+        raise Exception(f"WHOIS data collection failed: {str(e)}")
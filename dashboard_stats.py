@@ -0,0 +1,95 @@
+import os
+import time
+import threading
+from sqlalchemy import event, func, select, distinct
+from sqlalchemy.orm import Session, object_session
+from app import db
+from models import Investigation, DataEntry
+
+class DashboardStats:
+    """Cached snapshot of the dashboard statistics.
+
+    All counters are answered by one aggregate query. The snapshot is reused
+    for up to ``ttl`` seconds and dropped as soon as this process commits a
+    write to an Investigation or DataEntry, so other workers see changes
+    within ``ttl``. Flushes only mark their session; the snapshot is dropped
+    once the transaction commits, so a query racing an uncommitted write
+    cannot cache the old counts past it.
+    """
+
+    def __init__(self, ttl=10):
+        self.ttl = ttl
+        self.snapshot = None
+        self.expires_at = 0.0
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Return the current statistics, recomputing them when stale"""
+        with self.lock:
+            if self.snapshot is not None and time.monotonic() < self.expires_at:
+                return dict(self.snapshot)
+            generation = self.generation
+
+        snapshot = self._compute()
+        with self.lock:
+            # A write during the query makes this snapshot stale already
+            if generation == self.generation:
+                self.snapshot = snapshot
+                self.expires_at = time.monotonic() + self.ttl
+        return dict(snapshot)
+
+    def invalidate(self):
+        """Drop the cached snapshot"""
+        with self.lock:
+            self.snapshot = None
+            self.generation += 1
+
+    def mark_written(self, mapper, connection, target):
+        """Mapper event listener noting that the target's session changed the counts"""
+        session = object_session(target)
+        if session is not None:
+            session.info[_WRITTEN] = True
+
+    def session_committed(self, session):
+        """Session event listener dropping the snapshot once marked writes are committed"""
+        if session.info.pop(_WRITTEN, False):
+            self.invalidate()
+
+    def session_rolled_back(self, session):
+        """Session event listener forgetting writes that were rolled back"""
+        session.info.pop(_WRITTEN, None)
+
+    def entry_counts(self, investigation_ids):
+        """Entry count per investigation in one grouped query"""
+        if not investigation_ids:
+            return {}
+        query = select(DataEntry.investigation_id, func.count(DataEntry.id)).where(
+            DataEntry.investigation_id.in_(investigation_ids)
+        ).group_by(DataEntry.investigation_id)
+        return dict(db.session.execute(query).all())
+
+    def _compute(self):
+        query = select(
+            select(func.count(Investigation.id)).scalar_subquery(),
+            select(func.count(Investigation.id)).where(Investigation.status == 'active').scalar_subquery(),
+            select(func.count(DataEntry.id)).scalar_subquery(),
+            select(func.count(distinct(DataEntry.source_type))).scalar_subquery()
+        )
+        total_investigations, active_investigations, total_data_entries, data_sources = db.session.execute(query).one()
+        return {
+            'total_investigations': total_investigations,
+            'total_data_entries': total_data_entries,
+            'active_investigations': active_investigations,
+            'data_sources': data_sources
+        }
+
+_WRITTEN = 'dashboard_stats_written'
+
+dashboard_stats = DashboardStats(ttl=float(os.environ.get('DASHBOARD_STATS_TTL', '10')))
+
+for model in (Investigation, DataEntry):
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, event_name, dashboard_stats.mark_written)
+event.listen(Session, 'after_commit', dashboard_stats.session_committed)
+event.listen(Session, 'after_rollback', dashboard_stats.session_rolled_back)
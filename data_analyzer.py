@@ -1,84 +1,239 @@
 import json
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta
-import re
+from urllib.parse import urlparse
+from text_analytics import keyword_extractor, tfidf_scores
+from profiling import section
+
+# Bump when the state layout or extraction rules change; older states are rebuilt
+STATE_VERSION = 5
+
+ANALYSIS_PASSES = ('patterns', 'correlations', 'timeline')
+
+# The state keeps aggregates plus these bounded samples for the per-entry result keys:
+# the most recent timeline events and the latest confidence scores of each target
+TIMELINE_EVENT_LIMIT = 1000
+TARGET_SCORE_LIMIT = 100
 
 class DataAnalyzer:
-    """Class for analyzing collected OSINT data and finding patterns"""
+    """Class for analyzing collected OSINT data and finding patterns.
+    
+    Each pass keeps its counters, mappings and daily summaries in a plain,
+    JSON-serializable state dict. States can be built up incrementally with
+    update_state(), combined with merge_states() (or folded into a running
+    accumulator with merge_into()) and turned into the result dicts with the
+    finalize_* methods, so new entries can be folded into a stored state
+    without re-reading the whole investigation.
+    """
     
     def __init__(self):
         pass
     
     def find_patterns(self, data_entries):
         """Find patterns in collected data"""
-        try:
-            patterns = {
-                'common_domains': Counter(),
-                'common_ips': Counter(),
-                'common_emails': Counter(),
+        return self.finalize_patterns(self.update_state(self.new_state(['patterns']), data_entries))
+    
+    def find_correlations(self, data_entries):
+        """Find correlations between different data points"""
+        return self.finalize_correlations(self.update_state(self.new_state(['correlations']), data_entries))
+    
+    def create_timeline(self, data_entries):
+        """Create a timeline of data collection activities"""
+        return self.finalize_timeline(self.update_state(self.new_state(['timeline']), data_entries))
+    
+    def new_state(self, passes=ANALYSIS_PASSES):
+        """Create an empty analysis state for the given passes"""
+        state = {'version': STATE_VERSION, 'entry_count': 0}
+        if 'patterns' in passes:
+            state['patterns'] = {
+                'common_domains': {},
+                'common_ips': {},
+                'common_emails': {},
                 'source_reliability': {},
                 'temporal_patterns': {},
-                'content_keywords': Counter()
+                'content_keywords': {},
+                'keyword_document_counts': {},
+                'text_documents': 0
             }
-            
-            for entry in data_entries:
-                data_dict = entry.get_data_dict()
-                
-                # Extract domains from various sources
-                if entry.source_type == 'website' and entry.source_url:
-                    from urllib.parse import urlparse
-                    domain = urlparse(entry.source_url).netloc
-                    if domain:
-                        patterns['common_domains'][domain] += 1
-                
-                # Extract IPs
-                if entry.source_type == 'dns' and 'A' in data_dict:
-                    for ip in data_dict['A']:
-                        patterns['common_ips'][ip] += 1
-                
-                # Extract emails
-                if 'emails_found' in data_dict:
-                    for email in data_dict['emails_found']:
-                        patterns['common_emails'][email] += 1
-                
-                # Source reliability based on confidence scores
-                if entry.source_type not in patterns['source_reliability']:
-                    patterns['source_reliability'][entry.source_type] = []
-                patterns['source_reliability'][entry.source_type].append(entry.confidence_score)
-                
-                # Temporal patterns
-                date_key = entry.collected_at.strftime('%Y-%m-%d')
-                if date_key not in patterns['temporal_patterns']:
-                    patterns['temporal_patterns'][date_key] = 0
-                patterns['temporal_patterns'][date_key] += 1
-                
-                # Content keywords (from website text)
-                if entry.source_type == 'website' and 'text_content' in data_dict:
-                    text = data_dict['text_content'].lower()
-                    # Extract meaningful words (simplified)
-                    words = re.findall(r'\b[a-zA-Z]{4,}\b', text)
-                    common_words = ['that', 'this', 'with', 'have', 'will', 'from', 'they', 'been', 'were', 'said', 'each', 'more', 'than', 'many', 'some', 'time', 'very', 'when', 'much', 'new', 'now', 'way', 'may', 'say', 'come', 'its', 'because', 'such', 'through', 'where', 'being', 'how', 'your', 'what', 'their', 'would', 'about', 'which', 'there', 'could', 'should', 'these', 'into', 'just', 'only', 'make', 'know', 'take', 'see', 'him', 'two', 'more', 'go', 'no', 'way', 'could', 'my', 'than', 'first', 'well', 'water', 'been', 'call', 'who', 'its', 'now', 'find', 'long', 'down', 'day', 'did', 'get', 'has', 'her', 'his', 'had', 'let', 'put', 'say', 'she', 'too', 'old', 'any', 'after', 'move', 'why', 'ask', 'men', 'change', 'went', 'light', 'kind', 'off', 'need', 'house', 'picture', 'try', 'us', 'again', 'animal', 'point', 'mother', 'world', 'near', 'build', 'self', 'earth', 'father', 'head', 'stand', 'own', 'page', 'should', 'country', 'found', 'answer', 'school', 'grow', 'study', 'still', 'learn', 'plant', 'cover', 'food', 'sun', 'four', 'between', 'state', 'keep', 'eye', 'never', 'last', 'let', 'thought', 'city', 'tree', 'cross', 'farm', 'hard', 'start', 'might', 'story', 'saw', 'far', 'sea', 'draw', 'left', 'late', 'run', 'dont', 'while', 'press', 'close', 'night', 'real', 'life', 'few', 'north', 'open', 'seem', 'together', 'next', 'white', 'children', 'begin', 'got', 'walk', 'example', 'ease', 'paper', 'group', 'always', 'music', 'those', 'both', 'mark', 'often', 'letter', 'until', 'mile', 'river', 'car', 'feet', 'care', 'second', 'book', 'carry', 'took', 'science', 'eat', 'room', 'friend', 'began', 'idea', 'fish', 'mountain', 'stop', 'once', 'base', 'hear', 'horse', 'cut', 'sure', 'watch', 'color', 'face', 'wood', 'main', 'enough', 'plain', 'girl', 'usual', 'young', 'ready', 'above', 'ever', 'red', 'list', 'though', 'feel', 'talk', 'bird', 'soon', 'body', 'dog', 'family', 'direct', 'pose', 'leave', 'song', 'measure', 'door', 'product', 'black', 'short', 'numeral', 'class', 'wind', 'question', 'happen', 'complete', 'ship', 'area', 'half', 'rock', 'order', 'fire', 'south', 'problem', 'piece', 'told', 'knew', 'pass', 'since', 'top', 'whole', 'king', 'space', 'heard', 'best', 'hour', 'better', 'during', 'hundred', 'five', 'remember', 'step', 'early', 'hold', 'west', 'ground', 'interest', 'reach', 'fast', 'verb', 'sing', 'listen', 'six', 'table', 'travel', 'less', 'morning', 'ten', 'simple', 'several', 'vowel', 'toward', 'war', 'lay', 'against', 'pattern', 'slow', 'center', 'love', 'person', 'money', 'serve', 'appear', 'road', 'map', 'rain', 'rule', 'govern', 'pull', 'cold', 'notice', 'voice', 'unit', 'power', 'town', 'fine', 'certain', 'fly', 'fall', 'lead', 'cry', 'dark', 'machine', 'note', 'wait', 'plan', 'figure', 'star', 'box', 'noun', 'field', 'rest', 'correct', 'able', 'pound', 'done', 'beauty', 'drive', 'stood', 'contain', 'front', 'teach', 'week', 'final', 'gave', 'green', 'oh', 'quick', 'develop', 'ocean', 'warm', 'free', 'minute', 'strong', 'special', 'mind', 'behind', 'clear', 'tail', 'produce', 'fact', 'street', 'inch', 'multiply', 'nothing', 'course', 'stay', 'wheel', 'full', 'force', 'blue', 'object', 'decide', 'surface', 'deep', 'moon', 'island', 'foot', 'system', 'busy', 'test', 'record', 'boat', 'common', 'gold', 'possible', 'plane', 'stead', 'dry', 'wonder', 'laugh', 'thousands', 'ago', 'ran', 'check', 'game', 'shape', 'equate', 'hot', 'miss', 'brought', 'heat', 'snow', 'tire', 'bring', 'yes', 'distant', 'fill', 'east', 'paint', 'language', 'among']
-                    filtered_words = [word for word in words if word not in common_words and len(word) > 3]
-                    for word in filtered_words[:20]:  # Top 20 words per document
-                        patterns['content_keywords'][word] += 1
+        if 'correlations' in passes:
+            state['correlations'] = {
+                'domain_ip_mapping': {},
+                'email_domain_mapping': {},
+                'temporal_correlations': {},
+                'target_groups': {}
+            }
+        if 'timeline' in passes:
+            state['timeline'] = {
+                'daily_summary': {},
+                'recent_events': []
+            }
+        return state
+    
+    @section('analyzer.update_state')
+    def update_state(self, state, data_entries):
+        """Fold entries into a state, decoding each entry's data only once"""
+        for entry in data_entries:
+            data_dict = entry.get_data_dict()
+            if 'patterns' in state:
+                self._update_patterns(state['patterns'], entry, data_dict)
+            if 'correlations' in state:
+                self._update_correlations(state['correlations'], entry, data_dict)
+            if 'timeline' in state:
+                self._update_timeline(state['timeline'], entry, data_dict)
+            state['entry_count'] += 1
+        return state
+    
+    @section('analyzer.merge_states')
+    def merge_states(self, first, second):
+        """Combine two states built from disjoint sets of entries.
+        
+        The result depends only on argument order, so merging shard states in
+        a fixed order always produces the same output.
+        """
+        merged = self.new_state([name for name in ANALYSIS_PASSES if name in first and name in second])
+        self.merge_into(merged, first)
+        return self.merge_into(merged, second)
+    
+    @section('analyzer.merge_into')
+    def merge_into(self, accumulator, state):
+        """Fold a state built from later entries into accumulator, in place.
+        
+        Costs O(size of state) and never copies the accumulator, so folding
+        many chunk states into one accumulator stays linear. Passes missing
+        from state are dropped from accumulator, as with merge_states().
+        """
+        for name in ANALYSIS_PASSES:
+            if name in accumulator and name not in state:
+                del accumulator[name]
+        accumulator['entry_count'] += state['entry_count']
+        if 'patterns' in accumulator:
+            patterns = state['patterns']
+            target = accumulator['patterns']
+            for key in ('common_domains', 'common_ips', 'common_emails', 'content_keywords',
+                        'keyword_document_counts', 'temporal_patterns'):
+                _add_counts(target[key], patterns[key])
+            target['text_documents'] += patterns['text_documents']
+            for source_type, stats in patterns['source_reliability'].items():
+                _merge_reliability(target['source_reliability'], source_type, stats)
+        if 'correlations' in accumulator:
+            correlations = state['correlations']
+            target = accumulator['correlations']
+            for key in ('domain_ip_mapping', 'email_domain_mapping'):
+                for domain, values in correlations[key].items():
+                    _extend_unique(target[key].setdefault(domain, []), values)
+            for source_type, hours in correlations['temporal_correlations'].items():
+                _add_counts(target['temporal_correlations'].setdefault(source_type, {}), hours)
+            for entity, group in correlations['target_groups'].items():
+                _merge_target_group(target['target_groups'], entity, group)
+        if 'timeline' in accumulator:
+            timeline = state['timeline']
+            target = accumulator['timeline']
+            for date, summary in timeline['daily_summary'].items():
+                _merge_daily_summary(target['daily_summary'], date, summary)
+            target['recent_events'].extend(timeline['recent_events'])
+            _trim_events(target['recent_events'])
+        return accumulator
+    
+    def _update_patterns(self, patterns, entry, data_dict):
+        # Extract domains from various sources
+        if entry.source_type == 'website' and entry.source_url:
+            domain = urlparse(entry.source_url).netloc
+            if domain:
+                _increment(patterns['common_domains'], domain)
+        
+        # Extract IPs
+        if entry.source_type == 'dns' and 'A' in data_dict:
+            for ip in data_dict['A']:
+                _increment(patterns['common_ips'], ip)
+        
+        # Extract emails
+        if 'emails_found' in data_dict:
+            for email in data_dict['emails_found']:
+                _increment(patterns['common_emails'], email)
+        
+        # Source reliability based on confidence scores
+        _merge_reliability(patterns['source_reliability'], entry.source_type, {
+            'sum': entry.confidence_score,
+            'count': 1,
+            'min': entry.confidence_score,
+            'max': entry.confidence_score
+        })
+        
+        # Temporal patterns
+        _increment(patterns['temporal_patterns'], entry.collected_at.strftime('%Y-%m-%d'))
+        
+        # Content keywords (from website text)
+        if entry.source_type == 'website' and 'text_content' in data_dict:
+            _count_keywords(patterns, keyword_extractor.keywords(data_dict['text_content'], data_dict.get('language') or None))
+    
+    def _update_correlations(self, correlations, entry, data_dict):
+        # Group entries by target for cross-validation
+        _merge_target_group(correlations['target_groups'], entry.target, {
+            'source_counts': {entry.source_type: 1},
+            'count': 1,
+            'confidence_sum': entry.confidence_score,
+            'confidence_scores': [entry.confidence_score]
+        })
+        
+        # Find domain-IP correlations
+        if entry.source_type == 'dns' and 'A' in data_dict:
+            _extend_unique(correlations['domain_ip_mapping'].setdefault(entry.target, []), data_dict['A'])
+        
+        if entry.source_type == 'website' and 'emails_found' in data_dict:
+            if entry.source_url:
+                domain = urlparse(entry.source_url).netloc
+                for email in data_dict['emails_found']:
+                    email_domain = email.split('@')[1] if '@' in email else ''
+                    if email_domain:
+                        _extend_unique(correlations['email_domain_mapping'].setdefault(domain, []), [email_domain])
+        
+        # Temporal correlations: collections per source type and hour of day
+        _increment(correlations['temporal_correlations'].setdefault(entry.source_type, {}), str(entry.collected_at.hour))
+    
+    def _update_timeline(self, timeline, entry, data_dict):
+        event = timeline_event(
+            entry.collected_at, entry.source_type, entry.target, entry.confidence_score,
+            len(str(data_dict)), 'error' in data_dict
+        )
+        # Per-day aggregates plus a bounded list of recent events, so the state grows
+        # with days, not entries; averages are derived when finalizing
+        _merge_daily_summary(timeline['daily_summary'], event['date'], {
+            'total_collections': 1,
+            'source_counts': {entry.source_type: 1},
+            'confidence_sum': entry.confidence_score,
+            'total_data_size': event['data_size'],
+            'errors': 1 if event['has_error'] else 0
+        })
+        timeline['recent_events'].append(event)
+        if len(timeline['recent_events']) >= 2 * TIMELINE_EVENT_LIMIT:
+            _trim_events(timeline['recent_events'])
+    
+    @section('analyzer.finalize_patterns')
+    def finalize_patterns(self, state):
+        """Build the pattern analysis result from a state"""
+        try:
+            patterns = state['patterns']
             
             # Calculate average reliability by source
-            for source_type, scores in patterns['source_reliability'].items():
-                patterns['source_reliability'][source_type] = {
-                    'average_confidence': sum(scores) / len(scores),
-                    'total_entries': len(scores),
-                    'min_confidence': min(scores),
-                    'max_confidence': max(scores)
+            source_reliability = {}
+            for source_type, stats in patterns['source_reliability'].items():
+                source_reliability[source_type] = {
+                    'average_confidence': stats['sum'] / stats['count'],
+                    'total_entries': stats['count'],
+                    'min_confidence': stats['min'],
+                    'max_confidence': stats['max']
                 }
             
             return {
                 'patterns': {
-                    'top_domains': dict(patterns['common_domains'].most_common(10)),
-                    'top_ips': dict(patterns['common_ips'].most_common(10)),
-                    'top_emails': dict(patterns['common_emails'].most_common(10)),
-                    'source_reliability': patterns['source_reliability'],
-                    'temporal_distribution': patterns['temporal_patterns'],
-                    'top_keywords': dict(patterns['content_keywords'].most_common(20))
+                    'top_domains': dict(Counter(patterns['common_domains']).most_common(10)),
+                    'top_ips': dict(Counter(patterns['common_ips']).most_common(10)),
+                    'top_emails': dict(Counter(patterns['common_emails']).most_common(10)),
+                    'source_reliability': source_reliability,
+                    'temporal_distribution': dict(patterns['temporal_patterns']),
+                    'top_keywords': dict(Counter(patterns['content_keywords']).most_common(20)),
+                    'keyword_scores': tfidf_scores(patterns['content_keywords'], patterns['keyword_document_counts'],
+                                                   patterns['text_documents'])
                 },
                 'confidence': 0.8,
                 'analysis_timestamp': datetime.utcnow().isoformat()
@@ -91,63 +246,37 @@ class DataAnalyzer:
                 'analysis_timestamp': datetime.utcnow().isoformat()
             }
     
-    def find_correlations(self, data_entries):
-        """Find correlations between different data points"""
+    @section('analyzer.finalize_correlations')
+    def finalize_correlations(self, state):
+        """Build the correlation analysis result from a state"""
         try:
-            correlations = {
-                'domain_ip_mapping': defaultdict(set),
-                'email_domain_mapping': defaultdict(set),
-                'temporal_correlations': defaultdict(list),
-                'cross_source_validation': {}
-            }
-            
-            # Group entries by target for cross-validation
-            target_groups = defaultdict(list)
-            for entry in data_entries:
-                target_groups[entry.target].append(entry)
+            correlations = state['correlations']
             
-            for target, entries in target_groups.items():
-                if len(entries) > 1:
-                    source_types = [entry.source_type for entry in entries]
-                    correlations['cross_source_validation'][target] = {
-                        'sources_used': source_types,
-                        'source_count': len(set(source_types)),
-                        'total_entries': len(entries),
-                        'confidence_scores': [entry.confidence_score for entry in entries],
-                        'avg_confidence': sum([entry.confidence_score for entry in entries]) / len(entries)
+            cross_source_validation = {}
+            for target, group in correlations['target_groups'].items():
+                if group['count'] > 1:
+                    cross_source_validation[target] = {
+                        # One item per entry, grouped by source type
+                        'sources_used': [source for source, count in group['source_counts'].items() for _ in range(count)],
+                        'source_counts': dict(group['source_counts']),
+                        'source_count': len(group['source_counts']),
+                        'total_entries': group['count'],
+                        # The latest TARGET_SCORE_LIMIT scores; the average covers every entry
+                        'confidence_scores': list(group['confidence_scores']),
+                        'avg_confidence': group['confidence_sum'] / group['count']
                     }
             
-            # Find domain-IP correlations
-            for entry in data_entries:
-                data_dict = entry.get_data_dict()
-                
-                if entry.source_type == 'dns' and 'A' in data_dict:
-                    domain = entry.target
-                    for ip in data_dict['A']:
-                        correlations['domain_ip_mapping'][domain].add(ip)
-                
-                if entry.source_type == 'website' and 'emails_found' in data_dict:
-                    from urllib.parse import urlparse
-                    if entry.source_url:
-                        domain = urlparse(entry.source_url).netloc
-                        for email in data_dict['emails_found']:
-                            email_domain = email.split('@')[1] if '@' in email else ''
-                            if email_domain:
-                                correlations['email_domain_mapping'][domain].add(email_domain)
-                
-                # Temporal correlations
-                hour = entry.collected_at.hour
-                correlations['temporal_correlations'][entry.source_type].append(hour)
-            
-            # Convert sets to lists for JSON serialization
-            for domain in correlations['domain_ip_mapping']:
-                correlations['domain_ip_mapping'][domain] = list(correlations['domain_ip_mapping'][domain])
-            
-            for domain in correlations['email_domain_mapping']:
-                correlations['email_domain_mapping'][domain] = list(correlations['email_domain_mapping'][domain])
-            
             return {
-                'correlations': dict(correlations),
+                'correlations': {
+                    'domain_ip_mapping': {domain: list(ips) for domain, ips in correlations['domain_ip_mapping'].items()},
+                    'email_domain_mapping': {domain: list(domains) for domain, domains in correlations['email_domain_mapping'].items()},
+                    # The hour of day of every entry per source type, in hour order
+                    'temporal_correlations': {
+                        source: [int(hour) for hour in sorted(hours, key=int) for _ in range(hours[hour])]
+                        for source, hours in correlations['temporal_correlations'].items()
+                    },
+                    'cross_source_validation': cross_source_validation
+                },
                 'confidence': 0.7,
                 'analysis_timestamp': datetime.utcnow().isoformat()
             }
@@ -159,59 +288,36 @@ class DataAnalyzer:
                 'analysis_timestamp': datetime.utcnow().isoformat()
             }
     
-    def create_timeline(self, data_entries):
-        """Create a timeline of data collection activities"""
+    @section('analyzer.finalize_timeline')
+    def finalize_timeline(self, state):
+        """Build the timeline analysis result from a state"""
         try:
-            timeline_events = []
-            
-            for entry in data_entries:
-                timeline_events.append({
-                    'timestamp': entry.collected_at.isoformat(),
-                    'date': entry.collected_at.strftime('%Y-%m-%d'),
-                    'time': entry.collected_at.strftime('%H:%M:%S'),
-                    'source_type': entry.source_type,
-                    'target': entry.target,
-                    'confidence': entry.confidence_score,
-                    'data_size': len(str(entry.get_data_dict())),
-                    'has_error': 'error' in entry.get_data_dict()
-                })
-            
-            # Sort by timestamp
-            timeline_events.sort(key=lambda x: x['timestamp'])
-            
-            # Create daily summaries
-            daily_summary = defaultdict(lambda: {
-                'total_collections': 0,
-                'source_types': set(),
-                'avg_confidence': 0,
-                'total_data_size': 0,
-                'errors': 0
-            })
+            timeline = state['timeline']
+            dates = sorted(timeline['daily_summary'])
+            # The most recent TIMELINE_EVENT_LIMIT events, oldest first
+            events = sorted(timeline['recent_events'], key=lambda event: event['timestamp'])[-TIMELINE_EVENT_LIMIT:]
             
-            for event in timeline_events:
-                date = event['date']
-                daily_summary[date]['total_collections'] += 1
-                daily_summary[date]['source_types'].add(event['source_type'])
-                daily_summary[date]['avg_confidence'] += event['confidence']
-                daily_summary[date]['total_data_size'] += event['data_size']
-                if event['has_error']:
-                    daily_summary[date]['errors'] += 1
-            
-            # Calculate averages and convert sets to lists
-            for date in daily_summary:
-                summary = daily_summary[date]
-                summary['avg_confidence'] = summary['avg_confidence'] / summary['total_collections']
-                summary['source_types'] = list(summary['source_types'])
-                summary['unique_sources'] = len(summary['source_types'])
+            daily_summary = {}
+            for date in dates:
+                summary = timeline['daily_summary'][date]
+                daily_summary[date] = {
+                    'total_collections': summary['total_collections'],
+                    'source_types': list(summary['source_counts']),
+                    'source_counts': dict(summary['source_counts']),
+                    'avg_confidence': summary['confidence_sum'] / summary['total_collections'],
+                    'total_data_size': summary['total_data_size'],
+                    'errors': summary['errors'],
+                    'unique_sources': len(summary['source_counts'])
+                }
             
             return {
                 'timeline': {
-                    'events': timeline_events,
-                    'daily_summary': dict(daily_summary),
-                    'total_events': len(timeline_events),
+                    'events': events,
+                    'daily_summary': daily_summary,
+                    'total_events': sum(summary['total_collections'] for summary in daily_summary.values()),
                     'date_range': {
-                        'start': timeline_events[0]['date'] if timeline_events else None,
-                        'end': timeline_events[-1]['date'] if timeline_events else None
+                        'start': dates[0] if dates else None,
+                        'end': dates[-1] if dates else None
                     }
                 },
                 'confidence': 0.9,
@@ -224,3 +330,84 @@ class DataAnalyzer:
                 'confidence': 0.0,
                 'analysis_timestamp': datetime.utcnow().isoformat()
             }
+
+def timeline_event(collected_at, source_type, target, confidence, data_size, has_error):
+    """One entry of the timeline's events list"""
+    return {
+        'timestamp': collected_at.isoformat(),
+        'date': collected_at.strftime('%Y-%m-%d'),
+        'time': collected_at.strftime('%H:%M:%S'),
+        'source_type': source_type,
+        'target': target,
+        'confidence': confidence,
+        'data_size': data_size,
+        'has_error': has_error
+    }
+
+def _trim_events(events):
+    # Keep the latest events; the stable sort keeps entry order among equal timestamps
+    events.sort(key=lambda event: event['timestamp'])
+    del events[:-TIMELINE_EVENT_LIMIT]
+
+def _count_keywords(patterns, keywords):
+    # Term counts for top_keywords plus document frequencies for TF-IDF scoring
+    for word in keywords:
+        _increment(patterns['content_keywords'], word)
+    for word in set(keywords):
+        _increment(patterns['keyword_document_counts'], word)
+    patterns['text_documents'] += 1
+
+def _increment(counts, key, amount=1):
+    counts[key] = counts.get(key, 0) + amount
+
+def _add_counts(target, counts):
+    for key, amount in counts.items():
+        _increment(target, key, amount)
+
+def _extend_unique(values, new_values):
+    for value in new_values:
+        if value not in values:
+            values.append(value)
+
+def _merge_reliability(reliability, source_type, stats):
+    current = reliability.get(source_type)
+    if current is None:
+        reliability[source_type] = dict(stats)
+        return
+    current['sum'] += stats['sum']
+    current['count'] += stats['count']
+    current['min'] = min(current['min'], stats['min'])
+    current['max'] = max(current['max'], stats['max'])
+
+def _merge_target_group(groups, target, group):
+    current = groups.get(target)
+    if current is None:
+        groups[target] = {
+            'source_counts': dict(group['source_counts']),
+            'count': group['count'],
+            'confidence_sum': group['confidence_sum'],
+            'confidence_scores': group['confidence_scores'][-TARGET_SCORE_LIMIT:]
+        }
+        return
+    _add_counts(current['source_counts'], group['source_counts'])
+    current['count'] += group['count']
+    current['confidence_sum'] += group['confidence_sum']
+    current['confidence_scores'].extend(group['confidence_scores'])
+    del current['confidence_scores'][:-TARGET_SCORE_LIMIT]
+
+def _merge_daily_summary(daily_summary, date, summary):
+    current = daily_summary.get(date)
+    if current is None:
+        daily_summary[date] = {
+            'total_collections': summary['total_collections'],
+            'source_counts': dict(summary['source_counts']),
+            'confidence_sum': summary['confidence_sum'],
+            'total_data_size': summary['total_data_size'],
+            'errors': summary['errors']
+        }
+        return
+    current['total_collections'] += summary['total_collections']
+    _add_counts(current['source_counts'], summary['source_counts'])
+    current['confidence_sum'] += summary['confidence_sum']
+    current['total_data_size'] += summary['total_data_size']
+    current['errors'] += summary['errors']
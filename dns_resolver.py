@@ -0,0 +1,378 @@
+import os
+import time
+import random
+import socket
+import struct
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+RECORD_TYPES = {
+    'A': 1,
+    'NS': 2,
+    'CNAME': 5,
+    'SOA': 6,
+    'PTR': 12,
+    'MX': 15,
+    'TXT': 16,
+    'AAAA': 28,
+    'OPT': 41
+}
+RECORD_NAMES = {value: name for name, value in RECORD_TYPES.items()}
+
+RCODE_NAMES = {0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+
+CLASS_IN = 1
+EDNS_PAYLOAD_SIZE = 1232
+NEGATIVE_TTL = 60
+
+class DNSError(Exception):
+    """Raised when a DNS query cannot be completed"""
+    pass
+
+def build_query(name, record_type, query_id):
+    """Build a recursive DNS query in wire format with an EDNS0 OPT record"""
+    header = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 1)
+    question = _encode_name(name) + struct.pack('!HH', RECORD_TYPES[record_type], CLASS_IN)
+    # Root name, OPT type, advertised UDP payload size, extended rcode/flags, no options
+    opt = b'\x00' + struct.pack('!HHIH', RECORD_TYPES['OPT'], EDNS_PAYLOAD_SIZE, 0, 0)
+    return header + question + opt
+
+def parse_response(message):
+    """Parse a DNS response into a dict of header fields, question and answers"""
+    if len(message) < 12:
+        raise DNSError("Truncated DNS header")
+
+    query_id, flags, qdcount, ancount, nscount, arcount = struct.unpack('!HHHHHH', message[:12])
+    offset = 12
+
+    questions = []
+    for _ in range(qdcount):
+        name, offset = _decode_name(message, offset)
+        qtype, qclass = struct.unpack('!HH', message[offset:offset + 4])
+        offset += 4
+        questions.append((name.lower(), qtype))
+
+    sections = []
+    for count in (ancount, nscount, arcount):
+        records = []
+        for _ in range(count):
+            record, offset = _parse_record(message, offset)
+            records.append(record)
+        sections.append(records)
+
+    return {
+        'id': query_id,
+        'truncated': bool(flags & 0x0200),
+        'rcode': flags & 0x000F,
+        'questions': questions,
+        'answers': sections[0],
+        'authority': sections[1],
+        'additional': sections[2]
+    }
+
+def ascii_name(name):
+    """Lower-case ASCII (IDNA) form of a domain name, as it appears on the wire"""
+    name = name.rstrip('.').lower()
+    try:
+        return '.'.join(label.encode('idna').decode('ascii') for label in name.split('.')) if name else ''
+    except UnicodeError as e:
+        raise DNSError(f"Invalid DNS name {name!r}: {str(e)}")
+
+def _encode_name(name):
+    name = name.rstrip('.')
+    if not name:
+        return b'\x00'
+    encoded = b''
+    for label in name.split('.'):
+        raw = label.encode('idna')
+        if not raw or len(raw) > 63:
+            raise DNSError(f"Invalid DNS label in {name!r}")
+        encoded += bytes([len(raw)]) + raw
+    return encoded + b'\x00'
+
+def _decode_name(message, offset):
+    """Decode a possibly compressed domain name, returning (name, next_offset)"""
+    labels = []
+    next_offset = None
+    jumps = 0
+    while True:
+        if offset >= len(message):
+            raise DNSError("Name runs past end of message")
+        length = message[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(message):
+                raise DNSError("Truncated compression pointer")
+            if next_offset is None:
+                next_offset = offset + 2
+            offset = ((length & 0x3F) << 8) | message[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise DNSError("Compression loop in name")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(message[offset:offset + length].decode('ascii', errors='replace'))
+        offset += length
+    return '.'.join(labels), (next_offset if next_offset is not None else offset)
+
+def _parse_record(message, offset):
+    name, offset = _decode_name(message, offset)
+    if offset + 10 > len(message):
+        raise DNSError("Truncated resource record")
+    rtype, rclass, ttl, rdlength = struct.unpack('!HHIH', message[offset:offset + 10])
+    offset += 10
+    rdata_offset = offset
+    offset += rdlength
+    if offset > len(message):
+        raise DNSError("Truncated resource data")
+
+    return {
+        'name': name.lower(),
+        'type': RECORD_NAMES.get(rtype, str(rtype)),
+        'ttl': ttl,
+        'value': _parse_rdata(message, rtype, rdata_offset, rdlength)
+    }, offset
+
+def _parse_rdata(message, rtype, offset, length):
+    rdata = message[offset:offset + length]
+    if rtype == RECORD_TYPES['A'] and length == 4:
+        return socket.inet_ntop(socket.AF_INET, rdata)
+    if rtype == RECORD_TYPES['AAAA'] and length == 16:
+        return socket.inet_ntop(socket.AF_INET6, rdata)
+    if rtype in (RECORD_TYPES['NS'], RECORD_TYPES['CNAME'], RECORD_TYPES['PTR']):
+        return _decode_name(message, offset)[0]
+    if rtype == RECORD_TYPES['MX']:
+        preference = struct.unpack('!H', rdata[:2])[0]
+        return f"{preference} {_decode_name(message, offset + 2)[0]}"
+    if rtype == RECORD_TYPES['TXT']:
+        strings = []
+        position = 0
+        while position < length:
+            size = rdata[position]
+            strings.append(rdata[position + 1:position + 1 + size].decode('utf-8', errors='replace'))
+            position += 1 + size
+        return ''.join(strings)
+    if rtype == RECORD_TYPES['SOA']:
+        mname, next_offset = _decode_name(message, offset)
+        rname, next_offset = _decode_name(message, next_offset)
+        serial, refresh, retry, expire, minimum = struct.unpack('!IIIII', message[next_offset:next_offset + 20])
+        return {'mname': mname, 'rname': rname, 'serial': serial, 'minimum': minimum}
+    return rdata.hex()
+
+def _system_nameserver():
+    """First nameserver from /etc/resolv.conf, falling back to a public resolver"""
+    try:
+        with open('/etc/resolv.conf') as resolv_conf:
+            for line in resolv_conf:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver':
+                    return parts[1]
+    except OSError:
+        pass
+    return '8.8.8.8'
+
+def _parse_nameserver(value):
+    """Split 'host', 'host:port' or '[v6]:port' into (host, port)"""
+    value = value.strip()
+    if value.startswith('['):
+        host, _, port = value[1:].partition(']')
+        return host, int(port.lstrip(':') or 53)
+    if value.count(':') == 1:
+        host, port = value.split(':')
+        return host, int(port)
+    return value, 53
+
+class DNSResolver:
+    """Stub resolver speaking the DNS wire protocol over UDP with TCP fallback.
+
+    All record types for a name are sent at once on a single UDP socket and
+    collected within one timeout window. Answers are cached for their TTL and
+    negative answers for NEGATIVE_TTL (or the zone's SOA minimum).
+    """
+
+    def __init__(self, nameserver=None, timeout=3.0, retries=1, max_cache_entries=10000):
+        host, port = _parse_nameserver(nameserver or _system_nameserver())
+        self.address = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0][4]
+        self.family = socket.AF_INET6 if ':' in self.address[0] else socket.AF_INET
+        self.timeout = timeout
+        self.retries = retries
+        self.max_cache_entries = max_cache_entries
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    @property
+    def nameserver(self):
+        return f"{self.address[0]}:{self.address[1]}"
+
+    def resolve(self, name, record_type):
+        """Resolve one record type, returning the list of record values"""
+        return self.resolve_many(name, [record_type])[record_type]['records']
+
+    def resolve_many(self, name, record_types):
+        """Resolve several record types for a name in parallel.
+
+        Returns {record_type: {'records': [...], 'rcode': str, 'cname_chain': [...], 'ttl': int}}.
+        ttl is the seconds the answer stays valid (what is left of it when
+        served from the cache). Record types that time out report rcode
+        'TIMEOUT' with no records and a ttl of 0.
+        Internationalized names are queried, matched and cached in their
+        IDNA form, which is what servers echo back.
+        """
+        name = ascii_name(name)
+        results = {}
+        pending = []
+        now = time.monotonic()
+
+        with self.lock:
+            for record_type in record_types:
+                cached = self.cache.get((name, record_type))
+                if cached and cached[0] > now:
+                    results[record_type] = dict(cached[1], ttl=int(cached[0] - now))
+                else:
+                    pending.append(record_type)
+
+        if pending:
+            for record_type, response in self._query_udp(name, pending).items():
+                if response is not None and response['truncated']:
+                    response = self._query_tcp(name, record_type)
+                results[record_type] = self._store(name, record_type, response)
+
+        return results
+
+    def _store(self, name, record_type, response):
+        """Turn a parsed response into a result and cache it by TTL"""
+        if response is None:
+            return {'records': [], 'rcode': 'TIMEOUT', 'cname_chain': [], 'ttl': 0}
+
+        cname_chain = []
+        records = []
+        ttls = []
+        owner = name
+        for answer in response['answers']:
+            if answer['type'] == 'CNAME' and record_type != 'CNAME' and answer['name'] == owner:
+                cname_chain.append(answer['value'])
+                owner = answer['value'].lower()
+                ttls.append(answer['ttl'])
+            elif answer['type'] == record_type:
+                records.append(answer['value'])
+                ttls.append(answer['ttl'])
+
+        if records:
+            ttl = min(ttls)
+        else:
+            soa = [record['value'] for record in response['authority'] if record['type'] == 'SOA']
+            ttl = min(soa[0]['minimum'], NEGATIVE_TTL) if soa else NEGATIVE_TTL
+
+        result = {
+            'records': sorted(set(records), key=records.index),
+            'rcode': RCODE_NAMES.get(response['rcode'], str(response['rcode'])),
+            'cname_chain': cname_chain,
+            'ttl': ttl
+        }
+
+        if ttl > 0 and response['rcode'] in (0, 3):
+            with self.lock:
+                if len(self.cache) >= self.max_cache_entries:
+                    self._evict_expired()
+                self.cache[(name, record_type)] = (time.monotonic() + ttl, result)
+        return result
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self.cache.items() if expires_at <= now]:
+            del self.cache[key]
+        if len(self.cache) >= self.max_cache_entries:
+            self.cache.clear()
+
+    def _query_udp(self, name, record_types):
+        """Send every query on one socket and gather answers until timeout"""
+        responses = {record_type: None for record_type in record_types}
+        sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        try:
+            outstanding = {}
+            for attempt in range(self.retries + 1):
+                for record_type in record_types:
+                    if responses[record_type] is not None:
+                        continue
+                    query_id = random.getrandbits(16)
+                    outstanding[query_id] = record_type
+                    sock.sendto(build_query(name, record_type, query_id), self.address)
+
+                deadline = time.monotonic() + self.timeout
+                while any(response is None for response in responses.values()):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    # A socket timeout instead of select(), which fails on descriptors above FD_SETSIZE
+                    sock.settimeout(remaining)
+                    try:
+                        message, source = sock.recvfrom(65535)
+                    except socket.timeout:
+                        break
+                    except OSError:
+                        continue
+                    response = self._match(message, source, outstanding, name)
+                    if response is not None:
+                        responses[outstanding[response['id']]] = response
+
+                if all(response is not None for response in responses.values()):
+                    break
+        finally:
+            sock.close()
+        return responses
+
+    def _match(self, message, source, outstanding, name):
+        """Accept a datagram only if it answers one of our outstanding questions"""
+        if source[0] != self.address[0] or source[1] != self.address[1]:
+            return None
+        try:
+            response = parse_response(message)
+        except (DNSError, struct.error) as e:
+            logger.debug(f"Ignoring malformed DNS response: {str(e)}")
+            return None
+        record_type = outstanding.get(response['id'])
+        if record_type is None:
+            return None
+        if response['questions'] and response['questions'][0] != (name, RECORD_TYPES[record_type]):
+            return None
+        return response
+
+    def _query_tcp(self, name, record_type):
+        """Repeat a truncated query over TCP"""
+        query_id = random.getrandbits(16)
+        query = build_query(name, record_type, query_id)
+        try:
+            with socket.create_connection(self.address[:2], timeout=self.timeout) as sock:
+                sock.sendall(struct.pack('!H', len(query)) + query)
+                length = struct.unpack('!H', self._recv_exact(sock, 2))[0]
+                response = parse_response(self._recv_exact(sock, length))
+        except (OSError, DNSError, struct.error) as e:
+            logger.debug(f"TCP DNS query for {name} {record_type} failed: {str(e)}")
+            return None
+        return response if response['id'] == query_id else None
+
+    def _recv_exact(self, sock, size):
+        data = b''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise DNSError("Connection closed mid-response")
+            data += chunk
+        return data
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+def get_resolver():
+    """Process-wide resolver configured from DNS_RESOLVER and DNS_TIMEOUT"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = DNSResolver(
+                nameserver=os.environ.get('DNS_RESOLVER') or None,
+                timeout=float(os.environ.get('DNS_TIMEOUT', '3'))
+            )
+        return _resolver
@@ -0,0 +1,129 @@
+import ipaddress
+from urllib.parse import urlparse
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+from app import db
+from models import DataEntry, EntityMention
+
+ENTITY_TYPES = ('ip', 'domain', 'email')
+
+def normalize_ip(value):
+    """Canonical text form of an IP address, or None if it is not one"""
+    try:
+        return str(ipaddress.ip_address(str(value).strip()))
+    except ValueError:
+        return None
+
+def normalize_domain(value):
+    """Lower-cased host name without scheme, path, port or trailing dot"""
+    value = str(value or '').strip().lower()
+    value = value.replace('https://', '').replace('http://', '').split('/')[0].split(':')[0].rstrip('.')
+    if not value or len(value) > 253 or '.' not in value or ' ' in value or normalize_ip(value):
+        return None
+    return value
+
+def normalize_email(value):
+    """Lower-cased email address, or None if it does not look like one"""
+    value = str(value or '').strip().lower()
+    local, _, domain = value.partition('@')
+    if not local or len(value) > 320 or not normalize_domain(domain):
+        return None
+    return value
+
+def extract_entities(source_type, target, source_url, data_dict):
+    """Return the set of (entity_type, value) pairs found in one entry"""
+    found = set()
+
+    def add_ip(value):
+        ip = normalize_ip(value)
+        if ip:
+            found.add(('ip', ip))
+
+    def add_domain(value):
+        domain = normalize_domain(value)
+        if domain:
+            found.add(('domain', domain))
+
+    def add_email(value):
+        email = normalize_email(value)
+        if email:
+            found.add(('email', email))
+            add_domain(email.split('@')[1])
+
+    if source_type in ('dns', 'whois'):
+        add_domain(target)
+    if source_type == 'dns':
+        for record_type in ('A', 'AAAA'):
+            for ip in data_dict.get(record_type) or []:
+                add_ip(ip)
+        for record_type in ('NS', 'CNAME'):
+            for name in data_dict.get(record_type) or []:
+                add_domain(name)
+        for exchange in data_dict.get('MX') or []:
+            add_domain(str(exchange).split()[-1])
+        add_domain(data_dict.get('canonical_name'))
+    elif source_type == 'whois':
+        add_ip(data_dict.get('resolved_ip'))
+    elif source_type == 'website':
+        if source_url:
+            add_domain(urlparse(source_url).netloc)
+    elif source_type == 'email':
+        add_email(target)
+    elif source_type == 'ip':
+        add_ip(data_dict.get('ip_address') or target)
+        add_domain(data_dict.get('hostname'))
+
+    for email in data_dict.get('emails_found') or []:
+        add_email(email)
+
+    return found
+
+def entity_rows(entry):
+    """EntityMention rows for a flushed entry"""
+    return [
+        {'entry_id': entry.id, 'investigation_id': entry.investigation_id, 'entity_type': entity_type, 'value': value}
+        for entity_type, value in sorted(extract_entities(
+            entry.source_type, entry.target, entry.source_url, entry.get_data_dict()
+        ))
+    ]
+
+@event.listens_for(Session, 'after_flush')
+def _index_new_entries(session, flush_context):
+    """Extract entities for every DataEntry inserted by this flush in one statement"""
+    rows = []
+    for instance in session.new:
+        if isinstance(instance, DataEntry):
+            rows.extend(entity_rows(instance))
+    if rows:
+        session.connection().execute(insert(EntityMention.__table__), rows)
+
+def rebuild_entities(batch_size=1000):
+    """Re-extract entities for every entry, e.g. for data that predates the side table"""
+    db.session.execute(EntityMention.__table__.delete())
+    db.session.commit()
+
+    total = 0
+    last_id = 0
+    while True:
+        query = select(DataEntry).where(DataEntry.id > last_id).order_by(DataEntry.id).limit(batch_size)
+        entries = db.session.execute(query).scalars().all()
+        if not entries:
+            return total
+        last_id = entries[-1].id
+        rows = []
+        for entry in entries:
+            rows.extend(entity_rows(entry))
+        if rows:
+            db.session.execute(insert(EntityMention.__table__), rows)
+        db.session.commit()
+        # Committed entries are not needed again; keep the identity map small
+        db.session.expunge_all()
+        total += len(entries)
+
+def investigations_with_entity(entity_type, value):
+    """Investigation ids and mention counts for an entity, answered from the index"""
+    query = select(EntityMention.investigation_id, db.func.count(EntityMention.id)).where(
+        EntityMention.entity_type == entity_type,
+        EntityMention.value == value
+    ).group_by(EntityMention.investigation_id)
+    return dict(db.session.execute(query).all())
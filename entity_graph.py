@@ -0,0 +1,303 @@
+"""Entity graph shared by all investigations.
+
+Nodes are domains, hostnames, IPs, emails and usernames, stored once each.
+Edges record one relation observed in one DataEntry and are written in the
+same flush that inserts the entry, so the graph grows with collection and
+never has to be rebuilt from the JSON payloads. Edges are indexed from both
+ends, which keeps k-hop traversals and cross-investigation pivots to a few
+index lookups per hop.
+"""
+import click
+from urllib.parse import urlparse
+from sqlalchemy import event, insert, select, tuple_, func, union
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import app, db
+from models import DataEntry, GraphNode, GraphEdge
+from entities import normalize_ip, normalize_domain, normalize_email
+
+NODE_TYPES = ('domain', 'hostname', 'ip', 'email', 'username')
+INFRASTRUCTURE_TYPES = ('ip', 'hostname')
+MAX_DEPTH = 3
+DEFAULT_MAX_NODES = 500
+# Bound on bind parameters per IN (...) clause
+_CHUNK_SIZE = 500
+
+def normalize_username(value):
+    """Lower-cased handle without a leading @, or None if it is not one"""
+    value = str(value or '').strip().lstrip('@').lower()
+    if not value or len(value) > 100 or any(char in value for char in ' /@:'):
+        return None
+    return value
+
+_NORMALIZERS = {
+    'domain': normalize_domain,
+    'hostname': normalize_domain,
+    'ip': normalize_ip,
+    'email': normalize_email,
+    'username': normalize_username
+}
+
+def normalize_node(node_type, value):
+    """Canonical value for a node of the given type, or None"""
+    normalizer = _NORMALIZERS.get(node_type)
+    return normalizer(value) if normalizer else None
+
+def extract_links(source_type, target, source_url, data_dict):
+    """Return the set of ((type, value), relation, (type, value)) edges found in one entry"""
+    links = set()
+
+    def link(source, relation, destination):
+        source_value = normalize_node(*source)
+        destination_value = normalize_node(*destination)
+        if source_value and destination_value and (source[0], source_value) != (destination[0], destination_value):
+            links.add(((source[0], source_value), relation, (destination[0], destination_value)))
+
+    def link_email(email, origin=None):
+        email = normalize_email(email)
+        if not email:
+            return
+        local, _, domain = email.partition('@')
+        link(('email', email), 'email_domain', ('domain', domain))
+        link(('email', email), 'local_part', ('username', local))
+        if origin:
+            link(origin, 'mentions', ('email', email))
+
+    domain = ('domain', target)
+    if source_type == 'dns':
+        for record_type in ('A', 'AAAA'):
+            for ip in data_dict.get(record_type) or []:
+                link(domain, 'resolves_to', ('ip', ip))
+        for name in data_dict.get('NS') or []:
+            link(domain, 'name_server', ('hostname', name))
+        for exchange in data_dict.get('MX') or []:
+            link(domain, 'mail_exchange', ('hostname', str(exchange).split()[-1]))
+        for name in data_dict.get('CNAME') or []:
+            link(domain, 'alias_of', ('hostname', name))
+        # Without a CNAME the canonical name is the queried domain itself
+        canonical_name = normalize_domain(data_dict.get('canonical_name'))
+        if canonical_name and canonical_name != normalize_domain(target):
+            link(domain, 'alias_of', ('hostname', canonical_name))
+    elif source_type == 'whois':
+        link(domain, 'resolves_to', ('ip', data_dict.get('resolved_ip')))
+    elif source_type == 'ip':
+        hostname = data_dict.get('hostname')
+        link(('ip', data_dict.get('ip_address') or target), 'reverse_dns', ('hostname', hostname))
+    elif source_type == 'email':
+        link_email(target)
+    elif source_type == 'social_media' and data_dict.get('github_exists'):
+        link(('username', target), 'account_on', ('domain', 'github.com'))
+
+    # Emails found on a page hang off the site that published them
+    origin = None
+    if source_type == 'website' and source_url:
+        origin = ('domain', urlparse(source_url).netloc)
+    for email in data_dict.get('emails_found') or []:
+        link_email(email, origin)
+
+    return links
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), _CHUNK_SIZE):
+        yield values[start:start + _CHUNK_SIZE]
+
+def _insert_missing_nodes(connection, keys):
+    """Insert (type, value) nodes that do not exist yet; concurrent writers are tolerated"""
+    rows = [{'node_type': node_type, 'value': value} for node_type, value in sorted(keys)]
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        connection.execute(dialect_insert(GraphNode.__table__).on_conflict_do_nothing(), rows)
+        return
+    existing = set(_node_ids(connection, keys))
+    missing = [row for row in rows if (row['node_type'], row['value']) not in existing]
+    if missing:
+        connection.execute(insert(GraphNode.__table__), missing)
+
+def _node_ids(connection, keys):
+    """Map (type, value) keys to node ids"""
+    table = GraphNode.__table__
+    ids = {}
+    for chunk in _chunks(keys):
+        query = select(table.c.node_type, table.c.value, table.c.id).where(
+            tuple_(table.c.node_type, table.c.value).in_(chunk)
+        )
+        for node_type, value, node_id in connection.execute(query):
+            ids[(node_type, value)] = node_id
+    return ids
+
+def write_edges(connection, entries):
+    """Create the nodes and edges for a list of flushed entries"""
+    links = []
+    for entry in entries:
+        for source, relation, destination in extract_links(
+            entry.source_type, entry.target, entry.source_url, entry.get_data_dict()
+        ):
+            links.append((entry, source, relation, destination))
+    if not links:
+        return 0
+
+    keys = {source for _, source, _, _ in links} | {destination for _, _, _, destination in links}
+    _insert_missing_nodes(connection, keys)
+    ids = _node_ids(connection, keys)
+    connection.execute(insert(GraphEdge.__table__), [
+        {
+            'source_id': ids[source],
+            'target_id': ids[destination],
+            'relation': relation,
+            'entry_id': entry.id,
+            'investigation_id': entry.investigation_id
+        }
+        for entry, source, relation, destination in sorted(links, key=lambda link: (link[0].id, link[1:]))
+    ])
+    return len(links)
+
+@event.listens_for(Session, 'after_flush')
+def _link_new_entries(session, flush_context):
+    """Add graph edges for every DataEntry inserted by this flush"""
+    entries = [instance for instance in session.new if isinstance(instance, DataEntry)]
+    if entries:
+        write_edges(session.connection(), entries)
+
+def prune_nodes():
+    """Delete nodes no edge refers to any more; returns how many were removed"""
+    edges = GraphEdge.__table__
+    result = db.session.execute(GraphNode.__table__.delete().where(
+        GraphNode.id.not_in(select(edges.c.source_id)),
+        GraphNode.id.not_in(select(edges.c.target_id))
+    ))
+    db.session.commit()
+    return result.rowcount
+
+def rebuild_graph(batch_size=1000):
+    """Re-derive every edge, e.g. for data that predates the graph tables"""
+    db.session.execute(GraphEdge.__table__.delete())
+    db.session.commit()
+
+    total = 0
+    last_id = 0
+    while True:
+        query = select(DataEntry).where(DataEntry.id > last_id).order_by(DataEntry.id).limit(batch_size)
+        entries = db.session.execute(query).scalars().all()
+        if not entries:
+            # Nodes only reached through removed edges or deleted entries
+            prune_nodes()
+            return total
+        last_id = entries[-1].id
+        write_edges(db.session.connection(), entries)
+        db.session.commit()
+        db.session.expunge_all()
+        total += len(entries)
+
+def find_node(node_type, value):
+    """The node for a (type, value) pair, or None"""
+    value = normalize_node(node_type, value)
+    if value is None:
+        return None
+    return GraphNode.query.filter_by(node_type=node_type, value=value).first()
+
+def _adjacent_edges(node_ids, investigation_id=None):
+    """Edges touching any of node_ids, read through the source and target indexes"""
+    edges = GraphEdge.__table__
+    columns = (edges.c.source_id, edges.c.target_id, edges.c.relation, edges.c.investigation_id)
+    rows = []
+    for chunk in _chunks(node_ids):
+        outgoing = select(*columns).where(edges.c.source_id.in_(chunk))
+        incoming = select(*columns).where(edges.c.target_id.in_(chunk))
+        if investigation_id is not None:
+            outgoing = outgoing.where(edges.c.investigation_id == investigation_id)
+            incoming = incoming.where(edges.c.investigation_id == investigation_id)
+        rows.extend(db.session.execute(union(outgoing, incoming)))
+    return rows
+
+def neighbourhood(node, depth=2, investigation_id=None, max_nodes=DEFAULT_MAX_NODES):
+    """Nodes within depth hops of node and the edges between them.
+
+    Traversal is breadth first, one indexed query per hop, and stops adding
+    nodes at max_nodes. Edges observed in several entries are collapsed into
+    one, listing the investigations they were seen in.
+    """
+    depth = min(max(depth, 1), MAX_DEPTH)
+    depths = {node.id: 0}
+    frontier = [node.id]
+    edges = {}
+    truncated = False
+
+    for hop in range(1, depth + 1):
+        next_frontier = []
+        for source_id, target_id, relation, edge_investigation in _adjacent_edges(frontier, investigation_id):
+            for node_id in (source_id, target_id):
+                if node_id not in depths:
+                    if len(depths) >= max_nodes:
+                        truncated = True
+                        continue
+                    depths[node_id] = hop
+                    next_frontier.append(node_id)
+            if source_id in depths and target_id in depths:
+                edges.setdefault((source_id, target_id, relation), set()).add(edge_investigation)
+        frontier = next_frontier
+        if not frontier:
+            break
+
+    nodes = {}
+    for chunk in _chunks(depths):
+        for graph_node in GraphNode.query.filter(GraphNode.id.in_(chunk)):
+            nodes[graph_node.id] = dict(graph_node.to_dict(), depth=depths[graph_node.id])
+
+    return {
+        'root': nodes[node.id],
+        'depth': depth,
+        'nodes': sorted(nodes.values(), key=lambda item: (item['depth'], item['type'], item['value'])),
+        'edges': [
+            {'source': source_id, 'target': target_id, 'relation': relation, 'investigations': sorted(investigations)}
+            for (source_id, target_id, relation), investigations in sorted(edges.items())
+        ],
+        'truncated': truncated
+    }
+
+def shared_infrastructure(investigation_id=None, node_types=INFRASTRUCTURE_TYPES, min_investigations=2, limit=100):
+    """Infrastructure nodes reached from at least min_investigations investigations.
+
+    With an investigation_id, only nodes that investigation reaches are
+    returned, i.e. its overlaps with other investigations.
+    """
+    edges = GraphEdge.__table__
+    investigations = func.count(edges.c.investigation_id.distinct())
+    query = select(edges.c.target_id, investigations).join(
+        GraphNode, GraphNode.id == edges.c.target_id
+    ).where(GraphNode.node_type.in_(node_types)).group_by(edges.c.target_id).having(
+        investigations >= min_investigations
+    ).order_by(investigations.desc(), edges.c.target_id).limit(limit)
+    if investigation_id is not None:
+        reached = select(edges.c.target_id).where(edges.c.investigation_id == investigation_id)
+        query = query.where(edges.c.target_id.in_(reached))
+    counts = db.session.execute(query).all()
+    if not counts:
+        return []
+
+    node_ids = [node_id for node_id, _ in counts]
+    nodes = {graph_node.id: graph_node for graph_node in GraphNode.query.filter(GraphNode.id.in_(node_ids))}
+    sources = {}
+    linked = select(edges.c.target_id, edges.c.investigation_id, GraphNode.node_type, GraphNode.value).join(
+        GraphNode, GraphNode.id == edges.c.source_id
+    ).where(edges.c.target_id.in_(node_ids)).distinct()
+    for target_id, edge_investigation, node_type, value in db.session.execute(linked):
+        shared = sources.setdefault(target_id, {'investigations': set(), 'linked': set()})
+        shared['investigations'].add(edge_investigation)
+        shared['linked'].add((node_type, value))
+
+    return [
+        dict(
+            nodes[node_id].to_dict(),
+            investigation_count=count,
+            investigations=sorted(sources[node_id]['investigations']),
+            linked_nodes=[{'type': node_type, 'value': value} for node_type, value in sorted(sources[node_id]['linked'])]
+        )
+        for node_id, count in counts
+    ]
+
+@app.cli.command('rebuild-graph')
+def rebuild_graph_command():
+    """Re-derive the entity graph from all data entries"""
+    click.echo(f"Entries linked: {rebuild_graph()}")
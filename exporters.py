@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+from sqlalchemy import select
+from app import db
+from models import DataEntry
+from columnar import iter_columnar_export as _iter_columnar
+
+# Rows fetched per server-side batch and rows emitted per response chunk
+EXPORT_BATCH_SIZE = 500
+CHUNK_ROWS = 100
+
+def iter_entries(investigation_id, batch_size=EXPORT_BATCH_SIZE):
+    """Stream an investigation's entries from the database in fixed-size batches"""
+    query = select(DataEntry).where(DataEntry.investigation_id == investigation_id).order_by(DataEntry.id)
+    return db.session.execute(query.execution_options(yield_per=batch_size)).scalars()
+
+def investigation_header(investigation):
+    """Investigation fields included at the top of JSON exports"""
+    return {
+        'id': investigation.id,
+        'name': investigation.name,
+        'description': investigation.description,
+        'created_at': investigation.created_at.isoformat(),
+        'updated_at': investigation.updated_at.isoformat()
+    }
+
+def entry_record(entry):
+    """Serialize one entry for JSON style exports"""
+    return {
+        'id': entry.id,
+        'source_type': entry.source_type,
+        'source_url': entry.source_url,
+        'target': entry.target,
+        'data': entry.get_data_dict(),
+        'metadata': entry.get_metadata_dict(),
+        'collected_at': entry.collected_at.isoformat(),
+        'confidence_score': entry.confidence_score
+    }
+
+def _chunked(lines):
+    """Group small strings into larger chunks to keep per-yield overhead low"""
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= CHUNK_ROWS:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+def iter_json_export(investigation):
+    """Yield a single JSON document without holding all entries in memory"""
+    header = json.dumps(investigation_header(investigation))
+    yield '{"investigation": ' + header + ', "data_entries": ['
+
+    def records():
+        separator = ''
+        for entry in iter_entries(investigation.id):
+            yield separator + json.dumps(entry_record(entry))
+            separator = ', '
+
+    yield from _chunked(records())
+    yield ']}\n'
+
+def iter_ndjson_export(investigation):
+    """Yield one JSON object per line, one line per entry"""
+    def records():
+        for entry in iter_entries(investigation.id):
+            record = entry_record(entry)
+            record['investigation_id'] = investigation.id
+            yield json.dumps(record) + '\n'
+
+    yield from _chunked(records())
+
+def iter_csv_export(investigation):
+    """Yield CSV rows with a truncated data summary per entry"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def flush():
+        value = output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+        return value
+
+    # Write headers
+    writer.writerow(['ID', 'Source Type', 'Target', 'Source URL', 'Collected At', 'Confidence Score', 'Data Summary'])
+    yield flush()
+
+    rows = 0
+    for entry in iter_entries(investigation.id):
+        data_text = str(entry.get_data_dict())
+        data_summary = data_text[:100] + '...' if len(data_text) > 100 else data_text
+        writer.writerow([
+            entry.id,
+            entry.source_type,
+            entry.target,
+            entry.source_url,
+            entry.collected_at.strftime('%Y-%m-%d %H:%M:%S'),
+            entry.confidence_score,
+            data_summary
+        ])
+        rows += 1
+        if rows % CHUNK_ROWS == 0:
+            yield flush()
+
+    remaining = flush()
+    if remaining:
+        yield remaining
+
+def iter_columnar_export(investigation):
+    """Yield the binary columnar format, one row group per database batch window"""
+    yield from _iter_columnar(investigation, iter_entries(investigation.id))
+
+# format -> (generator, content type, file extension)
+EXPORT_FORMATS = {
+    'json': (iter_json_export, 'application/json', 'json'),
+    'ndjson': (iter_ndjson_export, 'application/x-ndjson', 'ndjson'),
+    'csv': (iter_csv_export, 'text/csv', 'csv'),
+    'columnar': (iter_columnar_export, 'application/octet-stream', 'ocol')
+}
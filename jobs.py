@@ -0,0 +1,317 @@
+import os
+import time
+import socket
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from app import app, db
+from sqlalchemy import select
+from models import Investigation, DataEntry, AnalysisResult, AnalysisState, Job
+from osint_sources import OSINTCollector
+from data_analyzer import DataAnalyzer, STATE_VERSION
+from analytics_engine import EntryColumns, ENTRY_COLUMNS, build_state
+from metrics import stage_duration, job_duration, jobs_finished, jobs_in_flight
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# Running jobs owned by another host are presumed dead after this long
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', '3600'))
+
+# Entries loaded into columns per chunk while folding new rows into the analysis state
+ANALYSIS_BATCH_SIZE = 20000
+
+# Entries collected longer ago than this are presumed committed, so the analysis
+# high-water mark may pass them; newer ones are re-scanned on the next run
+ANALYSIS_SETTLE_SECONDS = int(os.environ.get('ANALYSIS_SETTLE_SECONDS', '300'))
+
+class JobQueue:
+    """In-process job queue backed by the Job table.
+
+    Jobs are persisted before they are handed to a local thread pool, so their
+    status survives the request that created them and any job still queued
+    when a worker restarts is picked up again by recover().
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.handlers = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job') if max_workers > 0 else None
+
+    def register(self, job_type):
+        """Decorator registering the handler for a job type"""
+        def decorator(func):
+            self.handlers[job_type] = func
+            return func
+        return decorator
+
+    def enqueue(self, job_type, investigation_id=None, payload=None):
+        """Persist a new job and schedule it for execution"""
+        if job_type not in self.handlers:
+            raise ValueError(f"Unsupported job type: {job_type}")
+
+        payload = dict(payload or {})
+        profile = profiling.current()
+        if profile is not None:
+            # Profile the job too, linked to the request that queued it
+            payload['profile_parent'] = profile.id
+
+        job = Job(job_type=job_type, investigation_id=investigation_id, status='queued')
+        job.set_payload_dict(payload)
+        db.session.add(job)
+        db.session.commit()
+
+        self._submit(job.id)
+        return job
+
+    def recover(self):
+        """Reschedule queued jobs and jobs left running by a process that has stopped"""
+        for job in Job.query.filter_by(status='running').all():
+            if self._is_stale(job):
+                # Only requeue it if no other process has finished or reclaimed it meanwhile
+                requeued = Job.query.filter_by(id=job.id, status='running', worker=job.worker).update(
+                    {'status': 'queued', 'started_at': None, 'worker': None}
+                )
+                if requeued:
+                    logger.warning(f"Requeued job {job.id} ({job.job_type}) left running by {job.worker or 'unknown worker'}")
+        db.session.commit()
+        
+        queued_ids = [job_id for (job_id,) in db.session.query(Job.id).filter_by(status='queued').all()]
+        for job_id in queued_ids:
+            self._submit(job_id)
+        return len(queued_ids)
+
+    def _is_stale(self, job):
+        """Whether the process that claimed a running job is gone"""
+        host, _, pid = (job.worker or '').rpartition(':')
+        if host == socket.gethostname() and pid.isdigit():
+            if int(pid) == os.getpid():
+                # This process is only starting, so it cannot be running the job
+                return True
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return True
+            except PermissionError:
+                return False
+            return False
+        # Other hosts cannot be checked, so fall back to the job's age
+        return job.started_at is None or job.started_at < datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+
+    def _submit(self, job_id):
+        """Hand a job over to the worker pool, or run it inline without one"""
+        if self.executor is None:
+            self._run(job_id)
+        else:
+            self.executor.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        """Execute a job inside its own application context"""
+        with app.app_context():
+            # Claim the job atomically so a job is never run twice
+            claimed = Job.query.filter_by(id=job_id, status='queued').update(
+                {'status': 'running', 'started_at': datetime.utcnow(), 'worker': f"{socket.gethostname()}:{os.getpid()}"}
+            )
+            db.session.commit()
+            if not claimed:
+                return
+
+            job = db.session.get(Job, job_id)
+            job_type = job.job_type
+            started = time.perf_counter()
+            jobs_in_flight.inc(job_type=job_type)
+            try:
+                payload = job.get_payload_dict()
+                parent_id = payload.get('profile_parent')
+                with profiling.capture(f"job {job_type}", enabled=parent_id is not None, kind='job',
+                                       job_id=job_id, parent_id=parent_id):
+                    result = self.handlers[job_type](job.investigation_id, payload)
+                job.set_result_dict(result or {})
+                job.status = 'completed'
+            except Exception as e:
+                db.session.rollback()
+                job = db.session.get(Job, job_id)
+                logger.error(f"Job {job_id} ({job_type}) failed: {str(e)}")
+                job.status = 'failed'
+                job.error = str(e)
+            finally:
+                jobs_in_flight.dec(job_type=job_type)
+                job_duration.observe(time.perf_counter() - started, job_type=job_type)
+            jobs_finished.inc(job_type=job_type, status=job.status)
+
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+job_queue = JobQueue(max_workers=int(os.environ.get('JOB_WORKERS', '4')))
+
+@job_queue.register('collect')
+def run_collection(investigation_id, payload):
+    """Collect OSINT data for one target and store a DataEntry per source"""
+    investigation = db.session.get(Investigation, investigation_id)
+    if investigation is None:
+        raise ValueError(f"Investigation {investigation_id} not found")
+
+    target = payload['target']
+    force_refresh = payload.get('force_refresh', False)
+    collector = OSINTCollector()
+
+    collected_count = 0
+    errors = []
+    # Sources are fetched concurrently; rows are still written one per source
+    for source_type, data in collector.collect_many(payload['source_types'], target, force_refresh):
+        try:
+            if data:
+                entry = DataEntry(
+                    investigation_id=investigation_id,
+                    source_type=source_type,
+                    target=target,
+                    source_url=data.get('source_url', ''),
+                    confidence_score=data.get('confidence_score', 0.0)
+                )
+                entry.set_data_dict(data.get('data', {}))
+                entry.set_metadata_dict(data.get('metadata', {}))
+
+                db.session.add(entry)
+                collected_count += 1
+                if data.get('error'):
+                    errors.append({'source_type': source_type, 'error': data['error']})
+        except Exception as e:
+            logger.error(f"Error collecting from {source_type}: {str(e)}")
+            errors.append({'source_type': source_type, 'error': str(e)})
+            continue
+
+    if collected_count > 0:
+        # Update investigation timestamp
+        investigation.updated_at = datetime.utcnow()
+        with stage_duration.time(stage='db_write'):
+            db.session.commit()
+
+    return {
+        'target': target,
+        'collected_count': collected_count,
+        'errors': errors
+    }
+
+def analysis_query(investigation_id, after_id=0):
+    """Select the engine's columns for an investigation's entries above a high-water mark"""
+    return select(*[getattr(DataEntry, name) for name in ENTRY_COLUMNS]).where(
+        DataEntry.investigation_id == investigation_id,
+        DataEntry.id > after_id
+    ).order_by(DataEntry.id)
+
+class EntryWatermark:
+    """Which entries of an investigation are already folded into its analysis state.
+    
+    Ids are handed out when a transaction inserts but become visible when it
+    commits, so a lower id can appear after a higher one was analyzed. The
+    mark therefore only passes entries collected more than
+    ANALYSIS_SETTLE_SECONDS ago; newer entries are folded in but their ids
+    are remembered, and the next run re-scans above the mark and skips them.
+    """
+
+    def __init__(self, last_entry_id=0, folded_ids=(), settle_seconds=ANALYSIS_SETTLE_SECONDS):
+        self.last_entry_id = last_entry_id
+        self.folded = set(folded_ids)
+        self.settled_before = datetime.utcnow() - timedelta(seconds=settle_seconds)
+        self.settled = True
+
+    def new_rows(self, rows):
+        """The rows not folded in yet, from rows above the mark in id order"""
+        fresh = []
+        for row in rows:
+            entry_id, collected_at = row[0], row[_COLLECTED_AT]
+            if entry_id not in self.folded:
+                fresh.append(row)
+                self.folded.add(entry_id)
+            # Advance only through an unbroken run of settled entries
+            if self.settled and (collected_at is None or collected_at <= self.settled_before):
+                self.last_entry_id = entry_id
+            else:
+                self.settled = False
+        return fresh
+
+    def folded_ids(self):
+        """Folded ids still above the mark, to skip on the next run"""
+        return sorted(entry_id for entry_id in self.folded if entry_id > self.last_entry_id)
+
+_COLLECTED_AT = ENTRY_COLUMNS.index('collected_at')
+
+def load_analysis_state(analyzer, investigation_id, rebuild=False):
+    """Return (record, state, watermark) to continue an investigation's analysis from"""
+    record = AnalysisState.query.filter_by(investigation_id=investigation_id).first()
+    
+    # The state row is only written at the end, so no write lock is held while folding
+    state = record.get_state_dict() if record else {}
+    if rebuild or state.get('version') != STATE_VERSION:
+        return record, analyzer.new_state(), EntryWatermark()
+    return record, state, EntryWatermark(record.last_entry_id, record.folded_entry_ids or ())
+
+def save_analysis(analyzer, investigation_id, record, state, watermark, new_entries):
+    """Store finalized results and the folded state; returns the job result dict"""
+    if state['entry_count'] == 0:
+        return {'analyses': [], 'message': 'No data available for analysis'}
+    
+    existing = {
+        result.analysis_type: result
+        for result in AnalysisResult.query.filter_by(investigation_id=investigation_id).order_by(AnalysisResult.created_at)
+    }
+    if new_entries == 0 and all(analysis_type in existing for analysis_type in ('pattern', 'correlation', 'timeline')):
+        return {'analyses': [], 'entries_analyzed': 0, 'message': 'Analysis is already up to date'}
+    
+    # Save analysis results, refreshing the previous result of each type in place
+    with stage_duration.time(stage='analysis_finalize'):
+        analyses = [
+            ('pattern', 'Pattern Analysis', analyzer.finalize_patterns(state)),
+            ('correlation', 'Correlation Analysis', analyzer.finalize_correlations(state)),
+            ('timeline', 'Timeline Analysis', analyzer.finalize_timeline(state))
+        ]
+    
+    saved = []
+    for analysis_type, title, results in analyses:
+        if results:
+            analysis_result = existing.get(analysis_type)
+            if analysis_result is None:
+                analysis_result = AnalysisResult(investigation_id=investigation_id, analysis_type=analysis_type)
+                db.session.add(analysis_result)
+            analysis_result.title = title
+            analysis_result.description = f"Automated {title.lower()} of collected data"
+            analysis_result.confidence = results.get('confidence', 0.0)
+            analysis_result.created_at = datetime.utcnow()
+            analysis_result.set_results_dict(results)
+            saved.append(analysis_type)
+    
+    if record is None:
+        record = AnalysisState(investigation_id=investigation_id)
+        db.session.add(record)
+    record.set_state_dict(state)
+    record.last_entry_id = watermark.last_entry_id
+    record.folded_entry_ids = watermark.folded_ids()
+    with stage_duration.time(stage='db_write'):
+        db.session.commit()
+    return {'analyses': saved, 'entries_analyzed': new_entries, 'total_entries': state['entry_count']}
+
+@job_queue.register('analyze')
+def run_analysis(investigation_id, payload):
+    """Fold entries added since the last run into the stored analysis state.
+    
+    Only rows above the state's high-water mark are read (see EntryWatermark),
+    so re-analysing a growing investigation costs O(new rows). Pass 'rebuild'
+    in the payload to start again from an empty state.
+    """
+    analyzer = DataAnalyzer()
+    record, state, watermark = load_analysis_state(analyzer, investigation_id, payload.get('rebuild'))
+    
+    # Plain column tuples from one query, analyzed a chunk of columns at a time
+    query = analysis_query(investigation_id, watermark.last_entry_id).execution_options(yield_per=ANALYSIS_BATCH_SIZE)
+    
+    new_entries = 0
+    for rows in db.session.execute(query).partitions():
+        rows = watermark.new_rows(rows)
+        if not rows:
+            continue
+        columns = EntryColumns().append_rows(rows)
+        chunk_state = build_state(columns)
+        state = analyzer.merge_into(state, chunk_state) if state['entry_count'] else chunk_state
+        new_entries += len(columns)
+    
+    return save_analysis(analyzer, investigation_id, record, state, watermark, new_entries)
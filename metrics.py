@@ -0,0 +1,250 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Counters, gauges and histograms are plain dicts keyed by label values and
+guarded by one lock per metric, so recording a sample costs a dict lookup
+and a bisect. Values that already live elsewhere (cache hit counters, pool
+sizes) are copied into gauges by scrape callbacks when /metrics is read
+instead of on every operation. This module has no Flask or database
+imports, so the analytics engine and worker processes can record samples
+too; samples recorded in worker processes stay in those processes.
+"""
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base class holding the name, help text and label names of a metric"""
+
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+
+    metric_type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        """Count the enclosed block as in flight while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed upper bounds"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            sample = self.values.get(key)
+            if sample is None:
+                sample = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the enclosed block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self.lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self.values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Named metrics of one process, rendered together"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.scrape_callbacks = []
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def on_scrape(self, callback):
+        """Register a function run before every render, e.g. to copy external stats into gauges"""
+        self.scrape_callbacks.append(callback)
+        return callback
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        for callback in self.scrape_callbacks:
+            callback()
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+# Routes
+http_request_duration = registry.histogram(
+    'osint_http_request_duration_seconds', 'Request latency per route', ('route', 'method')
+)
+http_requests = registry.counter(
+    'osint_http_requests_total', 'Requests per route and status code', ('route', 'method', 'status')
+)
+http_requests_in_flight = registry.gauge('osint_http_requests_in_flight', 'Requests being handled')
+
+# Collection
+collection_duration = registry.histogram(
+    'osint_collection_duration_seconds', 'Uncached collector latency per source type', ('source_type',)
+)
+collection_errors = registry.counter(
+    'osint_collection_errors_total', 'Collections that returned an error, per source type', ('source_type',)
+)
+collections_in_flight = registry.gauge(
+    'osint_collections_in_flight', 'Collector calls in progress per source type', ('source_type',)
+)
+cache_lookups = registry.counter(
+    'osint_cache_lookups_total', 'Result cache lookups per source type and outcome', ('source_type', 'result')
+)
+
+# Copied from the result cache, request scheduler and collection engine at scrape time
+cache_hit_ratio = registry.gauge('osint_cache_hit_ratio', 'Share of result cache lookups served from the cache')
+cache_events = registry.gauge('osint_cache_events', 'Result cache counters since start', ('event',))
+outbound_requests = registry.gauge('osint_outbound_requests', 'Outbound HTTP requests per host and outcome since start', ('host', 'event'))
+outbound_in_flight = registry.gauge('osint_outbound_requests_in_flight', 'Outbound HTTP requests in progress per host', ('host',))
+outbound_queue_wait = registry.gauge(
+    'osint_outbound_queue_wait_seconds', 'Time outbound requests waited for a rate-limit slot per host', ('host', 'statistic')
+)
+collection_queue = registry.gauge('osint_collection_queued_tasks', 'Collector calls waiting for a worker', ('concurrency',))
+
+# Pipeline stages: fetch, extract, db_write, analysis passes, ...
+stage_duration = registry.histogram(
+    'osint_stage_duration_seconds', 'Latency of pipeline stages', ('stage',)
+)
+
+# Background jobs
+job_duration = registry.histogram(
+    'osint_job_duration_seconds', 'Background job run time per type', ('job_type',),
+    buckets=DEFAULT_BUCKETS + (120.0, 300.0, 600.0)
+)
+jobs_finished = registry.counter('osint_jobs_total', 'Finished background jobs per type and status', ('job_type', 'status'))
+jobs_in_flight = registry.gauge('osint_jobs_in_flight', 'Background jobs running per type', ('job_type',))
+
+def init_app(app):
+    """Time every request of a Flask app by its URL rule"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+    @app.teardown_request
+    def _finish_request_timer(error=None):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        http_requests_in_flight.dec()
+        # The URL rule keeps label cardinality bounded; unmatched paths share one label
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        http_request_duration.observe(time.perf_counter() - started, route=route, method=request.method)
+
+    @app.after_request
+    def _count_response(response):
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        http_requests.inc(route=route, method=request.method, status=response.status_code)
+        return response
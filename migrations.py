@@ -0,0 +1,187 @@
+import json
+import logging
+import click
+from sqlalchemy import bindparam, inspect, select, text
+from sqlalchemy.dialects.postgresql import JSONB
+from app import app, db
+from models import DataEntry, EntityMention, GraphEdge
+from entities import rebuild_entities
+from entity_graph import rebuild_graph
+from search_index import ensure_schema as ensure_search_schema, index_is_empty as search_index_is_empty, rebuild_search_index
+
+logger = logging.getLogger(__name__)
+
+def _has_rows(model):
+    return db.session.execute(select(model.id).limit(1)).first() is not None
+
+# (name, description, whether it is needed, rebuild function); a side table
+# needs a backfill while it is empty next to existing entries
+BACKFILLS = [
+    ('entities', 'entries indexed for entities', lambda: not _has_rows(EntityMention), rebuild_entities),
+    ('graph', 'entries linked into the entity graph', lambda: not _has_rows(GraphEdge), rebuild_graph),
+    ('search', 'entries indexed for search', search_index_is_empty, rebuild_search_index),
+]
+
+def pending_backfills():
+    """Names of the backfills an existing database still needs"""
+    if not _has_rows(DataEntry):
+        return []
+    return [name for name, _, needed, _ in BACKFILLS if needed()]
+
+def run_backfills():
+    """Run the pending backfills; returns {name: entries processed}"""
+    pending = pending_backfills()
+    return {name: rebuild() for name, _, _, rebuild in BACKFILLS if name in pending}
+
+def upgrade_schema(backfill=False):
+    """Bring an existing SQLite or PostgreSQL database up to the current models.
+    
+    New tables are created as before and columns and indexes declared on the
+    models that are missing from existing tables are added. Legacy TEXT
+    payload columns are only rewritten to JSONB and side tables derived from
+    the entries only backfilled with ``backfill=True`` (``flask upgrade-db``):
+    at startup every worker runs this, and concurrent table rewrites and
+    backfills would race and block the workers' boot.
+    """
+    db.create_all()
+    
+    inspector = inspect(db.engine)
+    columns_added = _add_missing_columns(inspector)
+    
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                index.create(db.engine, checkfirst=True)
+                created.append(index.name)
+            except Exception as e:
+                # Another worker may be creating the same index concurrently
+                logger.warning(f"Could not create index {index.name}: {str(e)}")
+    
+    search_created = ensure_search_schema()
+    
+    converted = {}
+    backfilled = {}
+    if backfill:
+        converted = _convert_json_columns(inspector)
+        backfilled = run_backfills()
+    else:
+        pending = _legacy_json_columns(inspector)
+        if pending:
+            logger.warning(f"Run 'flask upgrade-db' to convert to JSONB: {', '.join(f'{table.name}.{column.name}' for table, column in pending)}")
+        pending = pending_backfills()
+        if pending:
+            logger.warning(f"Run 'flask upgrade-db' to backfill: {', '.join(pending)}")
+    
+    if columns_added or created or converted or search_created or backfilled:
+        logger.info(f"Schema upgraded: {len(columns_added)} columns added, {len(created)} indexes created, "
+                    f"{len(converted)} columns converted to JSONB, search table {'created' if search_created else 'present'}, "
+                    f"backfilled {backfilled or 'nothing'}")
+    return {
+        'columns_added': columns_added,
+        'indexes_created': created,
+        'columns_converted': converted,
+        'backfilled': backfilled,
+        'search_created': search_created
+    }
+
+def _add_missing_columns(inspector):
+    """Add nullable model columns missing from existing tables"""
+    added = []
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                added.append(f"{table.name}.{column.name}")
+            except Exception as e:
+                # Another worker may be adding the same column concurrently
+                logger.warning(f"Could not add column {table.name}.{column.name}: {str(e)}")
+    return added
+
+def _legacy_json_columns(inspector):
+    """(table, column) pairs of JSON model columns still stored as TEXT on PostgreSQL.
+    
+    SQLite and MySQL read the existing JSON text as-is, so only PostgreSQL
+    needs its columns rewritten.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return []
+    pending = []
+    for table in db.metadata.sorted_tables:
+        existing = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if isinstance(column.type, db.JSON) and column.name in existing and not isinstance(existing[column.name], JSONB):
+                pending.append((table, column))
+    return pending
+
+def _convert_json_columns(inspector):
+    """Rewrite legacy TEXT payload columns as JSONB; returns {column: invalid values cleared}"""
+    converted = {}
+    for table, column in _legacy_json_columns(inspector):
+        name = f"{table.name}.{column.name}"
+        try:
+            with db.engine.begin() as connection:
+                # Concurrent upgrade-db runs take turns; a later one finds the column converted
+                connection.execute(text('SELECT pg_advisory_xact_lock(hashtext(:name))'), {'name': name})
+                data_type = connection.execute(text(
+                    'SELECT data_type FROM information_schema.columns '
+                    'WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column'
+                ), {'table': table.name, 'column': column.name}).scalar()
+                if data_type == 'jsonb':
+                    continue
+                cleared = _clear_invalid_json(connection, table, column)
+                connection.execute(text(
+                    f'ALTER TABLE "{table.name}" ALTER COLUMN "{column.name}" '
+                    f'TYPE JSONB USING NULLIF("{column.name}", \'\')::jsonb'
+                ))
+            converted[name] = cleared
+            if cleared:
+                logger.warning(f"Cleared {cleared} invalid JSON values in {name}")
+        except Exception as e:
+            logger.warning(f"Could not convert {name} to JSONB: {str(e)}")
+    return converted
+
+def _clear_invalid_json(connection, table, column, batch_size=1000):
+    """Set legacy text values that are not valid JSON to NULL, which get_*_dict() reads as {}"""
+    invalid = []
+    rows = connection.execution_options(stream_results=True).execute(text(
+        f'SELECT id, "{column.name}" FROM "{table.name}" WHERE "{column.name}" IS NOT NULL AND "{column.name}" <> \'\''
+    ))
+    for row_id, value in rows:
+        try:
+            json.loads(value)
+        except ValueError:
+            invalid.append(row_id)
+    for start in range(0, len(invalid), batch_size):
+        connection.execute(
+            text(f'UPDATE "{table.name}" SET "{column.name}" = NULL WHERE id IN :ids').bindparams(bindparam('ids', expanding=True)),
+            {'ids': invalid[start:start + batch_size]}
+        )
+    return len(invalid)
+
+@app.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Create missing tables, columns and indexes, convert legacy JSON columns and backfill derived tables"""
+    result = upgrade_schema(backfill=True)
+    click.echo(f"Columns added: {', '.join(result['columns_added']) or 'none'}")
+    click.echo(f"Indexes created: {', '.join(result['indexes_created']) or 'none'}")
+    click.echo(f"Columns converted to JSONB: {', '.join(result['columns_converted']) or 'none'}")
+    for name, cleared in result['columns_converted'].items():
+        if cleared:
+            click.echo(f"Invalid JSON values cleared in {name}: {cleared}")
+    for name, description, _, _ in BACKFILLS:
+        if name in result['backfilled']:
+            click.echo(f"Backfill {name}: {result['backfilled'][name]} {description}")
+
+@app.cli.command('rebuild-entities')
+def rebuild_entities_command():
+    """Re-extract the entity side table from all data entries"""
+    click.echo(f"Entries indexed: {rebuild_entities()}")
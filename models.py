@@ -1,6 +1,11 @@
 from app import db
 from datetime import datetime
-import json
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm.attributes import flag_modified
+
+# Native JSON column: JSONB on PostgreSQL, JSON elsewhere (stored as text on SQLite).
+# Values are decoded once when a row is loaded and kept on the instance.
+JSONColumn = db.JSON().with_variant(JSONB(), 'postgresql')
 
 class Investigation(db.Model):
     """Model for storing investigation cases"""
@@ -21,32 +26,38 @@ class DataEntry(db.Model):
     source_type = db.Column(db.String(100), nullable=False)  # 'website', 'social_media', 'dns', etc.
     source_url = db.Column(db.String(500))
     target = db.Column(db.String(200), nullable=False)  # Search target/query
-    data = db.Column(db.Text)  # JSON string of collected data
-    meta_data = db.Column(db.Text)  # JSON string of metadata
+    data = db.Column(JSONColumn)  # JSON document of collected data
+    meta_data = db.Column(JSONColumn)  # JSON document of metadata
     collected_at = db.Column(db.DateTime, default=datetime.utcnow)
     confidence_score = db.Column(db.Float, default=0.0)
     
+    # Entities extracted from the payload, maintained by entities.py
+    entities = db.relationship('EntityMention', backref='entry', lazy=True, cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_data_entry_investigation_collected', 'investigation_id', 'collected_at'),
+        db.Index('ix_data_entry_investigation_source', 'investigation_id', 'source_type'),
+        db.Index('ix_data_entry_investigation_target', 'investigation_id', 'target'),
+    )
+    
     def get_data_dict(self):
-        """Parse JSON data string to dictionary"""
-        try:
-            return json.loads(self.data) if self.data else {}
-        except json.JSONDecodeError:
-            return {}
+        """Return the decoded JSON data as a dictionary"""
+        return self.data if self.data is not None else {}
     
     def set_data_dict(self, data_dict):
-        """Convert dictionary to JSON string"""
-        self.data = json.dumps(data_dict)
+        """Store a dictionary in the JSON data column"""
+        self.data = data_dict
+        # Mark as changed even when the same, mutated dict is passed back in
+        flag_modified(self, 'data')
     
     def get_metadata_dict(self):
-        """Parse JSON metadata string to dictionary"""
-        try:
-            return json.loads(self.meta_data) if self.meta_data else {}
-        except json.JSONDecodeError:
-            return {}
+        """Return the decoded JSON metadata as a dictionary"""
+        return self.meta_data if self.meta_data is not None else {}
     
     def set_metadata_dict(self, metadata_dict):
-        """Convert dictionary to JSON string"""
-        self.meta_data = json.dumps(metadata_dict)
+        """Store a dictionary in the JSON metadata column"""
+        self.meta_data = metadata_dict
+        flag_modified(self, 'meta_data')
 
 class AnalysisResult(db.Model):
     """Model for storing analysis results and patterns"""
@@ -55,17 +66,139 @@ class AnalysisResult(db.Model):
     analysis_type = db.Column(db.String(100), nullable=False)  # 'pattern', 'correlation', 'timeline'
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    results = db.Column(db.Text)  # JSON string of analysis results
+    results = db.Column(JSONColumn)  # JSON document of analysis results
     confidence = db.Column(db.Float, default=0.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_analysis_result_investigation_created', 'investigation_id', 'created_at'),
+        db.Index('ix_analysis_result_investigation_type', 'investigation_id', 'analysis_type'),
+    )
+    
     def get_results_dict(self):
-        """Parse JSON results string to dictionary"""
-        try:
-            return json.loads(self.results) if self.results else {}
-        except json.JSONDecodeError:
-            return {}
+        """Return the decoded JSON results as a dictionary"""
+        return self.results if self.results is not None else {}
     
     def set_results_dict(self, results_dict):
-        """Convert dictionary to JSON string"""
-        self.results = json.dumps(results_dict)
+        """Store a dictionary in the JSON results column"""
+        self.results = results_dict
+        flag_modified(self, 'results')
+
+class Job(db.Model):
+    """Model for background collection and analysis jobs"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)  # 'collect', 'analyze'
+    investigation_id = db.Column(db.Integer, db.ForeignKey('investigation.id'))
+    status = db.Column(db.String(20), default='queued', nullable=False)  # 'queued', 'running', 'completed', 'failed'
+    payload = db.Column(JSONColumn)  # JSON document of job arguments
+    result = db.Column(JSONColumn)  # JSON document of job outcome
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    worker = db.Column(db.String(255))  # 'host:pid' of the process running the job
+    
+    __table_args__ = (
+        db.Index('ix_job_status', 'status'),
+        db.Index('ix_job_investigation_status', 'investigation_id', 'status'),
+    )
+    
+    def get_payload_dict(self):
+        """Return the decoded JSON payload as a dictionary"""
+        return self.payload if self.payload is not None else {}
+    
+    def set_payload_dict(self, payload_dict):
+        """Store a dictionary in the JSON payload column"""
+        self.payload = payload_dict
+        flag_modified(self, 'payload')
+    
+    def get_result_dict(self):
+        """Return the decoded JSON result as a dictionary"""
+        return self.result if self.result is not None else {}
+    
+    def set_result_dict(self, result_dict):
+        """Store a dictionary in the JSON result column"""
+        self.result = result_dict
+        flag_modified(self, 'result')
+    
+    def to_dict(self):
+        """Serialize job status for the jobs API"""
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'investigation_id': self.investigation_id,
+            'status': self.status,
+            'result': self.get_result_dict(),
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class AnalysisState(db.Model):
+    """Model for storing mergeable analysis state per investigation"""
+    id = db.Column(db.Integer, primary_key=True)
+    investigation_id = db.Column(db.Integer, db.ForeignKey('investigation.id'), nullable=False, unique=True)
+    state = db.Column(JSONColumn)  # JSON document of DataAnalyzer state
+    last_entry_id = db.Column(db.Integer, default=0, nullable=False)  # High-water mark of folded entries
+    folded_entry_ids = db.Column(JSONColumn)  # Ids above the mark already folded in, not yet settled
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False)
+    
+    # Concurrent analysis runs on the same investigation fail instead of double-counting
+    __mapper_args__ = {'version_id_col': version}
+    
+    def get_state_dict(self):
+        """Return the decoded JSON state as a dictionary"""
+        return self.state if self.state is not None else {}
+    
+    def set_state_dict(self, state_dict):
+        """Store a dictionary in the JSON state column"""
+        self.state = state_dict
+        flag_modified(self, 'state')
+
+class EntityMention(db.Model):
+    """Model for entities (IPs, domains, emails) extracted from data entries"""
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('data_entry.id', ondelete='CASCADE'), nullable=False)
+    investigation_id = db.Column(db.Integer, db.ForeignKey('investigation.id'), nullable=False)
+    entity_type = db.Column(db.String(20), nullable=False)  # 'ip', 'domain', 'email'
+    value = db.Column(db.String(320), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_entity_mention_lookup', 'entity_type', 'value', 'investigation_id'),
+        db.Index('ix_entity_mention_investigation', 'investigation_id', 'entity_type'),
+        db.Index('ix_entity_mention_entry', 'entry_id'),
+    )
+
+class GraphNode(db.Model):
+    """Model for entity graph nodes shared by all investigations"""
+    id = db.Column(db.Integer, primary_key=True)
+    node_type = db.Column(db.String(20), nullable=False)  # 'domain', 'hostname', 'ip', 'email', 'username'
+    value = db.Column(db.String(320), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('node_type', 'value', name='uq_graph_node_type_value'),
+    )
+    
+    def to_dict(self):
+        """Serialize a node for the graph API"""
+        return {'id': self.id, 'type': self.node_type, 'value': self.value}
+
+class GraphEdge(db.Model):
+    """Model for entity graph edges, one row per relation observed in a data entry"""
+    id = db.Column(db.Integer, primary_key=True)
+    source_id = db.Column(db.Integer, db.ForeignKey('graph_node.id'), nullable=False)
+    target_id = db.Column(db.Integer, db.ForeignKey('graph_node.id'), nullable=False)
+    relation = db.Column(db.String(30), nullable=False)  # 'resolves_to', 'name_server', 'mail_exchange', ...
+    entry_id = db.Column(db.Integer, db.ForeignKey('data_entry.id', ondelete='CASCADE'), nullable=False)
+    investigation_id = db.Column(db.Integer, db.ForeignKey('investigation.id'), nullable=False)
+    
+    # Adjacency in both directions, so traversals never scan the edge table
+    __table_args__ = (
+        db.Index('ix_graph_edge_source', 'source_id', 'target_id', 'investigation_id'),
+        db.Index('ix_graph_edge_target', 'target_id', 'source_id', 'investigation_id'),
+        db.Index('ix_graph_edge_investigation', 'investigation_id', 'target_id'),
+        db.Index('ix_graph_edge_entry', 'entry_id'),
+    )
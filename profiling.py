@@ -0,0 +1,346 @@
+"""Opt-in profiling of requests, background jobs, collectors and analysis passes.
+
+A request is profiled when it sends ``X-Profile: 1`` or ``?profile=1`` with
+the PROFILE_TOKEN in ``X-Profile-Token`` or ``profile_token``, and requests
+and jobs are also sampled at PROFILE_SAMPLE_RATE. Without a configured token
+on-demand triggers are ignored and stored profiles cannot be read.
+While a profile is active in a context, cProfile records function timings on
+its thread, SQLAlchemy cursor events count and time every query, and
+functions decorated with @section record wall and CPU time, including calls
+handed to the collection workers. Jobs queued by a profiled request are
+profiled too and point back to it through ``parent_id``.
+
+Finished profiles live in a bounded in-memory store per process, like the
+metrics. Without an active profile every hook costs one context variable
+lookup. Batch analysis shards run in worker processes and are not profiled.
+"""
+import os
+import time
+import hmac
+import uuid
+import random
+import pstats
+import marshal
+import cProfile
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_MAX_STORED = int(os.environ.get('PROFILE_MAX_STORED', '50'))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN') or None
+
+PROFILE_HEADER = 'X-Profile'
+TOKEN_HEADER = 'X-Profile-Token'
+# Never sampled: reading profiles or metrics should not produce more of them
+EXCLUDED_PATHS = ('/admin/profiles', '/metrics', '/static/')
+
+# Rows kept per profile, slowest first
+TOP_FUNCTIONS = 40
+TOP_STATEMENTS = 25
+MAX_STATEMENT_LENGTH = 500
+
+_current = contextvars.ContextVar('profile', default=None)
+# cProfile hooks one profiler per thread, so nested sections reuse the running one
+_thread_state = threading.local()
+
+class Profile:
+    """Timings gathered for one request or job"""
+
+    def __init__(self, name, **info):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.info = info
+        self.started_at = datetime.utcnow()
+        self.lock = threading.Lock()
+        self.sections = {}
+        self.statements = {}
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.profilers = []
+        self.notes = set()
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.functions = []
+        self.stats_data = None
+
+    def add_query(self, statement, seconds):
+        statement = ' '.join(statement.split())[:MAX_STATEMENT_LENGTH]
+        with self.lock:
+            self.query_count += 1
+            self.query_seconds += seconds
+            totals = self.statements.get(statement)
+            if totals is None:
+                totals = self.statements[statement] = [0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+
+    def add_section(self, name, wall, cpu):
+        with self.lock:
+            totals = self.sections.get(name)
+            if totals is None:
+                totals = self.sections[name] = [0, 0.0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            totals[3] = max(totals[3], wall)
+
+    def note(self, message):
+        with self.lock:
+            self.notes.add(message)
+
+    def finalize(self):
+        """Merge the per-thread cProfile data and keep the slowest functions"""
+        with self.lock:
+            profilers, self.profilers = self.profilers, []
+        if not profilers:
+            return
+        stats = pstats.Stats(*profilers)
+        # Same format as pstats.Stats.dump_stats, so the download opens in pstats or snakeviz
+        self.stats_data = marshal.dumps(stats.stats)
+        slowest = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        self.functions = [
+            {
+                'function': f"{filename}:{line}({function})",
+                'calls': calls,
+                'primitive_calls': primitive_calls,
+                'own_seconds': round(own, 6),
+                'cumulative_seconds': round(cumulative, 6)
+            }
+            for (filename, line, function), (primitive_calls, calls, own, cumulative, _) in slowest
+        ]
+
+    def summary(self):
+        return dict(
+            self.info,
+            id=self.id,
+            name=self.name,
+            started_at=self.started_at.isoformat(),
+            wall_seconds=self.wall_seconds,
+            cpu_seconds=self.cpu_seconds,
+            sql_queries=self.query_count,
+            sql_seconds=round(self.query_seconds, 6)
+        )
+
+    def to_dict(self):
+        with self.lock:
+            sections = sorted(self.sections.items(), key=lambda item: item[1][1], reverse=True)
+            statements = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+            notes = sorted(self.notes)
+        result = self.summary()
+        result.update({
+            'sections': [
+                {'name': name, 'calls': calls, 'wall_seconds': round(wall, 6), 'cpu_seconds': round(cpu, 6),
+                 'max_wall_seconds': round(longest, 6)}
+                for name, (calls, wall, cpu, longest) in sections
+            ],
+            'sql_statements': [
+                {'statement': statement, 'count': count, 'total_seconds': round(total, 6), 'max_seconds': round(longest, 6)}
+                for statement, (count, total, longest) in statements[:TOP_STATEMENTS]
+            ],
+            'sql_distinct_statements': len(statements),
+            'functions': self.functions,
+            'notes': notes
+        })
+        return result
+
+class ProfileStore:
+    """Most recent finished profiles of this process"""
+
+    def __init__(self, max_profiles=PROFILE_MAX_STORED):
+        self.max_profiles = max_profiles
+        self.profiles = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, profile):
+        with self.lock:
+            self.profiles[profile.id] = profile
+            while len(self.profiles) > self.max_profiles:
+                self.profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        with self.lock:
+            return self.profiles.get(profile_id)
+
+    def list(self, parent_id=None):
+        """Summaries, newest first, optionally only those started by one profile"""
+        with self.lock:
+            profiles = list(self.profiles.values())
+        return [
+            profile.summary() for profile in reversed(profiles)
+            if parent_id is None or profile.info.get('parent_id') == parent_id
+        ]
+
+    def clear(self):
+        with self.lock:
+            self.profiles.clear()
+
+profile_store = ProfileStore()
+
+def current():
+    """The profile active in this context, or None"""
+    return _current.get()
+
+def active():
+    return _current.get() is not None
+
+def should_sample():
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def authorized(token):
+    """Whether a caller may trigger profiles and read them; nobody may without a PROFILE_TOKEN"""
+    if PROFILE_TOKEN is None or token is None:
+        return False
+    return hmac.compare_digest(token, PROFILE_TOKEN)
+
+def _start_profiler(profile):
+    """Start cProfile on this thread unless one is already running here"""
+    if getattr(_thread_state, 'profiler', None) is not None:
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one cProfile per process at a time
+        profile.note('Function timings are incomplete: another profiler was active')
+        return None
+    _thread_state.profiler = profiler
+    return profiler
+
+def _stop_profiler(profile, profiler):
+    if profiler is None:
+        return
+    profiler.disable()
+    _thread_state.profiler = None
+    with profile.lock:
+        profile.profilers.append(profiler)
+
+def start(name, **info):
+    """Make a new profile active in this context; pass the result to finish()"""
+    profile = Profile(name, **info)
+    token = _current.set(profile)
+    profiler = _start_profiler(profile)
+    return profile, token, profiler, time.perf_counter(), time.thread_time()
+
+def finish(started, **info):
+    """Stop a profile begun by start() and store it"""
+    profile, token, profiler, wall_started, cpu_started = started
+    _stop_profiler(profile, profiler)
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Streamed responses can finish in a different context than they started in
+        _current.set(None)
+    profile.wall_seconds = round(time.perf_counter() - wall_started, 6)
+    # Only this thread's CPU time; work on collection workers is in the sections
+    profile.cpu_seconds = round(time.thread_time() - cpu_started, 6)
+    profile.info.update(info)
+    profile.finalize()
+    profile_store.add(profile)
+    return profile
+
+@contextmanager
+def capture(name, enabled=False, **info):
+    """Profile the enclosed block when enabled or sampled, unless a profile is already active"""
+    if _current.get() is not None or not (enabled or should_sample()):
+        yield None
+        return
+    started = start(name, sampled=not enabled, **info)
+    try:
+        yield started[0]
+    finally:
+        finish(started)
+
+def section(name, detail=None):
+    """Decorator recording wall and CPU time of calls made while a profile is active.
+
+    ``detail`` is called with the same arguments and its result is appended
+    to the section name, e.g. to split collector calls by source type.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            label = f"{name}:{detail(*args, **kwargs)}" if detail is not None else name
+            # Calls on worker threads get their own cProfile, merged at the end
+            profiler = _start_profiler(profile)
+            wall_started = time.perf_counter()
+            cpu_started = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.add_section(label, time.perf_counter() - wall_started, time.thread_time() - cpu_started)
+                _stop_profiler(profile, profiler)
+        return wrapper
+    return decorator
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._profile_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = getattr(context, '_profile_started', None)
+    if profile is not None and started is not None:
+        profile.add_query(statement, time.perf_counter() - started)
+
+def install_sql_hooks():
+    """Time SQL statements of every engine while a profile is active"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+def request_token(request):
+    return request.headers.get(TOKEN_HEADER) or request.args.get('profile_token')
+
+def _stored_path(request):
+    """Request path and query string without the profile token"""
+    query = urlencode([(key, value) for key, value in request.args.items(multi=True) if key != 'profile_token'])
+    return f"{request.path}?{query}" if query else request.path
+
+def init_app(app):
+    """Profile Flask requests on demand or by sampling"""
+    from flask import g, request
+
+    install_sql_hooks()
+
+    @app.before_request
+    def _start_request_profile():
+        if request.path.startswith(EXCLUDED_PATHS):
+            return
+        flag = request.headers.get(PROFILE_HEADER) or request.args.get('profile', '')
+        requested = flag.lower() in ('1', 'true', 'yes') and authorized(request_token(request))
+        if requested or should_sample():
+            g.profile = start(
+                f"{request.method} {request.path}", kind='request', method=request.method,
+                path=_stored_path(request), sampled=not requested
+            )
+
+    @app.after_request
+    def _tag_profiled_response(response):
+        started = g.get('profile')
+        if started is not None:
+            response.headers['X-Profile-Id'] = started[0].id
+            started[0].info['status'] = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_request_profile(error=None):
+        started = g.pop('profile', None)
+        if started is None:
+            return
+        info = {}
+        if request.url_rule is not None:
+            info['route'] = request.url_rule.rule
+        if error is not None:
+            info['error'] = str(error)
+        finish(started, **info)
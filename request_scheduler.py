@@ -0,0 +1,306 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying after a pause; anything else is returned as-is
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Politeness limits for hosts we query for every target: (requests/second, burst, concurrent requests)
+DEFAULT_HOST_LIMITS = {
+    'github.com': (1.0, 5, 2)
+}
+
+class RequestThrottled(requests.RequestException):
+    """Raised when a request could not get a slot for its host in time"""
+    pass
+
+def parse_host_limits(value):
+    """Parse 'host=rate:burst:concurrency,...' into {host: (rate, burst, concurrency)}"""
+    limits = {}
+    for item in (value or '').split(','):
+        host, _, spec = item.strip().partition('=')
+        parts = spec.split(':')
+        if not host or len(parts) != 3:
+            continue
+        try:
+            limits[host.lower()] = (float(parts[0]), int(parts[1]), int(parts[2]))
+        except ValueError:
+            logger.warning(f"Ignoring invalid host limit: {item}")
+    return limits
+
+def retry_after_seconds(value, now=None):
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
+
+def _new_counters():
+    return {
+        'requests': 0,
+        'retries': 0,
+        'throttled': 0,
+        'failures': 0,
+        'wait_count': 0,
+        'wait_seconds': 0.0,
+        'max_wait_seconds': 0.0
+    }
+
+def _add_counters(total, counters):
+    for name, value in counters.items():
+        if name == 'max_wait_seconds':
+            total[name] = max(total[name], value)
+        else:
+            total[name] += value
+
+class HostSlots:
+    """Token bucket and concurrency cap for one host"""
+
+    def __init__(self, rate, burst, concurrency):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        # Requests holding these slots, retries included; guarded by the scheduler lock
+        self.users = 0
+        self.condition = threading.Condition()
+        self.counters = _new_counters()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, deadline):
+        """Block until a token and a concurrency slot are free; returns seconds waited"""
+        started = time.monotonic()
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= deadline:
+                    raise RequestThrottled("Timed out waiting for a request slot")
+                if self.in_flight >= self.concurrency:
+                    # Woken by release()
+                    self.condition.wait(deadline - now)
+                    continue
+                delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0)
+                if delay > 0:
+                    self.condition.wait(min(delay, deadline - now))
+                    continue
+                self.tokens -= 1
+                self.in_flight += 1
+                waited = now - started
+                self.counters['wait_count'] += 1
+                self.counters['wait_seconds'] += waited
+                self.counters['max_wait_seconds'] = max(self.counters['max_wait_seconds'], waited)
+                return waited
+
+    def count(self, name):
+        with self.condition:
+            self.counters[name] += 1
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def back_off(self, seconds):
+        """Hold every request to this host for the given number of seconds"""
+        with self.condition:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def idle(self):
+        """Whether no request holds these slots and no back-off is in effect"""
+        with self.condition:
+            return self.users == 0 and self.in_flight == 0 and self.blocked_until <= time.monotonic()
+
+class RequestScheduler:
+    """Central scheduler for outbound HTTP requests.
+
+    Every host gets a token bucket (sustained rate plus burst) and a cap on
+    concurrent requests. Requests wait for both before they are sent, and
+    throttled or failed requests are retried with jittered exponential
+    backoff; a Retry-After header overrides the computed delay and pauses
+    the whole host, not just the one request. At most max_hosts hosts are
+    tracked: the least recently used idle hosts without configured limits
+    are dropped beyond that, and their counters are kept as one evicted
+    total.
+    """
+
+    def __init__(self, rate=5.0, burst=10, concurrency=4, max_retries=3, backoff_base=0.5,
+                 backoff_max=30.0, timeout=10, max_wait=60.0, host_limits=None, max_hosts=1024):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self.host_limits = dict(DEFAULT_HOST_LIMITS)
+        self.host_limits.update(host_limits or {})
+        self.max_hosts = max_hosts
+        # Least recently used first
+        self.hosts = OrderedDict()
+        self.evicted = dict(_new_counters(), hosts=0)
+        self.lock = threading.Lock()
+
+    def _checkout(self, host):
+        """Slots for host, held until _checkin() so they are not evicted mid-request"""
+        with self.lock:
+            slots = self.hosts.get(host)
+            if slots is None:
+                rate, burst, concurrency = self.host_limits.get(host, (self.rate, self.burst, self.concurrency))
+                slots = self.hosts[host] = HostSlots(rate, burst, concurrency)
+                slots.users += 1
+                self._evict_idle()
+            else:
+                self.hosts.move_to_end(host)
+                slots.users += 1
+            return slots
+
+    def _checkin(self, slots):
+        with self.lock:
+            slots.users -= 1
+
+    def _evict_idle(self):
+        """Drop least recently used idle hosts beyond max_hosts; caller holds the lock"""
+        excess = len(self.hosts) - self.max_hosts
+        victims = []
+        for host, slots in self.hosts.items():
+            if len(victims) >= excess:
+                break
+            # Hosts with configured limits keep their own series in grouped_stats()
+            if host not in self.host_limits and slots.idle():
+                victims.append(host)
+        for host in victims:
+            slots = self.hosts.pop(host)
+            self.evicted['hosts'] += 1
+            _add_counters(self.evicted, slots.counters)
+
+    def backoff_delay(self, attempt, response=None):
+        """Seconds to wait before retry number attempt (1-based)"""
+        if response is not None:
+            requested = retry_after_seconds(response.headers.get('Retry-After'))
+            if requested is not None:
+                return min(requested, self.backoff_max)
+        # Full jitter keeps retries from many workers from arriving together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, session, method, url, timeout=None, **kwargs):
+        """Send a request through the scheduler and return the final response.
+
+        Connection errors and RETRY_STATUSES are retried up to max_retries
+        times; the last response is returned even if it is still an error.
+        """
+        slots = self._checkout((urlparse(url).hostname or '').lower())
+        try:
+            return self._send(slots, session, method, url, timeout, **kwargs)
+        finally:
+            self._checkin(slots)
+
+    def _send(self, slots, session, method, url, timeout, **kwargs):
+        attempt = 0
+        while True:
+            slots.acquire(time.monotonic() + self.max_wait)
+            try:
+                slots.count('requests')
+                response = session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                slots.count('failures')
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+                error = e
+            finally:
+                slots.release()
+
+            if response is not None:
+                if response.status_code == 429:
+                    slots.count('throttled')
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                error = f"HTTP {response.status_code}"
+
+            attempt += 1
+            delay = self.backoff_delay(attempt, response)
+            if response is not None:
+                if response.status_code == 429 or 'Retry-After' in response.headers:
+                    slots.back_off(delay)
+                response.close()
+            slots.count('retries')
+            logger.info(f"Retrying {method} {url} in {delay:.2f}s after {error} (attempt {attempt})")
+            time.sleep(delay)
+
+    def stats(self):
+        """Per-host request, retry and queue-wait counters of the hosts still tracked"""
+        with self.lock:
+            hosts = dict(self.hosts)
+        stats = {}
+        for host, slots in hosts.items():
+            with slots.condition:
+                counters = dict(slots.counters, in_flight=slots.in_flight)
+            counters['mean_wait_seconds'] = counters['wait_seconds'] / counters['wait_count'] if counters['wait_count'] else 0.0
+            stats[host] = counters
+        return stats
+
+    def evicted_stats(self):
+        """Summed counters of the hosts evicted so far, plus how many there were"""
+        with self.lock:
+            return dict(self.evicted)
+
+    def grouped_stats(self, other='other'):
+        """Counters of the hosts with configured limits, every other host summed under other.
+        
+        Unlike stats(), the keys are bounded by the configuration, so the
+        result can be exported as metric labels. Evicted hosts are part of
+        other, which keeps its counters from going backwards.
+        """
+        grouped = {}
+        with self.lock:
+            rest = dict(self.evicted, in_flight=0)
+            del rest['hosts']
+            for host, slots in self.hosts.items():
+                with slots.condition:
+                    counters = dict(slots.counters, in_flight=slots.in_flight)
+                if host in self.host_limits:
+                    grouped[host] = counters
+                else:
+                    _add_counters(rest, counters)
+        grouped[other] = rest
+        for counters in grouped.values():
+            counters['mean_wait_seconds'] = counters['wait_seconds'] / counters['wait_count'] if counters['wait_count'] else 0.0
+        return grouped
+
+request_scheduler = RequestScheduler(
+    rate=float(os.environ.get('OUTBOUND_RATE', '5')),
+    burst=int(os.environ.get('OUTBOUND_BURST', '10')),
+    concurrency=int(os.environ.get('OUTBOUND_HOST_CONCURRENCY', '4')),
+    max_retries=int(os.environ.get('OUTBOUND_MAX_RETRIES', '3')),
+    backoff_base=float(os.environ.get('OUTBOUND_BACKOFF_BASE', '0.5')),
+    backoff_max=float(os.environ.get('OUTBOUND_BACKOFF_MAX', '30')),
+    timeout=float(os.environ.get('OUTBOUND_TIMEOUT', '10')),
+    host_limits=parse_host_limits(os.environ.get('OUTBOUND_HOST_LIMITS')),
+    max_hosts=int(os.environ.get('OUTBOUND_MAX_HOSTS', '1024'))
+)
@@ -0,0 +1,203 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import ipaddress
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'result_cache.db')
+
+def normalize_target(source_type, target):
+    """Normalize a target so equivalent lookups share a cache key"""
+    target = (target or '').strip()
+
+    if source_type == 'website':
+        if not target.startswith(('http://', 'https://')):
+            target = 'https://' + target
+        parsed = urlparse(target)
+        path = parsed.path if parsed.path not in ('', '/') else ''
+        query = f"?{parsed.query}" if parsed.query else ''
+        return f"{parsed.scheme.lower()}://{parsed.netloc.lower()}{path}{query}"
+
+    if source_type == 'ip':
+        try:
+            return str(ipaddress.ip_address(target))
+        except ValueError:
+            return target.lower()
+
+    # Domain based lookups ignore scheme, path and a trailing root dot
+    domain = target.replace('https://', '').replace('http://', '').split('/')[0]
+    return domain.lower().rstrip('.')
+
+class ResultCache:
+    """Two-tier TTL cache for collector results.
+
+    Lookups hit an in-memory LRU first and fall back to a persistent SQLite
+    store, so warm results survive restarts and are shared by every worker
+    process on the host. Only successful results are cached.
+
+    The lock only guards the memory tier and counters; each thread talks to
+    the SQLite tier over its own connection outside it, so a slow disk write
+    never stalls memory hits on other threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.schema_lock = threading.Lock()
+        self.schema_ready = False
+        self.counters = {
+            'memory_hits': 0,
+            'persistent_hits': 0,
+            'misses': 0,
+            'stores': 0
+        }
+
+    def get(self, source_type, target):
+        """Return a cached result or None when missing or expired"""
+        key = (source_type, normalize_target(source_type, target))
+        now = time.time()
+
+        with self.lock:
+            item = self.memory.get(key)
+            if item is not None:
+                expires_at, result = item
+                if expires_at > now:
+                    self.memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return copy.deepcopy(result)
+                del self.memory[key]
+
+        row = self._persistent_get(key, now)
+        with self.lock:
+            if row is None:
+                self.counters['misses'] += 1
+                return None
+
+            expires_at, result = row
+            # A set() that finished meanwhile is newer than the row read above
+            if key not in self.memory:
+                self._memory_set(key, expires_at, result)
+            self.counters['persistent_hits'] += 1
+        return copy.deepcopy(result)
+
+    def set(self, source_type, target, result, ttl):
+        """Store a result in both tiers for ttl seconds"""
+        key = (source_type, normalize_target(source_type, target))
+        expires_at = time.time() + ttl
+        cached = copy.deepcopy(result)
+
+        with self.lock:
+            self._memory_set(key, expires_at, cached)
+            self.counters['stores'] += 1
+        self._persistent_set(key, expires_at, cached)
+
+    def invalidate(self, source_type, target):
+        """Drop a single entry from both tiers"""
+        key = (source_type, normalize_target(source_type, target))
+        with self.lock:
+            self.memory.pop(key, None)
+        connection = self._connect()
+        if connection is not None:
+            connection.execute('DELETE FROM cached_result WHERE source_type = ? AND target = ?', key)
+            connection.commit()
+
+    def purge_expired(self):
+        """Remove expired entries from the persistent tier"""
+        connection = self._connect()
+        if connection is None:
+            return 0
+        cursor = connection.execute('DELETE FROM cached_result WHERE expires_at <= ?', (time.time(),))
+        connection.commit()
+        return cursor.rowcount
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats['memory_entries'] = len(self.memory)
+        lookups = stats['memory_hits'] + stats['persistent_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['persistent_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _memory_set(self, key, expires_at, result):
+        self.memory[key] = (expires_at, result)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _connect(self):
+        """This thread's connection to the persistent tier, opened lazily.
+
+        The cache degrades to memory-only when the store cannot be opened.
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None and self.path:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=5)
+                if not self.schema_ready:
+                    self._create_schema(connection)
+                self.local.connection = connection
+            except sqlite3.Error as e:
+                logger.error(f"Result cache store unavailable, using memory only: {str(e)}")
+                self.path = None
+                connection = None
+        return connection
+
+    def _create_schema(self, connection):
+        with self.schema_lock:
+            if self.schema_ready:
+                return
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cached_result ('
+                'source_type TEXT NOT NULL, target TEXT NOT NULL, result TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, PRIMARY KEY (source_type, target))'
+            )
+            connection.commit()
+            self.schema_ready = True
+
+    def _persistent_get(self, key, now):
+        connection = self._connect()
+        if connection is None:
+            return None
+        try:
+            row = connection.execute(
+                'SELECT expires_at, result FROM cached_result WHERE source_type = ? AND target = ?', key
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Result cache read failed: {str(e)}")
+            return None
+        if row is None or row[0] <= now:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _persistent_set(self, key, expires_at, result):
+        connection = self._connect()
+        if connection is None:
+            return
+        try:
+            connection.execute(
+                'INSERT OR REPLACE INTO cached_result (source_type, target, result, expires_at) VALUES (?, ?, ?, ?)',
+                (key[0], key[1], json.dumps(result), expires_at)
+            )
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Result cache write failed: {str(e)}")
+
+result_cache = ResultCache(
+    path=os.environ.get('RESULT_CACHE_PATH', DEFAULT_CACHE_PATH),
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', '10000'))
+)
@@ -1,35 +1,58 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, make_response
+from flask import render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from app import app, db
-from models import Investigation, DataEntry, AnalysisResult
-from osint_sources import OSINTCollector
-from data_analyzer import DataAnalyzer
+from models import Investigation, DataEntry, AnalysisResult, Job
+from jobs import job_queue
+import batch_analysis  # registers the 'batch_analyze' job type
+from result_cache import result_cache
+from request_scheduler import request_scheduler
+from collection_engine import collection_engine
+import metrics
+import profiling
+from exporters import EXPORT_FORMATS
+from dashboard_stats import dashboard_stats
+from visualization_data import build_visualization_data, fingerprint, DEFAULT_CONFIDENCE_BINS, MAX_CONFIDENCE_BINS, DEFAULT_MAX_POINTS
+import search_index
+from entities import ENTITY_TYPES, investigations_with_entity, normalize_ip, normalize_domain, normalize_email
+import entity_graph
+from bulk_ingest import parse_targets, bulk_collect, DEFAULT_CONCURRENCY, DEFAULT_BATCH_SIZE, MAX_CONCURRENCY
 import json
-import csv
-import io
 from datetime import datetime
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.orm import load_only
+
+# Entries returned per page by the investigation entries API
+ENTRY_PAGE_SIZE = 50
+MAX_ENTRY_PAGE_SIZE = 500
+
+def entry_summary(entry):
+    """Summary columns of an entry, as listed in the investigation view"""
+    return {
+        'id': entry.id,
+        'source_type': entry.source_type,
+        'target': entry.target,
+        'source_url': entry.source_url,
+        'collected_at': entry.collected_at.isoformat(),
+        'confidence_score': entry.confidence_score
+    }
 
 @app.route('/')
 def dashboard():
     """Main dashboard showing investigations and recent activity"""
     investigations = Investigation.query.order_by(Investigation.updated_at.desc()).limit(10).all()
-    recent_data = DataEntry.query.order_by(DataEntry.collected_at.desc()).limit(20).all()
+    # Only the summary columns are shown, so skip loading the JSON payloads
+    recent_data = DataEntry.query.options(
+        load_only(DataEntry.source_type, DataEntry.target, DataEntry.collected_at, DataEntry.confidence_score)
+    ).order_by(DataEntry.collected_at.desc()).limit(10).all()
     
     # Get statistics for dashboard
-    total_investigations = Investigation.query.count()
-    total_data_entries = DataEntry.query.count()
-    active_investigations = Investigation.query.filter_by(status='active').count()
-    
-    stats = {
-        'total_investigations': total_investigations,
-        'total_data_entries': total_data_entries,
-        'active_investigations': active_investigations,
-        'data_sources': len(set([entry.source_type for entry in DataEntry.query.all()]))
-    }
+    stats = dashboard_stats.get()
+    entry_counts = dashboard_stats.entry_counts([investigation.id for investigation in investigations])
     
     return render_template('dashboard.html', 
                          investigations=investigations, 
                          recent_data=recent_data,
-                         stats=stats)
+                         stats=stats,
+                         entry_counts=entry_counts)
 
 @app.route('/search')
 def search():
@@ -49,37 +72,15 @@ def collect_data():
             flash('All fields are required', 'danger')
             return redirect(url_for('search'))
         
-        investigation = Investigation.query.get_or_404(investigation_id)
-        collector = OSINTCollector()
+        Investigation.query.get_or_404(investigation_id)
         
-        collected_count = 0
-        for source_type in source_types:
-            try:
-                data = collector.collect_data(source_type, target)
-                if data:
-                    entry = DataEntry(
-                        investigation_id=investigation_id,
-                        source_type=source_type,
-                        target=target,
-                        source_url=data.get('source_url', ''),
-                        confidence_score=data.get('confidence_score', 0.0)
-                    )
-                    entry.set_data_dict(data.get('data', {}))
-                    entry.set_metadata_dict(data.get('metadata', {}))
-                    
-                    db.session.add(entry)
-                    collected_count += 1
-            except Exception as e:
-                app.logger.error(f"Error collecting from {source_type}: {str(e)}")
-                continue
-        
-        if collected_count > 0:
-            # Update investigation timestamp
-            investigation.updated_at = datetime.utcnow()
-            db.session.commit()
-            flash(f'Successfully collected data from {collected_count} sources', 'success')
-        else:
-            flash('No data could be collected from the specified sources', 'warning')
+        # Collection runs in the background; the investigation page polls the job
+        job_queue.enqueue('collect', int(investigation_id), {
+            'target': target,
+            'source_types': source_types,
+            'force_refresh': bool(request.form.get('force_refresh'))
+        })
+        flash(f'Collection started for {target} across {len(source_types)} sources', 'info')
         
         return redirect(url_for('view_investigation', id=investigation_id))
         
@@ -88,25 +89,73 @@ def collect_data():
         flash('An error occurred while collecting data', 'danger')
         return redirect(url_for('search'))
 
+@app.route('/api/investigations/<int:investigation_id>/bulk_collect', methods=['POST'])
+def bulk_collect_targets(investigation_id):
+    """Collect a newline-delimited or CSV target list, streaming NDJSON progress"""
+    Investigation.query.get_or_404(investigation_id)
+    
+    upload = request.files.get('targets')
+    if upload:
+        content = upload.read().decode('utf-8', errors='replace')
+    else:
+        content = request.form.get('targets') or request.get_data(as_text=True)
+    
+    source_types = []
+    for value in request.values.getlist('source_types'):
+        source_types.extend(t.strip() for t in value.split(',') if t.strip())
+    
+    targets = parse_targets(content or '', source_types or None)
+    if not targets:
+        return jsonify({'error': 'No valid targets supplied'}), 400
+    
+    concurrency = min(max(request.args.get('concurrency', DEFAULT_CONCURRENCY, type=int), 1), MAX_CONCURRENCY)
+    batch_size = max(request.args.get('batch_size', DEFAULT_BATCH_SIZE, type=int), 1)
+    force_refresh = request.args.get('force_refresh', '').lower() in ('1', 'true', 'yes')
+    
+    def generate():
+        try:
+            for event in bulk_collect(investigation_id, targets, concurrency, batch_size, force_refresh):
+                yield json.dumps(event) + '\n'
+        except Exception as e:
+            app.logger.error(f"Error in bulk collection: {str(e)}")
+            yield json.dumps({'event': 'error', 'error': str(e)}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/investigation/<int:id>')
 def view_investigation(id):
-    """View specific investigation with all collected data"""
+    """View specific investigation; entries and result details are fetched lazily"""
     investigation = Investigation.query.get_or_404(id)
-    data_entries = DataEntry.query.filter_by(investigation_id=id).order_by(DataEntry.collected_at.desc()).all()
-    analysis_results = AnalysisResult.query.filter_by(investigation_id=id).order_by(AnalysisResult.created_at.desc()).all()
     
-    # Group data by source type for better visualization
-    data_by_source = {}
-    for entry in data_entries:
-        if entry.source_type not in data_by_source:
-            data_by_source[entry.source_type] = []
-        data_by_source[entry.source_type].append(entry)
+    # Per-source counts and confidence in one grouped query instead of loading every entry
+    source_summary = db.session.execute(
+        select(DataEntry.source_type, func.count(DataEntry.id), func.avg(DataEntry.confidence_score))
+        .where(DataEntry.investigation_id == id)
+        .group_by(DataEntry.source_type)
+        .order_by(DataEntry.source_type)
+    ).all()
+    source_counts = {source_type: count for source_type, count, _ in source_summary}
+    total_entries = sum(source_counts.values())
+    average_confidence = sum((average or 0) * count for _, count, average in source_summary) / total_entries if total_entries else 0
+    
+    # Result payloads are deferred and loaded on demand from /api/analysis_results/<id>
+    analysis_results = AnalysisResult.query.options(
+        load_only(AnalysisResult.analysis_type, AnalysisResult.title, AnalysisResult.description,
+                  AnalysisResult.confidence, AnalysisResult.created_at)
+    ).filter_by(investigation_id=id).order_by(AnalysisResult.created_at.desc()).all()
+    pending_jobs = Job.query.filter(
+        Job.investigation_id == id,
+        Job.status.in_(['queued', 'running'])
+    ).order_by(Job.created_at).all()
     
     return render_template('analysis.html', 
                          investigation=investigation,
-                         data_entries=data_entries,
-                         data_by_source=data_by_source,
-                         analysis_results=analysis_results)
+                         source_counts=source_counts,
+                         total_entries=total_entries,
+                         average_confidence=average_confidence,
+                         analysis_results=analysis_results,
+                         pending_jobs=pending_jobs,
+                         entry_page_size=ENTRY_PAGE_SIZE)
 
 @app.route('/create_investigation', methods=['POST'])
 def create_investigation():
@@ -135,41 +184,16 @@ def create_investigation():
 def analyze_investigation(investigation_id):
     """Run analysis on investigation data"""
     try:
-        investigation = Investigation.query.get_or_404(investigation_id)
-        data_entries = DataEntry.query.filter_by(investigation_id=investigation_id).all()
+        Investigation.query.get_or_404(investigation_id)
         
-        if not data_entries:
+        if not DataEntry.query.filter_by(investigation_id=investigation_id).first():
             flash('No data available for analysis', 'warning')
             return redirect(url_for('view_investigation', id=investigation_id))
         
-        analyzer = DataAnalyzer()
-        
-        # Run different types of analysis
-        pattern_analysis = analyzer.find_patterns(data_entries)
-        correlation_analysis = analyzer.find_correlations(data_entries)
-        timeline_analysis = analyzer.create_timeline(data_entries)
-        
-        # Save analysis results
-        analyses = [
-            ('pattern', 'Pattern Analysis', pattern_analysis),
-            ('correlation', 'Correlation Analysis', correlation_analysis),
-            ('timeline', 'Timeline Analysis', timeline_analysis)
-        ]
-        
-        for analysis_type, title, results in analyses:
-            if results:
-                analysis_result = AnalysisResult(
-                    investigation_id=investigation_id,
-                    analysis_type=analysis_type,
-                    title=title,
-                    description=f"Automated {title.lower()} of collected data",
-                    confidence=results.get('confidence', 0.0)
-                )
-                analysis_result.set_results_dict(results)
-                db.session.add(analysis_result)
-        
-        db.session.commit()
-        flash('Analysis completed successfully', 'success')
+        job_queue.enqueue('analyze', investigation_id, {
+            'rebuild': request.args.get('rebuild', '').lower() in ('1', 'true', 'yes')
+        })
+        flash('Analysis started', 'info')
         
     except Exception as e:
         app.logger.error(f"Error analyzing investigation: {str(e)}")
@@ -177,6 +201,33 @@ def analyze_investigation(investigation_id):
     
     return redirect(url_for('view_investigation', id=investigation_id))
 
+@app.route('/api/analysis/batch', methods=['POST'])
+def analyze_batch():
+    """Queue analysis of several investigations, or all of them, in the process pool"""
+    payload = request.get_json(silent=True) or {}
+    requested = payload.get('investigation_ids', 'all')
+    if requested == 'all':
+        investigation_ids = None
+    else:
+        try:
+            investigation_ids = sorted({int(value) for value in requested})
+        except (TypeError, ValueError):
+            return jsonify({'error': 'investigation_ids must be a list of ids or "all"'}), 400
+        if not investigation_ids:
+            return jsonify({'error': 'No investigations supplied'}), 400
+        found = db.session.execute(
+            select(Investigation.id).where(Investigation.id.in_(investigation_ids))
+        ).scalars().all()
+        missing = sorted(set(investigation_ids) - set(found))
+        if missing:
+            return jsonify({'error': 'Investigations not found', 'missing': missing}), 404
+
+    job = job_queue.enqueue('batch_analyze', None, {
+        'investigation_ids': investigation_ids,
+        'rebuild': bool(payload.get('rebuild'))
+    })
+    return jsonify({'job_id': job.id, 'status_url': url_for('get_job_status', job_id=job.id)}), 202
+
 @app.route('/export')
 def export_page():
     """Export interface"""
@@ -188,65 +239,23 @@ def export_data(investigation_id, format):
     """Export investigation data in specified format"""
     try:
         investigation = Investigation.query.get_or_404(investigation_id)
-        data_entries = DataEntry.query.filter_by(investigation_id=investigation_id).all()
-        
-        if format == 'json':
-            export_data = {
-                'investigation': {
-                    'id': investigation.id,
-                    'name': investigation.name,
-                    'description': investigation.description,
-                    'created_at': investigation.created_at.isoformat(),
-                    'updated_at': investigation.updated_at.isoformat()
-                },
-                'data_entries': []
-            }
-            
-            for entry in data_entries:
-                export_data['data_entries'].append({
-                    'id': entry.id,
-                    'source_type': entry.source_type,
-                    'source_url': entry.source_url,
-                    'target': entry.target,
-                    'data': entry.get_data_dict(),
-                    'metadata': entry.get_metadata_dict(),
-                    'collected_at': entry.collected_at.isoformat(),
-                    'confidence_score': entry.confidence_score
-                })
-            
-            response = make_response(json.dumps(export_data, indent=2))
-            response.headers['Content-Type'] = 'application/json'
-            response.headers['Content-Disposition'] = f'attachment; filename={investigation.name}_data.json'
-            
-        elif format == 'csv':
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write headers
-            writer.writerow(['ID', 'Source Type', 'Target', 'Source URL', 'Collected At', 'Confidence Score', 'Data Summary'])
-            
-            # Write data
-            for entry in data_entries:
-                data_dict = entry.get_data_dict()
-                data_summary = str(data_dict)[:100] + '...' if len(str(data_dict)) > 100 else str(data_dict)
-                writer.writerow([
-                    entry.id,
-                    entry.source_type,
-                    entry.target,
-                    entry.source_url,
-                    entry.collected_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    entry.confidence_score,
-                    data_summary
-                ])
-            
-            response = make_response(output.getvalue())
-            response.headers['Content-Type'] = 'text/csv'
-            response.headers['Content-Disposition'] = f'attachment; filename={investigation.name}_data.csv'
         
-        else:
+        if format not in EXPORT_FORMATS:
             flash('Invalid export format', 'danger')
             return redirect(url_for('export_page'))
         
+        generate, content_type, extension = EXPORT_FORMATS[format]
+        
+        def stream():
+            # Rows are read in batches and written out as they arrive
+            try:
+                yield from generate(investigation)
+            except Exception as e:
+                app.logger.error(f"Error streaming export: {str(e)}")
+                raise
+        
+        response = Response(stream_with_context(stream()), content_type=content_type)
+        response.headers['Content-Disposition'] = f'attachment; filename={investigation.name}_data.{extension}'
         return response
         
     except Exception as e:
@@ -254,43 +263,260 @@ def export_data(investigation_id, format):
         flash('An error occurred during export', 'danger')
         return redirect(url_for('export_page'))
 
+@app.route('/api/jobs/<int:job_id>')
+def get_job_status(job_id):
+    """API endpoint for polling background job status"""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/investigations/<int:investigation_id>/entries')
+def list_investigation_entries(investigation_id):
+    """API endpoint for one page of entry summaries, newest first.
+    
+    Pages are keyset-paginated on (collected_at, id): pass the returned
+    ``next_cursor`` as ``cursor`` to fetch the following page.
+    """
+    Investigation.query.get_or_404(investigation_id)
+    limit = min(max(request.args.get('limit', ENTRY_PAGE_SIZE, type=int), 1), MAX_ENTRY_PAGE_SIZE)
+    source_type = request.args.get('source_type') or None
+    
+    query = select(DataEntry).options(
+        load_only(DataEntry.source_type, DataEntry.target, DataEntry.source_url,
+                  DataEntry.collected_at, DataEntry.confidence_score)
+    ).where(DataEntry.investigation_id == investigation_id)
+    if source_type:
+        query = query.where(DataEntry.source_type == source_type)
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            collected_at, entry_id = cursor.rsplit('_', 1)
+            query = query.where(tuple_(DataEntry.collected_at, DataEntry.id) < (datetime.fromisoformat(collected_at), int(entry_id)))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    # One extra row tells whether another page exists
+    entries = db.session.execute(
+        query.order_by(DataEntry.collected_at.desc(), DataEntry.id.desc()).limit(limit + 1)
+    ).scalars().all()
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = f"{entries[-1].collected_at.isoformat()}_{entries[-1].id}"
+    
+    return jsonify({
+        'entries': [entry_summary(entry) for entry in entries],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/entries/<int:entry_id>')
+def get_entry(entry_id):
+    """API endpoint for one entry including its data and metadata payloads"""
+    entry = DataEntry.query.get_or_404(entry_id)
+    result = entry_summary(entry)
+    result['investigation_id'] = entry.investigation_id
+    result['data'] = entry.get_data_dict()
+    result['metadata'] = entry.get_metadata_dict()
+    return jsonify(result)
+
+@app.route('/api/analysis_results/<int:result_id>')
+def get_analysis_result(result_id):
+    """API endpoint for the full payload of one analysis result"""
+    result = AnalysisResult.query.get_or_404(result_id)
+    return jsonify({
+        'id': result.id,
+        'investigation_id': result.investigation_id,
+        'analysis_type': result.analysis_type,
+        'title': result.title,
+        'confidence': result.confidence,
+        'created_at': result.created_at.isoformat(),
+        'results': result.get_results_dict()
+    })
+
+@app.route('/api/cache_stats')
+def get_cache_stats():
+    """API endpoint for collector result cache statistics"""
+    return jsonify(result_cache.stats())
+
+@app.route('/api/scheduler_stats')
+def get_scheduler_stats():
+    """API endpoint for outbound request rate limiting and queue-wait statistics"""
+    return jsonify(request_scheduler.stats())
+
+@metrics.registry.on_scrape
+def _copy_collection_stats():
+    """Copy cache, scheduler and worker pool counters into gauges before each scrape"""
+    cache_stats = result_cache.stats()
+    metrics.cache_hit_ratio.set(cache_stats['hit_rate'])
+    for event in ('memory_hits', 'persistent_hits', 'misses', 'stores'):
+        metrics.cache_events.set(cache_stats[event], event=event)
+    # Configured hosts get their own series, the rest share host="other"
+    for host, host_stats in request_scheduler.grouped_stats().items():
+        for event in ('requests', 'retries', 'throttled', 'failures'):
+            metrics.outbound_requests.set(host_stats[event], host=host, event=event)
+        metrics.outbound_in_flight.set(host_stats['in_flight'], host=host)
+        for statistic in ('mean_wait_seconds', 'max_wait_seconds'):
+            metrics.outbound_queue_wait.set(host_stats[statistic], host=host, statistic=statistic.replace('_wait_seconds', ''))
+    for concurrency, queued in collection_engine.stats()['queued_tasks'].items():
+        metrics.collection_queue.set(queued, concurrency=concurrency)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text exposition of this process's metrics"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+def _profile_access_error():
+    if profiling.PROFILE_TOKEN is None:
+        return jsonify({'error': 'Profile access is disabled; set PROFILE_TOKEN to enable it'}), 403
+    if not profiling.authorized(profiling.request_token(request)):
+        return jsonify({'error': 'Invalid or missing profile token'}), 403
+    return None
+
+@app.route('/admin/profiles')
+def list_profiles():
+    """Admin endpoint listing the profiles kept by this process, newest first"""
+    error = _profile_access_error()
+    if error is not None:
+        return error
+    return jsonify({
+        'profiles': profiling.profile_store.list(parent_id=request.args.get('parent_id')),
+        'sample_rate': profiling.PROFILE_SAMPLE_RATE,
+        'max_stored': profiling.profile_store.max_profiles
+    })
+
+@app.route('/admin/profiles/<profile_id>')
+def get_profile(profile_id):
+    """Admin endpoint for one profile; ?format=pstats downloads the raw cProfile data"""
+    error = _profile_access_error()
+    if error is not None:
+        return error
+    profile = profiling.profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    if request.args.get('format') == 'pstats':
+        if profile.stats_data is None:
+            return jsonify({'error': 'No function timings were recorded for this profile'}), 404
+        return Response(profile.stats_data, mimetype='application/octet-stream', headers={
+            'Content-Disposition': f'attachment; filename=profile-{profile.id}.prof'
+        })
+    result = profile.to_dict()
+    result['children'] = profiling.profile_store.list(parent_id=profile.id)
+    return jsonify(result)
+
+@app.route('/api/engine_stats')
+def get_engine_stats():
+    """API endpoint for collection worker and HTTP connection pool usage"""
+    return jsonify(collection_engine.stats())
+
+@app.route('/api/search')
+def api_search():
+    """API endpoint for ranked full-text search across collected entries"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    if search_index.backend() is None:
+        return jsonify({'error': 'Full-text search requires SQLite or PostgreSQL'}), 501
+    
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', search_index.DEFAULT_PAGE_SIZE, type=int), 1), search_index.MAX_PAGE_SIZE)
+    
+    try:
+        total, results = search_index.search_entries(
+            query,
+            investigation_id=request.args.get('investigation_id', type=int),
+            source_type=request.args.get('source_type') or None,
+            page=page,
+            per_page=per_page
+        )
+    except Exception as e:
+        app.logger.error(f"Search failed for {query!r}: {str(e)}")
+        return jsonify({'error': 'Invalid search query'}), 400
+    
+    return jsonify({
+        'query': query,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'results': results
+    })
+
+@app.route('/api/entities/<entity_type>/<path:value>/investigations')
+def get_entity_investigations(entity_type, value):
+    """API endpoint listing the investigations that saw an IP, domain or email"""
+    if entity_type not in ENTITY_TYPES:
+        return jsonify({'error': 'Unsupported entity type'}), 400
+    
+    normalize = {'ip': normalize_ip, 'domain': normalize_domain, 'email': normalize_email}[entity_type]
+    normalized = normalize(value)
+    if not normalized:
+        return jsonify({'error': f'Invalid {entity_type} value'}), 400
+    
+    counts = investigations_with_entity(entity_type, normalized)
+    investigations = Investigation.query.filter(Investigation.id.in_(counts.keys())).all() if counts else []
+    return jsonify({
+        'entity_type': entity_type,
+        'value': normalized,
+        'investigations': [
+            {'id': investigation.id, 'name': investigation.name, 'mentions': counts[investigation.id]}
+            for investigation in investigations
+        ]
+    })
+
+@app.route('/api/graph/<node_type>/<path:value>')
+def get_graph_neighbourhood(node_type, value):
+    """API endpoint returning the k-hop entity graph around a node, across investigations"""
+    if node_type not in entity_graph.NODE_TYPES:
+        return jsonify({'error': 'Unsupported node type'}), 400
+    
+    node = entity_graph.find_node(node_type, value)
+    if node is None:
+        return jsonify({'error': 'Node not found'}), 404
+    
+    depth = request.args.get('depth', 2, type=int)
+    max_nodes = min(max(request.args.get('max_nodes', entity_graph.DEFAULT_MAX_NODES, type=int), 1), 5000)
+    return jsonify(entity_graph.neighbourhood(
+        node, depth, request.args.get('investigation_id', type=int), max_nodes
+    ))
+
+@app.route('/api/graph/shared_infrastructure')
+def get_shared_infrastructure():
+    """API endpoint listing IPs and hostnames reached from several investigations"""
+    node_types = [t.strip() for t in request.args.get('types', ','.join(entity_graph.INFRASTRUCTURE_TYPES)).split(',') if t.strip()]
+    if not node_types or any(t not in entity_graph.NODE_TYPES for t in node_types):
+        return jsonify({'error': 'Unsupported node type'}), 400
+    
+    investigation_id = request.args.get('investigation_id', type=int)
+    min_investigations = max(request.args.get('min_investigations', 2, type=int), 1)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    return jsonify({
+        'investigation_id': investigation_id,
+        'shared': entity_graph.shared_infrastructure(investigation_id, node_types, min_investigations, limit)
+    })
+
 @app.route('/api/visualization_data/<int:investigation_id>')
 def get_visualization_data(investigation_id):
-    """API endpoint for visualization data"""
+    """API endpoint for visualization data, aggregated in the database.
+    
+    Optional ``bins`` sets the confidence histogram resolution and
+    ``max_points`` caps the number of timeline points. Responses carry an
+    ETag so unchanged charts are answered with 304 Not Modified.
+    """
     try:
-        data_entries = DataEntry.query.filter_by(investigation_id=investigation_id).all()
-        
-        # Prepare data for different visualization types
-        source_distribution = {}
-        timeline_data = []
-        confidence_data = []
+        bins = min(max(request.args.get('bins', DEFAULT_CONFIDENCE_BINS, type=int), 1), MAX_CONFIDENCE_BINS)
+        max_points = max(request.args.get('max_points', DEFAULT_MAX_POINTS, type=int), 1)
         
-        for entry in data_entries:
-            # Source distribution
-            if entry.source_type not in source_distribution:
-                source_distribution[entry.source_type] = 0
-            source_distribution[entry.source_type] += 1
-            
-            # Timeline data
-            timeline_data.append({
-                'date': entry.collected_at.strftime('%Y-%m-%d'),
-                'source_type': entry.source_type,
-                'target': entry.target,
-                'confidence': entry.confidence_score
-            })
-            
-            # Confidence data
-            confidence_data.append({
-                'source_type': entry.source_type,
-                'confidence': entry.confidence_score,
-                'target': entry.target
-            })
-        
-        return jsonify({
-            'source_distribution': source_distribution,
-            'timeline_data': timeline_data,
-            'confidence_data': confidence_data
-        })
+        etag = fingerprint(investigation_id, bins, max_points)
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = jsonify(build_visualization_data(investigation_id, bins, max_points))
+        response.set_etag(etag)
+        # Cached copies must be revalidated, which is cheap thanks to the ETag
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
         
     except Exception as e:
         app.logger.error(f"Error getting visualization data: {str(e)}")
@@ -0,0 +1,230 @@
+"""Full-text search over collected entries.
+
+SQLite uses an FTS5 virtual table keyed by entry id; PostgreSQL keeps a
+weighted ``tsvector`` per entry behind a GIN index. Either way one index row
+is written per new DataEntry in the same flush that inserts it, so searches
+never touch the JSON payloads.
+"""
+import re
+import click
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session, load_only
+from app import app, db
+from models import DataEntry
+from entities import extract_entities
+
+# Upper bound on indexed body text per entry
+MAX_CONTENT_CHARS = 20000
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_TERM = re.compile(r'[\w@.\-]+\*?', re.UNICODE)
+
+_SQLITE_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entry_search USING fts5(
+    target, title, content, entities,
+    investigation_id UNINDEXED, source_type UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+_POSTGRES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS entry_search (
+        entry_id INTEGER PRIMARY KEY REFERENCES data_entry(id) ON DELETE CASCADE,
+        investigation_id INTEGER NOT NULL,
+        source_type VARCHAR(100) NOT NULL,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_entry_search_document ON entry_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_entry_search_investigation ON entry_search (investigation_id)"
+]
+
+_SQLITE_INSERT = text(
+    "INSERT INTO entry_search (rowid, target, title, content, entities, investigation_id, source_type) "
+    "VALUES (:entry_id, :target, :title, :content, :entities, :investigation_id, :source_type)"
+)
+
+_POSTGRES_INSERT = text(
+    "INSERT INTO entry_search (entry_id, investigation_id, source_type, document) VALUES ("
+    ":entry_id, :investigation_id, :source_type, "
+    "setweight(to_tsvector('simple', :target), 'A') || setweight(to_tsvector('simple', :title), 'A') || "
+    "setweight(to_tsvector('simple', :entities), 'B') || setweight(to_tsvector('simple', :content), 'C')"
+    ") ON CONFLICT (entry_id) DO NOTHING"
+)
+
+def backend():
+    """Name of the search backend for the configured database, or None"""
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        return dialect
+    return None
+
+def index_exists():
+    """Whether the search table has been created"""
+    return inspect(db.engine).has_table('entry_search')
+
+def ensure_schema():
+    """Create the search table if it is missing; returns True when it was created"""
+    if backend() is None or index_exists():
+        return False
+    with db.engine.begin() as connection:
+        if backend() == 'sqlite':
+            connection.execute(text(_SQLITE_SCHEMA))
+        else:
+            for statement in _POSTGRES_SCHEMA:
+                connection.execute(text(statement))
+    return True
+
+def index_is_empty():
+    """Whether the search table exists but holds no documents"""
+    if backend() is None or not index_exists():
+        return False
+    return db.session.execute(text("SELECT 1 FROM entry_search LIMIT 1")).first() is None
+
+def document_fields(entry):
+    """Searchable text of one entry, split into weighted fields"""
+    data = entry.get_data_dict()
+    content = [data.get('description'), data.get('author'), data.get('text_content'), data.get('note')]
+    content.extend(data.get('TXT') or [])
+    entities = [value for _, value in sorted(extract_entities(entry.source_type, entry.target, entry.source_url, data))]
+    entities.extend(str(email) for email in data.get('emails_found') or [])
+    return {
+        'entry_id': entry.id,
+        'investigation_id': entry.investigation_id,
+        'source_type': entry.source_type,
+        'target': entry.target or '',
+        'title': str(data.get('title') or ''),
+        'content': ' '.join(str(part) for part in content if part)[:MAX_CONTENT_CHARS],
+        'entities': ' '.join(dict.fromkeys(entities))
+    }
+
+@event.listens_for(Session, 'after_flush')
+def _index_flushed_entries(session, flush_context):
+    """Add new entries to the search index and drop deleted ones, in the same transaction"""
+    if backend() is None:
+        return
+    added = [document_fields(instance) for instance in session.new if isinstance(instance, DataEntry)]
+    removed = [{'entry_id': instance.id} for instance in session.deleted if isinstance(instance, DataEntry)]
+    if not added and not removed:
+        return
+    connection = session.connection()
+    if added:
+        connection.execute(_SQLITE_INSERT if backend() == 'sqlite' else _POSTGRES_INSERT, added)
+    if removed and backend() == 'sqlite':
+        # PostgreSQL removes rows through the foreign key cascade
+        connection.execute(text("DELETE FROM entry_search WHERE rowid = :entry_id"), removed)
+
+def rebuild_search_index(batch_size=1000):
+    """Re-index every entry, e.g. for data that predates the search table"""
+    ensure_schema()
+    db.session.execute(text("DELETE FROM entry_search"))
+    db.session.commit()
+
+    statement = _SQLITE_INSERT if backend() == 'sqlite' else _POSTGRES_INSERT
+    total = 0
+    last_id = 0
+    while True:
+        query = select(DataEntry).where(DataEntry.id > last_id).order_by(DataEntry.id).limit(batch_size)
+        entries = db.session.execute(query).scalars().all()
+        if not entries:
+            break
+        last_id = entries[-1].id
+        db.session.execute(statement, [document_fields(entry) for entry in entries])
+        db.session.commit()
+        db.session.expunge_all()
+        total += len(entries)
+
+    if backend() == 'sqlite':
+        # Merge the b-tree segments written by the batches above
+        db.session.execute(text("INSERT INTO entry_search (entry_search) VALUES ('optimize')"))
+        db.session.commit()
+    return total
+
+def _sqlite_match(query):
+    """Turn free text into an FTS5 query of quoted terms (trailing * keeps prefix search)"""
+    terms = []
+    for term in _TERM.findall(query):
+        prefix = term.endswith('*')
+        term = term.rstrip('*').strip('.-')
+        if term:
+            terms.append('"' + term.replace('"', '') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+def search(query, investigation_id=None, source_type=None, page=1, per_page=DEFAULT_PAGE_SIZE):
+    """Ranked, paginated search; returns (total, [(entry_id, score, snippet)]), best first"""
+    filters = ''
+    params = {'limit': per_page, 'offset': (page - 1) * per_page}
+    if investigation_id is not None:
+        filters += ' AND investigation_id = :investigation_id'
+        params['investigation_id'] = investigation_id
+    if source_type:
+        filters += ' AND source_type = :source_type'
+        params['source_type'] = source_type
+
+    if backend() == 'sqlite':
+        params['query'] = _sqlite_match(query)
+        if not params['query']:
+            return 0, []
+        where = f"entry_search MATCH :query{filters}"
+        count_sql = f"SELECT count(*) FROM entry_search WHERE {where}"
+        # bm25 weights follow the column order: target, title, content, entities
+        page_sql = (
+            "SELECT rowid, bm25(entry_search, 4.0, 4.0, 1.0, 2.0) AS score, "
+            "snippet(entry_search, -1, '<mark>', '</mark>', '...', 16) "
+            f"FROM entry_search WHERE {where} ORDER BY score LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params['query'] = query
+        where = f"document @@ websearch_to_tsquery('simple', :query){filters}"
+        count_sql = f"SELECT count(*) FROM entry_search WHERE {where}"
+        page_sql = (
+            "SELECT entry_id, -ts_rank_cd(document, websearch_to_tsquery('simple', :query)) AS score, '' "
+            f"FROM entry_search WHERE {where} ORDER BY score, entry_id LIMIT :limit OFFSET :offset"
+        )
+
+    total = db.session.execute(text(count_sql), params).scalar()
+    if not total:
+        return 0, []
+    return total, [tuple(row) for row in db.session.execute(text(page_sql), params)]
+
+def search_entries(query, investigation_id=None, source_type=None, page=1, per_page=DEFAULT_PAGE_SIZE):
+    """Search and load the matching entries' columns, without their JSON payloads"""
+    total, hits = search(query, investigation_id, source_type, page, per_page)
+    entries = {}
+    if hits:
+        columns = load_only(
+            DataEntry.id, DataEntry.investigation_id, DataEntry.source_type, DataEntry.target,
+            DataEntry.source_url, DataEntry.collected_at, DataEntry.confidence_score
+        )
+        rows = db.session.execute(
+            select(DataEntry).options(columns).where(DataEntry.id.in_([hit[0] for hit in hits]))
+        ).scalars()
+        entries = {entry.id: entry for entry in rows}
+
+    results = []
+    for entry_id, score, snippet in hits:
+        entry = entries.get(entry_id)
+        if entry is None:
+            continue
+        results.append({
+            'entry_id': entry.id,
+            'investigation_id': entry.investigation_id,
+            'source_type': entry.source_type,
+            'target': entry.target,
+            'source_url': entry.source_url,
+            'collected_at': entry.collected_at.isoformat() if entry.collected_at else None,
+            'confidence_score': entry.confidence_score,
+            'rank': -score,
+            'snippet': snippet
+        })
+    return total, results
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Re-index all data entries for full-text search"""
+    if backend() is None:
+        click.echo("Full-text search needs SQLite or PostgreSQL")
+        return
+    click.echo(f"Entries indexed: {rebuild_search_index()}")
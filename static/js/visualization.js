@@ -84,13 +84,14 @@ function initializeCharts(data) {
         }
 
         // Confidence levels chart
-        if (data.confidence_data && data.confidence_data.length > 0) {
-            initializeConfidenceChart(data.confidence_data);
+        if (data.confidence_histogram && data.total_entries > 0) {
+            initializeConfidenceChart(data.confidence_histogram);
         }
 
         // Timeline chart
-        if (data.timeline_data && data.timeline_data.length > 0) {
-            initializeTimelineChart(data.timeline_data);
+        if (data.timeline && data.timeline.length > 0) {
+            window.currentTimelineData = data.timeline;
+            initializeTimelineChart(data.timeline);
         }
 
         console.log('Charts initialized successfully');
@@ -153,29 +154,22 @@ function initializeSourceChart(sourceData) {
     });
 }
 
-// Confidence levels chart
-function initializeConfidenceChart(confidenceData) {
+// Confidence levels chart from the server-side histogram
+function initializeConfidenceChart(histogram) {
     const ctx = document.getElementById('confidenceChart');
     if (!ctx) return;
 
-    // Group confidence data into ranges
-    const ranges = {
-        'High (70-100%)': 0,
-        'Medium (40-69%)': 0,
-        'Low (0-39%)': 0
-    };
-
-    confidenceData.forEach(item => {
-        const confidence = item.confidence * 100;
-        if (confidence >= 70) ranges['High (70-100%)']++;
-        else if (confidence >= 40) ranges['Medium (40-69%)']++;
-        else ranges['Low (0-39%)']++;
+    const edges = histogram.edges;
+    const labels = histogram.counts.map((_, index) =>
+        `${Math.round(edges[index] * 100)}-${Math.round(edges[index + 1] * 100)}%`);
+    const values = histogram.counts;
+    // Low, medium and high bins keep the red / amber / green scheme
+    const colors = histogram.counts.map((_, index) => {
+        const confidence = edges[index];
+        const scheme = VisualizationUtils.colorSchemes.confidence;
+        return confidence >= 0.7 ? scheme[2] : confidence >= 0.4 ? scheme[1] : scheme[0];
     });
 
-    const labels = Object.keys(ranges);
-    const values = Object.values(ranges);
-    const colors = VisualizationUtils.colorSchemes.confidence;
-
     window.dashboardCharts.confidenceChart = new Chart(ctx, {
         type: 'bar',
         data: {
@@ -207,7 +201,7 @@ function initializeConfidenceChart(confidenceData) {
                 y: {
                     beginAtZero: true,
                     ticks: {
-                        stepSize: 1,
+                        precision: 0,
                         color: '#E0E1DD'
                     },
                     grid: {
@@ -249,18 +243,12 @@ function initializeTimelineChart(timelineData) {
     const g = svg.append('g')
         .attr('transform', `translate(${margin.left},${margin.top})`);
 
-    // Process data
+    // Points arrive already counted per day (or per bucket of days) and sorted
     const parseDate = d3.timeParse('%Y-%m-%d');
-    const processedData = d3.rollup(
-        timelineData,
-        v => v.length,
-        d => d.date
-    );
-
-    const data = Array.from(processedData, ([date, count]) => ({
-        date: parseDate(date),
-        count: count
-    })).sort((a, b) => a.date - b.date);
+    const data = timelineData.map(point => ({
+        date: parseDate(point.date),
+        count: point.total
+    }));
 
     if (data.length === 0) {
         g.append('text')
@@ -0,0 +1,17 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app reads its configuration when it is first imported
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='osint-tests-'), 'test.db')}"
+os.environ['JOB_WORKERS'] = '0'
+
+@pytest.fixture
+def app_context():
+    from app import app
+    with app.app_context():
+        yield app
@@ -0,0 +1,55 @@
+import threading
+import time
+
+def test_parse_targets_plain_lines_infer_source_types(app_context):
+    from bulk_ingest import parse_targets
+
+    content = "# targets\nexample.test\n\n192.0.2.1\nadmin@example.test\nhttps://example.test/\nexample.test\n"
+    assert parse_targets(content) == [
+        ('example.test', ['dns', 'whois']),
+        ('192.0.2.1', ['ip']),
+        ('admin@example.test', ['email']),
+        ('https://example.test/', ['website']),
+    ]
+
+def test_parse_targets_csv_with_source_types_column(app_context):
+    from bulk_ingest import parse_targets
+
+    content = "name,target,source_types\na, example.test ,dns;bogus\nb,other.test,\nc,,dns\n"
+    assert parse_targets(content, ['whois']) == [('example.test', ['dns']), ('other.test', ['whois'])]
+
+class _SlowCollector:
+    """Stands in for OSINTCollector, recording how many lookups ever started"""
+
+    started = 0
+    lock = threading.Lock()
+
+    def collect_many(self, source_types, target, force_refresh=False):
+        with self.lock:
+            type(self).started += 1
+        time.sleep(0.01)
+        return [(source_type, {'data': {'target': target}, 'confidence_score': 0.5}) for source_type in source_types]
+
+def test_bulk_collect_stops_and_keeps_collected_rows_when_closed_early(app_context, monkeypatch):
+    from app import db
+    import bulk_ingest
+    from models import Investigation, DataEntry
+
+    monkeypatch.setattr(bulk_ingest, 'OSINTCollector', _SlowCollector)
+    investigation = Investigation(name='bulk')
+    db.session.add(investigation)
+    db.session.commit()
+    investigation_id = investigation.id
+
+    targets = [(f"host{index}.test", ['dns']) for index in range(200)]
+    events = bulk_ingest.bulk_collect(investigation_id, targets, max_concurrency=2, batch_size=1000)
+    assert next(events)['event'] == 'started'
+    progress = [next(events) for _ in range(5)]
+    events.close()
+
+    assert progress[-1]['completed'] == 5
+    # Rows still buffered below batch_size are committed on close
+    assert DataEntry.query.filter_by(investigation_id=investigation_id).count() == 5
+    # Only a bounded window of targets was ever submitted
+    time.sleep(0.05)
+    assert _SlowCollector.started <= 5 + 2 * 2
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from columnar import encode_row_group, file_footer, file_header, load_columnar
+
+def _export(*row_groups):
+    return file_header() + b''.join(encode_row_group(rows) for rows in row_groups) + file_footer()
+
+def test_round_trip_keeps_types_and_nulls():
+    rows = [
+        {'id': 1, 'score': 0.5, 'seen': datetime(2024, 1, 2, 3, 4, 5, 678), 'ok': True, 'name': 'a', 'mixed': 1, 'tags': ['x']},
+        {'id': 2, 'score': None, 'seen': None, 'ok': False, 'name': 'a', 'mixed': 2.5, 'tags': None},
+        {'id': -2 ** 63, 'score': 1.0, 'seen': datetime(1969, 12, 31), 'ok': None, 'name': None, 'mixed': None, 'tags': {'k': 1}},
+    ]
+    columns = load_columnar(_export(rows))
+    for name in rows[0]:
+        assert columns[name] == [row[name] for row in rows], name
+
+def test_ints_outside_int64_round_trip_exactly():
+    rows = [{'data.account_id': 2 ** 70}, {'data.account_id': 7}, {'data.account_id': -2 ** 64}, {'data.account_id': None}]
+    assert load_columnar(_export(rows))['data.account_id'] == [2 ** 70, 7, -2 ** 64, None]
+
+def test_columns_missing_from_a_row_group_are_padded():
+    columns = load_columnar(_export([{'a': 1}], [{'a': 2, 'b': 'x'}]))
+    assert columns == {'a': [1, 2], 'b': [None, 'x']}
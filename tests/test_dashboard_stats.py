@@ -0,0 +1,28 @@
+def test_snapshot_is_dropped_when_a_write_commits_not_when_it_flushes(app_context):
+    from app import db
+    from models import Investigation
+    from dashboard_stats import dashboard_stats
+
+    before = dashboard_stats.get()['total_investigations']
+    generation = dashboard_stats.generation
+    db.session.add(Investigation(name='flushed'))
+    db.session.flush()
+    # Another request recomputing now still sees the old counts, so only the commit may drop them
+    assert dashboard_stats.generation == generation
+
+    db.session.commit()
+    assert dashboard_stats.generation == generation + 1
+    assert dashboard_stats.get()['total_investigations'] == before + 1
+
+def test_rolled_back_writes_keep_the_snapshot(app_context):
+    from app import db
+    from models import Investigation
+    from dashboard_stats import dashboard_stats
+
+    dashboard_stats.get()
+    generation = dashboard_stats.generation
+    db.session.add(Investigation(name='rolled back'))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert dashboard_stats.generation == generation
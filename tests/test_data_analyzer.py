@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import data_analyzer
+from analytics_engine import EntryColumns, build_state
+from data_analyzer import DataAnalyzer
+
+def _entries(count):
+    started = datetime(2024, 1, 1, 22, 0)
+    entries = []
+    for index in range(count):
+        data = {'error': 'timeout'} if index % 5 == 0 else {'A': [f"192.0.2.{index % 3}"]}
+        entries.append(SimpleNamespace(
+            id=index + 1, source_type=('dns', 'whois')[index % 2], target=f"t{index % 4}.test", source_url='',
+            collected_at=started + timedelta(minutes=37 * index), confidence_score=index / count,
+            get_data_dict=lambda data=data: data
+        ))
+    return entries
+
+def _columnar_state(entries):
+    rows = [
+        (entry.id, entry.source_type, entry.target, entry.source_url, entry.collected_at, entry.confidence_score,
+         entry.get_data_dict())
+        for entry in entries
+    ]
+    return build_state(EntryColumns().append_rows(rows))
+
+def _strip_timestamps(result):
+    return {key: value for key, value in result.items() if key != 'analysis_timestamp'}
+
+def test_results_keep_per_entry_keys():
+    analyzer = DataAnalyzer()
+    entries = _entries(6)
+    state = analyzer.update_state(analyzer.new_state(), entries)
+
+    events = analyzer.finalize_timeline(state)['timeline']['events']
+    assert [event['timestamp'] for event in events] == [entry.collected_at.isoformat() for entry in entries]
+    assert events[0] == {
+        'timestamp': '2024-01-01T22:00:00', 'date': '2024-01-01', 'time': '22:00:00', 'source_type': 'dns',
+        'target': 't0.test', 'confidence': 0.0, 'data_size': len(str({'error': 'timeout'})), 'has_error': True
+    }
+
+    correlations = analyzer.finalize_correlations(state)['correlations']
+    assert correlations['temporal_correlations'] == {'dns': [0, 22, 23], 'whois': [1, 22, 23]}
+    validation = correlations['cross_source_validation']['t0.test']
+    assert validation['sources_used'] == ['dns', 'dns']
+    assert validation['confidence_scores'] == [0.0, 4 / 6]
+
+def test_events_are_bounded_and_match_the_columnar_engine(monkeypatch):
+    monkeypatch.setattr(data_analyzer, 'TIMELINE_EVENT_LIMIT', 4)
+    monkeypatch.setattr(data_analyzer, 'TARGET_SCORE_LIMIT', 2)
+    monkeypatch.setattr('analytics_engine.TIMELINE_EVENT_LIMIT', 4)
+    monkeypatch.setattr('analytics_engine.TARGET_SCORE_LIMIT', 2)
+    analyzer = DataAnalyzer()
+    entries = _entries(30)
+
+    row_state = analyzer.update_state(analyzer.new_state(), entries)
+    chunked = _columnar_state(entries[:11])
+    for start in (11, 23):
+        analyzer.merge_into(chunked, _columnar_state(entries[start:start + 12]))
+
+    events = analyzer.finalize_timeline(row_state)['timeline']['events']
+    assert [event['timestamp'] for event in events] == [entry.collected_at.isoformat() for entry in entries[-4:]]
+    assert analyzer.finalize_correlations(row_state)['correlations']['cross_source_validation']['t0.test']['confidence_scores'] == [24 / 30, 28 / 30]
+    for finalize in (analyzer.finalize_timeline, analyzer.finalize_correlations):
+        assert _strip_timestamps(finalize(row_state)) == _strip_timestamps(finalize(chunked))
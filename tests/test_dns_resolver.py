@@ -0,0 +1,107 @@
+import socket
+import struct
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import collectors.dns
+from osint_sources import OSINTCollector
+from dns_resolver import DNSResolver, NEGATIVE_TTL, RECORD_TYPES, _encode_name, parse_response
+
+# Names as servers see them (IDNA form): A addresses or a CNAME target
+ZONE = {
+    'example.test': ('A', '192.0.2.1'),
+    'www.example.test': ('CNAME', 'edge.example.test'),
+    'edge.example.test': ('CNAME', 'example.test'),
+    'xn--exmple-cua.test': ('A', '192.0.2.7'),
+}
+
+def _record(owner, record_type, rdata):
+    return _encode_name(owner) + struct.pack('!HHIH', RECORD_TYPES[record_type], 1, 300, len(rdata)) + rdata
+
+def _answer(query):
+    """Stub server response to a query, or None to drop it"""
+    request = parse_response(query)
+    name, qtype = request['questions'][0]
+    if name.startswith('drop'):
+        return None
+    flags = 0x8182 if name.startswith('fail') else 0x8180
+    answers = []
+    owner = name
+    while owner in ZONE:
+        record_type, value = ZONE[owner]
+        if record_type == 'CNAME':
+            answers.append(_record(owner, 'CNAME', _encode_name(value)))
+            owner = value
+            continue
+        if qtype == RECORD_TYPES[record_type]:
+            answers.append(_record(owner, record_type, socket.inet_aton(value)))
+        break
+    question = _encode_name(name) + struct.pack('!HH', qtype, 1)
+    return struct.pack('!HHHHHH', request['id'], flags, 1, len(answers), 0, 0) + question + b''.join(answers)
+
+@pytest.fixture
+def resolver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(0.1)
+    stopped = threading.Event()
+
+    def serve():
+        while not stopped.is_set():
+            try:
+                query, client = sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            response = _answer(query)
+            if response is not None:
+                sock.sendto(response, client)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield DNSResolver(nameserver=f"127.0.0.1:{sock.getsockname()[1]}", timeout=0.3, retries=0)
+    stopped.set()
+    thread.join()
+    sock.close()
+
+def test_ascii_name(resolver):
+    result = resolver.resolve_many('Example.Test.', ['A'])['A']
+    assert result == {'records': ['192.0.2.1'], 'rcode': 'NOERROR', 'cname_chain': [], 'ttl': 300}
+
+def test_idn_name_is_queried_and_matched_in_idna_form(resolver):
+    result = resolver.resolve_many('exämple.test', ['A'])['A']
+    assert result['rcode'] == 'NOERROR'
+    assert result['records'] == ['192.0.2.7']
+    # Served from the cache under the same key whichever form is asked for
+    assert resolver.resolve('xn--exmple-cua.test', 'A') == ['192.0.2.7']
+
+def test_cname_chain(resolver):
+    result = resolver.resolve_many('www.example.test', ['A'])['A']
+    assert result['cname_chain'] == ['edge.example.test', 'example.test']
+    assert result['records'] == ['192.0.2.1']
+
+def test_timeout(resolver):
+    result = resolver.resolve_many('drop.example.test', ['A', 'MX'])
+    assert {record_type: answer['rcode'] for record_type, answer in result.items()} == {'A': 'TIMEOUT', 'MX': 'TIMEOUT'}
+
+class _RecordingCache:
+    def __init__(self):
+        self.stored = {}
+
+    def get(self, source_type, target):
+        return None
+
+    def set(self, source_type, target, result, ttl):
+        self.stored[target] = ttl
+
+def test_dns_results_are_cached_for_their_shortest_ttl_and_only_when_every_answer_is_noerror(resolver, monkeypatch):
+    monkeypatch.setattr(collectors.dns, 'get_resolver', lambda: resolver)
+    cache = _RecordingCache()
+    collector = OSINTCollector(cache=cache, scheduler=object(), engine=SimpleNamespace(session=None))
+
+    result = collector.collect_data('dns', 'example.test')
+    assert result['data']['A'] == ['192.0.2.1'] and 'cache_ttl' not in result
+    collector.collect_data('dns', 'fail.example.test')
+    # The empty NOERROR answers (no SOA) are only good for the negative TTL
+    assert cache.stored == {'example.test': NEGATIVE_TTL}
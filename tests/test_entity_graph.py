@@ -0,0 +1,15 @@
+def test_dns_entry_without_cname_has_no_alias_edge(app_context):
+    from entity_graph import extract_links
+
+    links = extract_links('dns', 'example.com', 'dns://example.com', {
+        'A': ['93.184.216.34'], 'CNAME': [], 'canonical_name': 'example.com', 'aliases': []
+    })
+    assert links == {(('domain', 'example.com'), 'resolves_to', ('ip', '93.184.216.34'))}
+
+def test_dns_entry_with_cname_links_canonical_name(app_context):
+    from entity_graph import extract_links
+
+    links = extract_links('dns', 'www.example.com', 'dns://www.example.com', {
+        'A': [], 'canonical_name': 'edge.cdn.test.', 'aliases': ['www.example.com']
+    })
+    assert links == {(('domain', 'www.example.com'), 'alias_of', ('hostname', 'edge.cdn.test'))}
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+def _entries(db, Investigation, DataEntry):
+    investigation = Investigation(name='pages')
+    db.session.add(investigation)
+    db.session.commit()
+    started = datetime(2024, 3, 1, 12, 0)
+    # Two pairs share a collection time, so the id has to break ties
+    offsets = [0, 1, 1, 2, 3, 3, 4]
+    for index, minutes in enumerate(offsets):
+        entry = DataEntry(investigation_id=investigation.id, source_type=('dns', 'ip')[index % 2],
+                          target=f"host{index}.test", collected_at=started + timedelta(minutes=minutes))
+        entry.set_data_dict({})
+        db.session.add(entry)
+    db.session.commit()
+    entries = DataEntry.query.filter_by(investigation_id=investigation.id).all()
+    newest_first = [entry.id for entry in sorted(entries, key=lambda entry: (entry.collected_at, entry.id), reverse=True)]
+    return investigation.id, newest_first
+
+def _pages(client, url, **params):
+    ids = []
+    cursor = None
+    while True:
+        if cursor:
+            params['cursor'] = cursor
+        body = client.get(url, query_string=params).get_json()
+        ids.append([entry['id'] for entry in body['entries']])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return ids
+
+def test_cursor_walks_every_entry_once_newest_first(app_context):
+    from app import db
+    from models import Investigation, DataEntry
+
+    investigation_id, newest_first = _entries(db, Investigation, DataEntry)
+    pages = _pages(app_context.test_client(), f"/api/investigations/{investigation_id}/entries", limit=2)
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert sum(pages, []) == newest_first
+
+def test_source_type_filter_and_invalid_cursor(app_context):
+    from app import db
+    from models import Investigation, DataEntry
+
+    investigation_id, newest_first = _entries(db, Investigation, DataEntry)
+    client = app_context.test_client()
+    url = f"/api/investigations/{investigation_id}/entries"
+
+    dns_ids = sum(_pages(client, url, limit=3, source_type='dns'), [])
+    assert dns_ids == [entry_id for entry_id in newest_first if db.session.get(DataEntry, entry_id).source_type == 'dns']
+    assert client.get(url, query_string={'cursor': 'not-a-cursor'}).status_code == 400
@@ -0,0 +1,77 @@
+import os
+import socket
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def _running_job(db, Job, investigation_id, worker, started_at):
+    job = Job(job_type='analyze', investigation_id=investigation_id, status='running', worker=worker, started_at=started_at)
+    job.set_payload_dict({})
+    db.session.add(job)
+    return job
+
+def test_recover_requeues_jobs_left_running_by_stopped_processes(app_context):
+    from app import db
+    from models import Investigation, Job
+    from jobs import job_queue
+
+    investigation = Investigation(name='recovery')
+    db.session.add(investigation)
+    db.session.commit()
+
+    host = socket.gethostname()
+    now = datetime.utcnow()
+    dead = _running_job(db, Job, investigation.id, f"{host}:{_dead_pid()}", now)
+    restarted = _running_job(db, Job, investigation.id, f"{host}:{os.getpid()}", now)
+    legacy = _running_job(db, Job, investigation.id, None, now - timedelta(days=1))
+    live = _running_job(db, Job, investigation.id, 'other-host:1', now)
+    db.session.commit()
+    job_ids = {name: job.id for name, job in
+               (('dead', dead), ('restarted', restarted), ('legacy', legacy), ('live', live))}
+
+    # Without worker threads recovered jobs run inline
+    job_queue.recover()
+    db.session.expire_all()
+
+    statuses = {name: db.session.get(Job, job_id).status for name, job_id in job_ids.items()}
+    assert statuses == {'dead': 'completed', 'restarted': 'completed', 'legacy': 'completed', 'live': 'running'}
+
+def test_analysis_folds_entries_committed_out_of_id_order(app_context):
+    from app import db
+    from models import Investigation, DataEntry, AnalysisState
+    from jobs import run_analysis
+
+    investigation = Investigation(name='late commits')
+    db.session.add(investigation)
+    db.session.commit()
+
+    def add_entry(entry_id, collected_at):
+        entry = DataEntry(id=entry_id, investigation_id=investigation.id, source_type='dns', target='example.test',
+                          collected_at=collected_at, confidence_score=0.5)
+        entry.set_data_dict({'A': ['192.0.2.1']})
+        db.session.add(entry)
+        db.session.commit()
+
+    base = 900000 + investigation.id * 100
+    now = datetime.utcnow()
+    add_entry(base + 1, now - timedelta(days=1))
+    add_entry(base + 2, now - timedelta(days=1))
+    # A recent entry whose transaction committed before a lower id's did
+    add_entry(base + 5, now)
+    result = run_analysis(investigation.id, {})
+    assert (result['entries_analyzed'], result['total_entries']) == (3, 3)
+    record = AnalysisState.query.filter_by(investigation_id=investigation.id).one()
+    assert (record.last_entry_id, record.folded_entry_ids) == (base + 2, [base + 5])
+
+    add_entry(base + 4, now)
+    result = run_analysis(investigation.id, {})
+    assert (result['entries_analyzed'], result['total_entries']) == (1, 4)
+
+    # Nothing is folded in twice
+    assert run_analysis(investigation.id, {})['entries_analyzed'] == 0
+    assert AnalysisState.query.filter_by(investigation_id=investigation.id).one().get_state_dict()['entry_count'] == 4
@@ -0,0 +1,25 @@
+from sqlalchemy import text
+
+def test_legacy_json_text_reads_as_empty_dict(app_context):
+    from app import db
+    from models import Investigation, DataEntry
+    from migrations import upgrade_schema
+
+    investigation = Investigation(name='legacy payloads')
+    db.session.add(investigation)
+    db.session.commit()
+    # Rows written while the payload columns were TEXT
+    for data, meta_data in (('', None), ('{"truncated": ', '[]'), ('{"A": ["192.0.2.1"]}', '{}')):
+        db.session.execute(text(
+            "INSERT INTO data_entry (investigation_id, source_type, target, data, meta_data, confidence_score) "
+            "VALUES (:investigation_id, 'dns', 'example.test', :data, :meta_data, 0.5)"
+        ), {'investigation_id': investigation.id, 'data': data, 'meta_data': meta_data})
+    db.session.commit()
+    db.session.expire_all()
+
+    entries = DataEntry.query.filter_by(investigation_id=investigation.id).order_by(DataEntry.id).all()
+    assert [entry.get_data_dict() for entry in entries] == [{}, {}, {'A': ['192.0.2.1']}]
+    assert entries[0].get_metadata_dict() == {}
+
+    # Startup never rewrites payload columns
+    assert upgrade_schema()['columns_converted'] == {}
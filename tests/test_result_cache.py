@@ -0,0 +1,39 @@
+import result_cache
+from result_cache import ResultCache
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'time', lambda: now[0])
+    cache = ResultCache(path=str(tmp_path / 'cache.db'))
+    cache.set('dns', 'Example.test.', {'data': {'A': ['192.0.2.1']}}, ttl=60)
+
+    assert cache.get('dns', 'example.test') == {'data': {'A': ['192.0.2.1']}}
+    now[0] += 61
+    assert cache.get('dns', 'example.test') is None
+    assert cache.stats()['misses'] == 1
+
+def test_least_recently_used_entry_falls_back_to_the_persistent_tier(tmp_path):
+    cache = ResultCache(path=str(tmp_path / 'cache.db'), max_entries=2)
+    for target in ('a.test', 'b.test'):
+        cache.set('dns', target, {'target': target}, ttl=60)
+    cache.get('dns', 'a.test')
+    cache.set('dns', 'c.test', {'target': 'c.test'}, ttl=60)
+
+    assert set(key[1] for key in cache.memory) == {'a.test', 'c.test'}
+    assert cache.get('dns', 'b.test') == {'target': 'b.test'}
+    assert cache.stats()['persistent_hits'] == 1
+    # A new process sees what this one stored
+    assert ResultCache(path=str(tmp_path / 'cache.db')).get('dns', 'c.test') == {'target': 'c.test'}
+
+def test_persistent_tier_is_written_outside_the_lock(tmp_path, monkeypatch):
+    cache = ResultCache(path=str(tmp_path / 'cache.db'))
+    held = []
+    persistent_set = cache._persistent_set
+
+    def recording_set(*args):
+        held.append(cache.lock.locked())
+        persistent_set(*args)
+
+    monkeypatch.setattr(cache, '_persistent_set', recording_set)
+    cache.set('dns', 'example.test', {}, ttl=60)
+    assert held == [False]
@@ -0,0 +1,53 @@
+def _add_entry(db, DataEntry, investigation_id, target, data, source_type='website'):
+    entry = DataEntry(investigation_id=investigation_id, source_type=source_type, target=target, source_url='')
+    entry.set_data_dict(data)
+    db.session.add(entry)
+    return entry
+
+def _investigation(db, Investigation):
+    investigation = Investigation(name='search')
+    db.session.add(investigation)
+    db.session.commit()
+    return investigation.id
+
+def test_new_entries_are_searchable_and_ranked_by_field(app_context):
+    from app import db
+    from models import Investigation, DataEntry
+    from search_index import search_entries
+
+    investigation_id = _investigation(db, Investigation)
+    in_content = _add_entry(db, DataEntry, investigation_id, 'plain.test', {'text_content': 'notes on quokkasite hosting'})
+    in_target = _add_entry(db, DataEntry, investigation_id, 'quokkasite.test', {'title': 'Home'})
+    _add_entry(db, DataEntry, investigation_id, 'other.test', {'text_content': 'unrelated'})
+    db.session.commit()
+
+    total, results = search_entries('quokkasite', investigation_id=investigation_id)
+    assert total == 2
+    assert [result['entry_id'] for result in results] == [in_target.id, in_content.id]
+    assert '<mark>' in results[1]['snippet']
+    # Prefix search and filters
+    assert search_entries('quokka*', investigation_id=investigation_id)[0] == 2
+    assert search_entries('quokkasite', investigation_id=investigation_id, source_type='dns')[0] == 0
+    assert search_entries('quokkasite', investigation_id=investigation_id + 1000)[0] == 0
+
+def test_deleted_entries_leave_the_index(app_context):
+    from app import db
+    from models import Investigation, DataEntry
+    from search_index import search_entries
+
+    investigation_id = _investigation(db, Investigation)
+    entry = _add_entry(db, DataEntry, investigation_id, 'wombatnet.test', {})
+    db.session.commit()
+    assert search_entries('wombatnet')[0] == 1
+
+    db.session.delete(entry)
+    db.session.commit()
+    assert search_entries('wombatnet')[0] == 0
+
+def test_search_api_quotes_operators_and_requires_a_query(app_context):
+    client = app_context.test_client()
+    assert client.get('/api/search?q=').status_code == 400
+    # FTS5 syntax in the input is matched as plain terms, not parsed
+    response = client.get('/api/search', query_string={'q': 'NEAR( "unbalanced OR'})
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 0
@@ -0,0 +1,10 @@
+from text_analytics import KeywordExtractor
+
+def test_mixed_alphanumeric_tokens_are_skipped():
+    extractor = KeywordExtractor()
+    assert extractor.keywords('token deadbeefcafe0123 user_name1 foo_barbaz') == ['token']
+
+def test_keywords_many_matches_keywords():
+    extractor = KeywordExtractor()
+    documents = [('Phishing portal abc123def login_page', None), ('Sicherheit über alles', 'de')]
+    assert extractor.keywords_many(documents) == [extractor.keywords(text, language) for text, language in documents]
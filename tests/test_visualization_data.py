@@ -0,0 +1,49 @@
+def _investigation(db, Investigation, DataEntry, scores):
+    investigation = Investigation(name='charts')
+    db.session.add(investigation)
+    db.session.commit()
+    unscored = []
+    for source_type, score in scores:
+        entry = DataEntry(investigation_id=investigation.id, source_type=source_type, target='example.test',
+                          confidence_score=score)
+        entry.set_data_dict({})
+        db.session.add(entry)
+        if score is None:
+            unscored.append(entry)
+    db.session.flush()
+    # Inserts fall back to the column default, so clear the score as older rows may have it
+    DataEntry.query.filter(DataEntry.id.in_([entry.id for entry in unscored])).update({'confidence_score': None})
+    db.session.commit()
+    return investigation.id
+
+def test_entries_without_confidence_are_counted_apart(app_context):
+    from app import db
+    from models import Investigation, DataEntry
+    from visualization_data import build_visualization_data
+
+    investigation_id = _investigation(db, Investigation, DataEntry, [('dns', 0.05), ('dns', None), ('ip', 1.0), ('ip', None)])
+    histogram = build_visualization_data(investigation_id, bins=4)['confidence_histogram']
+
+    assert histogram['counts'] == [1, 0, 0, 1]
+    assert histogram['by_source'] == {'dns': [1, 0, 0, 0], 'ip': [0, 0, 0, 1]}
+    assert histogram['unknown'] == 2
+    assert histogram['unknown_by_source'] == {'dns': 1, 'ip': 1}
+
+def test_unchanged_chart_data_revalidates_with_304(app_context):
+    from app import db
+    from models import Investigation, DataEntry
+
+    investigation_id = _investigation(db, Investigation, DataEntry, [('dns', 0.5)])
+    client = app_context.test_client()
+    url = f"/api/visualization_data/{investigation_id}"
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    # Other parameters or new entries change the ETag
+    assert client.get(f"{url}?bins=5", headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+    entry = DataEntry(investigation_id=investigation_id, source_type='ip', target='192.0.2.1', confidence_score=0.9)
+    entry.set_data_dict({})
+    db.session.add(entry)
+    db.session.commit()
+    assert client.get(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 200
@@ -0,0 +1,120 @@
+"""Keyword extraction and TF-IDF scoring for collected page text.
+
+Tokens are whole words of four or more letters, matched by one precompiled pattern.
+Stopwords live in frozensets per language pack; the packs used for every
+document come from ``KEYWORD_LANGUAGES`` and a document's own language
+(as reported by the website collector) adds its pack when one exists.
+"""
+import os
+import re
+import math
+from itertools import islice
+
+MIN_WORD_LENGTH = 4
+KEYWORDS_PER_DOCUMENT = 20
+
+# Whole words of letters only; words containing digits or underscores, such as
+# identifiers and hashes, are skipped rather than split
+_WORD = re.compile(r'\b[^\W\d_]{%d,}\b' % MIN_WORD_LENGTH)
+
+STOPWORD_PACKS = {
+    'en': frozenset("""
+    able about above after again against also always among animal another answer appear area
+    around base beauty because been before began begin behind being best better between bird
+    black blue boat body book both bring brought build busy call care carry center certain
+    change check children city class clear close cold color come common complete contain correct
+    could country course cover cross dark decide deep develop direct distant does doing done
+    dont door down draw drive during each early earth ease east enough equate even ever example
+    face fact fall family farm fast father feel feet field figure fill final find fine fire
+    first fish five food foot force found four free friend from front full further game gave
+    girl gold govern green ground group grow half happen hard have head hear heard heat here
+    hold horse hour house hundred idea inch interest into island itself just keep kind king knew
+    know language last late laugh lead learn leave left less letter life light like list listen
+    long love machine main make many mark measure might mile mind minute miss money moon more
+    morning most mother mountain move much multiply music must near need never next night north
+    note nothing notice noun numeral object ocean often once only open order other over page
+    paint paper pass pattern person picture piece plain plan plane plant point pose possible
+    pound power press problem produce product pull question quick rain reach ready real record
+    remember rest river road rock room rule said same school science second seem self serve
+    several shape ship short should simple since sing slow snow some song soon south space
+    special stand star start state stay stead step still stood stop story street strong study
+    such sure surface system table tail take talk teach test than that their them then there
+    these they this those though thought thousands through time tire together told took toward
+    town travel tree under unit until upon usual verb very voice vowel wait walk warm watch
+    water week well went were west what wheel when where which while white whole whom whose will
+    wind with within without wonder wood world would young your yours
+    """.split()),
+    'es': frozenset("""
+    algo algunos ante antes aquel aquella cada como contra cual cuando desde donde durante ella
+    ellas ellos entre esta estaba estas este esto estos fueron hasta hemos mismo mucho muchos
+    nada nosotros otra otras otro otros para pero poco porque puede sobre solo somos también
+    tanto tiene tienen todo todos tras usted vosotros
+    """.split()),
+    'fr': frozenset("""
+    aussi autre avant avec avoir bien cette ceux chaque comme dans depuis donc elle elles encore
+    entre fait leur leurs mais moins même notre nous par parce peut plus pour quand quel quelle
+    sans selon sont sous tous tout toute toutes très votre vous était être
+    """.split()),
+    'de': frozenset("""
+    aber alle allem allen aller alles also andere auch dabei damit dann darum dass dein deine
+    denn diese diesem diesen dieser dieses doch durch eine einem einen einer eines etwas euch
+    gegen habe haben hatte hier ihre ihrem ihren immer jede jeder jetzt kann kein keine machen
+    mehr mein meine muss nach nicht noch oder ohne sehr sein seine sich sind unser unter viel
+    vom von weil wenn werden wieder wird wurde zwischen über
+    """.split())
+}
+
+def _languages(value):
+    return tuple(language.strip().lower() for language in value.split(',') if language.strip())
+
+class KeywordExtractor:
+    """Tokenizer and stopword filter for keyword extraction"""
+
+    def __init__(self, languages=('en',), max_keywords=KEYWORDS_PER_DOCUMENT):
+        self.languages = tuple(languages)
+        self.max_keywords = max_keywords
+        self.stopwords = frozenset().union(*(STOPWORD_PACKS.get(language, ()) for language in self.languages))
+        self._stopwords_by_language = {None: self.stopwords}
+
+    def stopwords_for(self, language=None):
+        """Default stopwords plus the pack for a document language such as 'de' or 'fr-FR'"""
+        stopwords = self._stopwords_by_language.get(language)
+        if stopwords is None:
+            pack = STOPWORD_PACKS.get(str(language).split('-')[0].split('_')[0].lower(), frozenset())
+            stopwords = self._stopwords_by_language[language] = self.stopwords | pack
+        return stopwords
+
+    def keywords(self, text, language=None):
+        """The first ``max_keywords`` non-stopword tokens of a document"""
+        stopwords = self.stopwords_for(language)
+        keywords = []
+        for word in _WORD.findall(text.lower()):
+            if word not in stopwords:
+                keywords.append(word)
+                if len(keywords) == self.max_keywords:
+                    break
+        return keywords
+
+    def keywords_many(self, documents):
+        """Keywords for many (text, language) pairs in one pass, in input order"""
+        findall = _WORD.findall
+        stopwords_for = self.stopwords_for
+        limit = self.max_keywords
+        results = []
+        for text, language in documents:
+            stopwords = stopwords_for(language)
+            results.append(list(islice((word for word in findall(text.lower()) if word not in stopwords), limit)))
+        return results
+
+def tfidf_scores(term_counts, document_counts, total_documents, limit=KEYWORDS_PER_DOCUMENT):
+    """Top terms by term frequency times smoothed inverse document frequency"""
+    if not total_documents:
+        return {}
+    scores = {
+        term: count * (math.log((1 + total_documents) / (1 + document_counts.get(term, 0))) + 1)
+        for term, count in term_counts.items()
+    }
+    top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return {term: round(score, 4) for term, score in top}
+
+keyword_extractor = KeywordExtractor(languages=_languages(os.environ.get('KEYWORD_LANGUAGES', 'en')))
@@ -0,0 +1,108 @@
+import hashlib
+from datetime import date, timedelta
+from sqlalchemy import select, func, case
+from app import db
+from models import DataEntry
+
+DEFAULT_CONFIDENCE_BINS = 10
+MAX_CONFIDENCE_BINS = 100
+DEFAULT_MAX_POINTS = 365
+
+def fingerprint(investigation_id, *params):
+    """Cheap ETag for an investigation's chart data, answered from the composite index"""
+    count, last_id, last_collected = db.session.execute(
+        select(func.count(DataEntry.id), func.max(DataEntry.id), func.max(DataEntry.collected_at))
+        .where(DataEntry.investigation_id == investigation_id)
+    ).one()
+    key = f"{investigation_id}:{count}:{last_id}:{last_collected}:" + ':'.join(str(param) for param in params)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+UNKNOWN_BIN = -1
+
+def _confidence_bin(bins):
+    """SQL expression mapping confidence_score to a bin index in [0, bins), or UNKNOWN_BIN when NULL"""
+    edges = [index / bins for index in range(1, bins)]
+    return case(
+        (DataEntry.confidence_score.is_(None), UNKNOWN_BIN),
+        *[(DataEntry.confidence_score < edge, index) for index, edge in enumerate(edges)],
+        else_=bins - 1
+    )
+
+def _as_date(value):
+    # SQLite returns 'YYYY-MM-DD' strings, PostgreSQL returns dates
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+def downsample(days, max_points):
+    """Merge per-day counts into equal-width buckets so at most max_points remain.
+
+    ``days`` is a sorted list of (date, {source_type: count}). Returns the
+    bucketed points and the bucket width in days.
+    """
+    if not days:
+        return [], 1
+    span = (days[-1][0] - days[0][0]).days + 1
+    width = max(1, -(-span // max_points))
+    if width == 1:
+        return days, 1
+
+    start = days[0][0]
+    buckets = {}
+    for day, counts in days:
+        bucket_start = start + timedelta(days=((day - start).days // width) * width)
+        merged = buckets.setdefault(bucket_start, {})
+        for source_type, count in counts.items():
+            merged[source_type] = merged.get(source_type, 0) + count
+    return sorted(buckets.items()), width
+
+def build_visualization_data(investigation_id, bins=DEFAULT_CONFIDENCE_BINS, max_points=DEFAULT_MAX_POINTS):
+    """Aggregate chart data for an investigation in SQL"""
+    in_investigation = DataEntry.investigation_id == investigation_id
+
+    # Per-day, per-source counts
+    day = func.date(DataEntry.collected_at)
+    days = {}
+    for collected_on, source_type, count in db.session.execute(
+        select(day, DataEntry.source_type, func.count(DataEntry.id))
+        .where(in_investigation)
+        .group_by(day, DataEntry.source_type)
+    ):
+        if collected_on is None:
+            continue
+        days.setdefault(_as_date(collected_on), {})[source_type] = count
+    timeline, bucket_days = downsample(sorted(days.items()), max_points)
+
+    # Confidence histogram per source
+    confidence_bin = _confidence_bin(bins)
+    histogram = [0] * bins
+    histogram_by_source = {}
+    unknown_by_source = {}
+    source_distribution = {}
+    for source_type, index, count in db.session.execute(
+        select(DataEntry.source_type, confidence_bin, func.count(DataEntry.id))
+        .where(in_investigation)
+        .group_by(DataEntry.source_type, confidence_bin)
+    ):
+        source_distribution[source_type] = source_distribution.get(source_type, 0) + count
+        if index == UNKNOWN_BIN:
+            # Entries without a score are counted apart rather than in any bin
+            unknown_by_source[source_type] = count
+            continue
+        histogram[index] += count
+        histogram_by_source.setdefault(source_type, [0] * bins)[index] += count
+
+    return {
+        'source_distribution': source_distribution,
+        'total_entries': sum(source_distribution.values()),
+        'timeline': [
+            {'date': bucket.isoformat(), 'total': sum(counts.values()), 'by_source': counts}
+            for bucket, counts in timeline
+        ],
+        'timeline_bucket_days': bucket_days,
+        'confidence_histogram': {
+            'edges': [round(index / bins, 6) for index in range(bins + 1)],
+            'counts': histogram,
+            'by_source': histogram_by_source,
+            'unknown': sum(unknown_by_source.values()),
+            'unknown_by_source': unknown_by_source
+        }
+    }